@@ -0,0 +1,50 @@
+"""Time helpers.convert_date_run against parsing every date with pendulum.
+
+Simulates the date strings seen while converting a SUSHI response: a
+couple of dozen distinct months, each repeated for every item::
+
+    python benchmarks/convert_date_run.py --items 20000
+"""
+
+import argparse
+import timeit
+
+import pendulum
+
+from pycounter.helpers import convert_date_run
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--months", type=int, default=24)
+    args = parser.parse_args()
+
+    months = [
+        "%04d-%02d-01" % (2018 + month // 12, month % 12 + 1)
+        for month in range(args.months)
+    ]
+    dates = months * args.items
+
+    def with_pendulum():
+        for datestring in dates:
+            pendulum.parse(datestring, strict=False).date()
+
+    def with_helper():
+        for datestring in dates:
+            convert_date_run(datestring)
+
+    for name, func in (
+        ("pendulum.parse", with_pendulum),
+        ("convert_date_run", with_helper),
+    ):
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print(
+            "%-17s %9d dates %8.3f s  %6.0f ns/date"
+            % (name, len(dates), elapsed, elapsed / len(dates) * 1e9)
+        )
+
+
+if __name__ == "__main__":
+    main()
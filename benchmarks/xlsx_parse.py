@@ -0,0 +1,154 @@
+"""Compare XLSX parsing with openpyxl's full and read-only workbook modes.
+
+Writes a synthetic JR1 workbook, then parses it in a fresh process with
+each mode, reporting wall time and peak RSS::
+
+    python benchmarks/xlsx_parse.py --rows 100000
+
+(Peak RSS uses the ``resource`` module, so is only reported on Unix.)
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HEADER = [
+    ["Journal Report 1 (R4)", "Number of Successful Full-Text Article Requests"],
+    ["Example Library"],
+    ["1234"],
+    ["Period covered by Report:"],
+    ["2019-01-01 to 2019-12-31"],
+    ["Date run:"],
+    ["2020-01-15"],
+]
+MONTHS = [
+    "Jan-2019",
+    "Feb-2019",
+    "Mar-2019",
+    "Apr-2019",
+    "May-2019",
+    "Jun-2019",
+    "Jul-2019",
+    "Aug-2019",
+    "Sep-2019",
+    "Oct-2019",
+    "Nov-2019",
+    "Dec-2019",
+]
+
+
+def write_workbook(path, rows):
+    """Write a synthetic JR1 report with the given number of titles."""
+    from openpyxl import Workbook  # pylint: disable=import-outside-toplevel
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for line in HEADER:
+        sheet.append(line)
+    sheet.append(
+        [
+            "Journal",
+            "Publisher",
+            "Platform",
+            "Journal DOI",
+            "Proprietary Identifier",
+            "Print ISSN",
+            "Online ISSN",
+            "Reporting Period Total",
+            "Reporting Period HTML",
+            "Reporting Period PDF",
+        ]
+        + MONTHS
+    )
+    sheet.append(["Total for all journals", "", "", "", "", "", "", 0, 0, 0] + [0] * 12)
+    for row in range(rows):
+        usage = [(row + month) % 17 for month in range(12)]
+        sheet.append(
+            [
+                "Journal %d" % row,
+                "Publisher",
+                "Platform",
+                "",
+                "",
+                "1234-5678",
+                "8765-4321",
+                sum(usage),
+                0,
+                sum(usage),
+            ]
+            + usage
+        )
+    workbook.save(path)
+
+
+def parse_full(path):
+    """Parse the way pycounter did before read-only mode was used."""
+    # pylint: disable=import-outside-toplevel
+    from openpyxl import load_workbook
+
+    from pycounter.report import parse_generic
+
+    with open(path, "rb") as xlsx_file:
+        workbook = load_workbook(xlsx_file)
+        worksheet = workbook[workbook.sheetnames[0]]
+        rows = [
+            [cell.value if cell.value is not None else "" for cell in row]
+            for row in worksheet.iter_rows()
+        ]
+    return parse_generic(rows)
+
+
+def parse_read_only(path):
+    """Parse with the current implementation."""
+    from pycounter.report import parse_xlsx  # pylint: disable=import-outside-toplevel
+
+    return parse_xlsx(path)
+
+
+def run_child(mode, path):
+    """Parse the file in this process and print timing and memory."""
+    func = {"full": parse_full, "read-only": parse_read_only}[mode]
+    start = time.perf_counter()
+    report = func(path)
+    elapsed = time.perf_counter() - start
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover
+        peak = "n/a"
+    else:
+        scale = 1 if sys.platform == "darwin" else 1024
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        peak = "%.1f MB" % (maxrss / 1024 / 1024)
+    print(
+        "%-10s %8d titles %8.2f s  peak RSS %s"
+        % (mode, len(report.pubs), elapsed, peak)
+    )
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--child", choices=["full", "read-only"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "jr1.xlsx")
+        write_workbook(path, args.rows)
+        for mode in ("full", "read-only"):
+            subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--path", path],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 """pycounter: Project COUNTER/NISO SUSHI statistics."""
 
-from pycounter import exceptions, report, sushi
+import importlib
+
 from pycounter.version import __version__
 
 __all__ = ("__version__", "report", "sushi", "exceptions")
+
+
+def __getattr__(name):
+    """Import submodules on first use, to keep ``import pycounter`` fast."""
+    if name in __all__:
+        return importlib.import_module("pycounter." + name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,222 @@
+"""Archive of raw SUSHI responses, for keeping and reprocessing offline."""
+
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from pycounter import bulk
+from pycounter.cache import normalize_params
+
+_META_SUFFIX = ".meta.json"
+
+ArchiveEntry = collections.namedtuple("ArchiveEntry", "path metadata")
+ArchiveEntry.__doc__ = """An archived response.
+
+:param path: path to the gzip-compressed response body
+:param metadata: dict from the sidecar metadata file
+"""
+
+
+class ResponseArchive:
+    """Directory of raw SUSHI responses, each gzip-compressed, with metadata.
+
+    Every response recorded is kept (unlike a
+    :class:`pycounter.cache.ResponseCache`, which keeps one response per
+    request), in a file named for the time it was fetched, the report and a
+    hash of its content. Next
+    to it, a ``.meta.json`` sidecar file holds the request parameters
+    (without credentials, see :func:`pycounter.cache.normalize_params`) and
+    ``fetched_at``, ``format``, ``size`` and ``sha256`` of the uncompressed
+    body. Both are written to temporary files and renamed into place, the
+    sidecar last, so readers only see complete entries.
+
+    :param directory: directory to keep the archive in (created if needed)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, params, raw):
+        """Archive a raw response as it is passed on.
+
+        :param params: dict of keyword parameters to ``get_sushi_stats_raw``,
+            including ``release``
+        :param raw: the raw response: ``bytes``, or an iterable of ``bytes``
+            chunks
+        :return: the same response. An iterable of chunks is returned as a
+            generator that writes each chunk as it is consumed; the entry is
+            only added once it has been consumed in full.
+        """
+        metadata = normalize_params(params)
+        metadata.setdefault("release", 4)
+        metadata["format"] = "json" if metadata["release"] == 5 else "xml"
+        writer = _EntryWriter(self.directory, metadata)
+        if isinstance(raw, bytes):
+            with writer:
+                writer.write(raw)
+            return raw
+        return writer.tee(raw)
+
+    def entries(self):
+        """List the archived responses, oldest first.
+
+        :return: list of :class:`ArchiveEntry`
+        """
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(_META_SUFFIX):
+                continue
+            with open(os.path.join(self.directory, name), encoding="utf-8") as meta:
+                metadata = json.load(meta)
+            path = os.path.join(self.directory, name[: -len(_META_SUFFIX)] + ".gz")
+            entries.append(ArchiveEntry(path, metadata))
+        return entries
+
+    def open(self, entry):
+        """Open an archived response for reading.
+
+        :param entry: an :class:`ArchiveEntry`
+        :return: binary file object with the decompressed response
+        """
+        return gzip.open(entry.path, "rb")
+
+    def replay(self, entries=None, workers=None):
+        """Convert archived responses back into reports, in parallel.
+
+        Each body is streamed from its file through
+        :func:`pycounter.sushi.raw_to_full` or
+        :func:`pycounter.sushi5.raw_to_full`, as its metadata's ``release``
+        says, in a pool of worker processes (see
+        :func:`pycounter.bulk.parse_many`).
+
+        :param entries: the :class:`ArchiveEntry` objects to replay (default:
+            all of :meth:`entries`)
+        :param workers: number of worker processes. Defaults to the number of
+            CPUs; if 1, responses are converted in this process.
+        :return: list of ``(entry, result)`` tuples in the order of
+            ``entries``, where ``result`` is a
+            :class:`pycounter.report.CounterReport` or, for a response that
+            could not be converted (such as a SUSHI exception),
+            a :class:`pycounter.bulk.FailedParse`
+        """
+        # pylint: disable=protected-access
+        if entries is None:
+            entries = self.entries()
+        jobs = [(entry.path, entry.metadata.get("release", 4)) for entry in entries]
+        if workers == 1:
+            results = [_replay_compact(job) for job in jobs]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(
+                    pool.map(
+                        _replay_compact,
+                        jobs,
+                        chunksize=bulk._chunksize(jobs, workers),
+                    )
+                )
+        return [
+            (entry, bulk._from_result(result))
+            for entry, result in zip(entries, results)
+        ]
+
+
+class _EntryWriter:
+    """Write one archive entry: a compressed body, then its sidecar.
+
+    Use it as a context manager; the temporary file for the body is only
+    created on entering it.
+    """
+
+    def __init__(self, directory, metadata):
+        self.directory = directory
+        self.metadata = metadata
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.fetched_at = datetime.datetime.now(datetime.timezone.utc)
+        self._temp = None
+        self._gzip = None
+
+    def write(self, chunk):
+        """Compress a chunk of the body into the temporary file."""
+        self._gzip.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def tee(self, chunks):
+        """Generate chunks, writing each one, and commit at the end."""
+        with self:
+            for chunk in chunks:
+                self.write(chunk)
+                yield chunk
+
+    def __enter__(self):
+        with contextlib.ExitStack() as cleanup:
+            self._temp = cleanup.enter_context(
+                tempfile.NamedTemporaryFile(
+                    dir=self.directory, prefix=".", suffix=".tmp", delete=False
+                )
+            )
+            cleanup.callback(_remove, self._temp.name)
+            self._gzip = gzip.GzipFile(fileobj=self._temp, mode="wb")
+            # from here on, __exit__ closes and removes the file
+            cleanup.pop_all()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._gzip.close()
+            self._temp.close()
+            if exc_type is None:
+                self._commit()
+        finally:
+            _remove(self._temp.name)
+
+    def _commit(self):
+        """Move the body into place and write its sidecar."""
+        sha256 = self.digest.hexdigest()
+        stem = "%s-%s-%s" % (
+            self.fetched_at.strftime("%Y%m%dT%H%M%S%fZ"),
+            self.metadata.get("report", "report"),
+            sha256[:12],
+        )
+        stem = os.path.join(self.directory, "%s.%s" % (stem, self.metadata["format"]))
+        metadata = dict(
+            self.metadata,
+            fetched_at=self.fetched_at.isoformat(),
+            size=self.size,
+            sha256=sha256,
+        )
+        os.replace(self._temp.name, stem + ".gz")
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, prefix=".", suffix=".tmp", delete=False
+        ) as meta:
+            json.dump(metadata, meta, indent=2, sort_keys=True, default=str)
+        os.replace(meta.name, stem + _META_SUFFIX)
+
+
+def _replay_compact(job):
+    """Convert one archived response (in a worker process) into compact form."""
+    # pylint: disable=import-outside-toplevel
+    from pycounter import sushi
+    from pycounter import sushi5
+
+    path, release = job
+    rtf = sushi5.raw_to_full if release == 5 else sushi.raw_to_full
+    try:
+        with gzip.open(path, "rb") as body:
+            return rtf(body).to_compact()
+    except Exception as exception:  # pylint: disable=broad-except
+        return bulk.FailedParse(path, type(exception).__name__, str(exception))
+
+
+def _remove(path):
+    """Remove a file, if it exists."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
@@ -0,0 +1,311 @@
+"""Fetch SUSHI reports from many servers concurrently with asyncio."""
+
+import asyncio
+import functools
+import inspect
+import logging
+
+from pycounter import sushi
+from pycounter import sushi5
+import pycounter.exceptions
+from pycounter.helpers import split_period
+from pycounter.report import merge_reports
+from pycounter.retry import RetryPolicy
+import pycounter.transport
+
+logger = logging.getLogger(__name__)
+
+#: Default number of requests made to one host at the same time.
+MAX_PER_HOST = 2
+
+
+class ThreadedTransport:
+    """Async HTTP transport that runs :mod:`requests` calls in worker threads.
+
+    A transport is any object with a coroutine method
+    ``request(request, verify=True, timeout=30, **extra_params)`` that takes
+    a :class:`pycounter.transport.Request` and returns the response body as
+    ``bytes``, raising :class:`pycounter.exceptions.ServiceBusyError` for a
+    response that says to retry later. ``extra_params`` are passed on from
+    :func:`get_report_async` (COUNTER 4 only) and use the names of
+    :func:`requests.request` arguments. This one is the default; a transport
+    built on a native async HTTP client can be passed instead.
+
+    :param session: :class:`requests.Session` to make requests with, such as
+        one from :func:`pycounter.transport.make_session` (default: none)
+    :param executor: :class:`concurrent.futures.Executor` to run requests in
+        (default: the event loop's default executor)
+    """
+
+    def __init__(self, session=None, executor=None):
+        self.session = session
+        self.executor = executor
+
+    async def request(self, request, verify=True, timeout=30, **extra_params):
+        """Make a request in a worker thread and return the response body."""
+        call = functools.partial(
+            pycounter.transport.http_client(self.session).request,
+            request.method,
+            request.url,
+            params=request.params,
+            data=request.data,
+            headers=request.headers,
+            verify=verify,
+            timeout=timeout,
+            **extra_params,
+        )
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, call)
+        pycounter.transport.check_busy(response)
+        return response.content
+
+
+class HostLimits:
+    """Limit the number of concurrent requests to each host.
+
+    Calling the object with a URL returns an :class:`asyncio.Semaphore`
+    shared by all requests to that URL's host.
+
+    :param max_per_host: number of requests allowed at once per host
+    :param limiter: :class:`pycounter.transport.HostLimiter` whose
+        ``max_concurrent`` (where set) overrides ``max_per_host``, and whose
+        rate limits requests made with these limits follow
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST, limiter=None):
+        self.max_per_host = max_per_host
+        self.limiter = limiter
+        self._semaphores = {}
+
+    def __call__(self, url):
+        host = pycounter.transport.host_key(url)
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            size = self.max_per_host
+            if self.limiter is not None:
+                max_concurrent = self.limiter.limits(url).max_concurrent
+                if max_concurrent is not None:
+                    size = max_concurrent
+            semaphore = self._semaphores[host] = asyncio.Semaphore(size)
+        return semaphore
+
+
+#: Parameters of :func:`pycounter.sushi.get_report` that
+#: :func:`get_report_async` doesn't take.
+UNSUPPORTED_PARAMS = ("session", "stream", "wait")
+
+
+async def get_report_async(transport=None, host_limits=None, **kwargs):
+    """Get a usage report from a SUSHI server without blocking the event loop.
+
+    The asyncio counterpart of :func:`pycounter.sushi.get_report`, for
+    COUNTER 4 and COUNTER 5. While a queued report is waited for, other
+    tasks keep running, and no per-host slot is held.
+
+    :param transport: async HTTP transport (default: a new
+        :class:`ThreadedTransport`)
+    :param host_limits: :class:`HostLimits` shared with other concurrent
+        requests (default: no sharing, within the limits of ``limiter``)
+    :param kwargs: keyword parameters as for
+        :func:`pycounter.sushi.get_report`, except those in
+        :data:`UNSUPPORTED_PARAMS` (give the transport a session instead).
+        Parts of a report requested with ``chunk_months`` are fetched
+        concurrently, within the host limits; ``max_workers`` is ignored. A
+        ``limiter`` (:class:`pycounter.transport.HostLimiter`) paces requests
+        without blocking the event loop; if not given, that of
+        ``host_limits`` is used. ``cache`` and ``archive`` are used as by
+        :func:`pycounter.sushi.get_report`, with their file operations run
+        in worker threads.
+    :return: a :class:`pycounter.report.CounterReport`
+    :raises TypeError: for a parameter in :data:`UNSUPPORTED_PARAMS`
+    """
+    for name in UNSUPPORTED_PARAMS:
+        if name in kwargs:
+            raise TypeError("get_report_async() does not support %r" % name)
+    if transport is None:
+        transport = ThreadedTransport()
+    limiter = kwargs.pop("limiter", None)
+    if host_limits is None:
+        host_limits = HostLimits(limiter=limiter)
+    elif limiter is None:
+        limiter = host_limits.limiter
+    chunk_months = kwargs.pop("chunk_months", None)
+    kwargs.pop("max_workers", None)
+    if chunk_months:
+        chunks = split_period((kwargs["start_date"], kwargs["end_date"]), chunk_months)
+        if len(chunks) > 1:
+            reports = await asyncio.gather(
+                *(
+                    get_report_async(
+                        transport=transport,
+                        host_limits=host_limits,
+                        limiter=limiter,
+                        **dict(kwargs, start_date=start, end_date=end),
+                    )
+                    for start, end in chunks
+                )
+            )
+            return merge_reports(reports)
+    send = functools.partial(
+        _send, transport, host_limits, limiter, kwargs.pop("sushi_dump", False)
+    )
+    return await _get_report(send, kwargs)
+
+
+async def _get_report(send, kwargs):
+    """Get one report, retrying while the service is busy.
+
+    :param send: coroutine function sending a request with transport
+        options, as :func:`_send` with its first arguments bound
+    :param kwargs: the remaining keyword parameters of
+        :func:`get_report_async`
+    """
+    no_delay = kwargs.pop("no_delay", False)
+    retry_policy = kwargs.pop("retry_policy", None)
+    if retry_policy is None:
+        retry_policy = RetryPolicy.immediate() if no_delay else RetryPolicy()
+    store = _ResponseStore(kwargs.pop("cache", None), kwargs.pop("archive", None))
+    options = {"verify": kwargs.pop("verify", True)}
+    if "timeout" in kwargs:
+        options["timeout"] = kwargs.pop("timeout")
+    if kwargs.get("release") == 5:
+        make_request, rtf = _c5_request_maker()
+    else:
+        make_request, rtf = _c4_request_maker(kwargs, options)
+
+    store.params = dict(kwargs, release=kwargs.get("release", 4))
+    report = await store.get(rtf)
+    if report is not None:
+        return report
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    attempts = 0
+    while True:
+        request = make_request(**kwargs)
+        attempts += 1
+        try:
+            raw_report = await send(request, options)
+            await store.record(raw_report)
+            report = await asyncio.to_thread(rtf, raw_report)
+        except pycounter.exceptions.ServiceBusyError as error:
+            delay = retry_policy.next_delay(attempts, loop.time() - started, error)
+            logger.info(
+                "Service busy at %s, retrying in %d seconds", request.url, delay
+            )
+            await asyncio.sleep(delay)
+        else:
+            await store.put(raw_report)
+            return report
+
+
+async def _send(transport, host_limits, limiter, sushi_dump, request, options):
+    """Send a request within the host's limits, and return the response body."""
+    async with host_limits(request.url):
+        if limiter is not None:
+            await asyncio.sleep(limiter.reserve(request.url))
+        raw_report = await transport.request(request, **options)
+    if sushi_dump:
+        logger.debug("SUSHI DUMP: request: %s \n\n response: %s", request, raw_report)
+    return raw_report
+
+
+def _c4_request_maker(kwargs, options):
+    """Get the functions to make and convert COUNTER 4 requests.
+
+    Parameters that aren't for :func:`pycounter.sushi._report_request` are
+    moved from ``kwargs`` to the transport ``options``.
+
+    :return: tuple of functions making a :class:`pycounter.transport.Request`
+        from ``kwargs``, and converting the response to a report
+    """
+    # pylint: disable=protected-access
+    sushi._drop_api_key(kwargs)
+    request_args = inspect.signature(sushi._report_request).parameters
+    for key in list(kwargs):
+        if key not in request_args:
+            options[key] = kwargs.pop(key)
+    return sushi._report_request, sushi.raw_to_full
+
+
+def _c5_request_maker():
+    """Get the functions to make and convert COUNTER 5 requests.
+
+    :return: tuple of functions making a :class:`pycounter.transport.Request`
+        from keyword parameters, and converting the response to a report
+    """
+    # pylint: disable=protected-access
+    return sushi5._report_request, sushi5.raw_to_full
+
+
+class _ResponseStore:
+    """The optional cache and archive of a report request.
+
+    :param cache: :class:`pycounter.cache.ResponseCache` or None
+    :param archive: :class:`pycounter.archive.ResponseArchive` or None
+    """
+
+    def __init__(self, cache, archive):
+        self.cache = cache
+        self.archive = archive
+        #: request parameters, for the cache key and archive metadata
+        self.params = None
+
+    async def get(self, rtf):
+        """Get the report from the cache.
+
+        :param rtf: function converting a raw response to a report
+        :return: the report, or None if it isn't cached
+        """
+        if self.cache is None:
+            return None
+        cached = await asyncio.to_thread(self.cache.get, self.cache.key(self.params))
+        if cached is None:
+            return None
+        return await asyncio.to_thread(rtf, cached)
+
+    async def record(self, raw):
+        """Archive a response fetched from the server."""
+        if self.archive is not None:
+            await asyncio.to_thread(self.archive.record, self.params, raw)
+
+    async def put(self, raw):
+        """Cache a response that converted without error."""
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, self.cache.key(self.params), raw)
+
+
+async def get_reports_async(
+    report_requests,
+    transport=None,
+    max_per_host=MAX_PER_HOST,
+    return_exceptions=True,
+    limiter=None,
+):
+    """Get many usage reports concurrently.
+
+    :param report_requests: iterable of dicts of keyword parameters for
+        :func:`get_report_async`, one per report
+    :param transport: async HTTP transport shared by all requests (default:
+        a new :class:`ThreadedTransport`)
+    :param max_per_host: number of requests made to one host at the same
+        time
+    :param return_exceptions: if true, a request that fails gives its
+        exception in place of a report; if false, the first failure is
+        raised
+    :param limiter: :class:`pycounter.transport.HostLimiter` with rate
+        limits, and concurrency limits overriding ``max_per_host``, for
+        particular hosts
+    :return: list of :class:`pycounter.report.CounterReport` (or
+        exceptions), in the order of ``report_requests``
+    """
+    if transport is None:
+        transport = ThreadedTransport()
+    host_limits = HostLimits(max_per_host, limiter)
+    return await asyncio.gather(
+        *(
+            get_report_async(transport=transport, host_limits=host_limits, **kwargs)
+            for kwargs in report_requests
+        ),
+        return_exceptions=return_exceptions,
+    )
@@ -0,0 +1,266 @@
+"""Parse many COUNTER reports in parallel."""
+
+import collections
+import concurrent.futures
+import gzip
+import os
+import pickle
+import sys
+import time
+
+import click
+
+from pycounter import report as counter_report
+
+FailedParse = collections.namedtuple("FailedParse", "path error_type message")
+FailedParse.__doc__ = """A file that could not be parsed by :py:func:`parse_many`.
+
+:param path: the path that was being parsed
+:param error_type: name of the exception's class
+:param message: the exception's message
+"""
+
+ConvertedFile = collections.namedtuple(
+    "ConvertedFile", "path output report_type items size"
+)
+ConvertedFile.__doc__ = """A SUSHI response converted by :py:func:`convert_sushi_files`.
+
+:param path: the path of the response file
+:param output: the path the report was written to
+:param report_type: the report's type, such as ``JR1``
+:param items: the number of resources (rows) in the report
+:param size: the size of the response file in bytes
+"""
+
+#: File name extensions for the output formats of :py:func:`convert_sushi_files`.
+OUTPUT_EXTENSIONS = {"tsv": ".tsv", "compact": ".pickle"}
+
+
+def parse_many(
+    paths, workers=None, filetype=None, encoding="utf-8", fallback_encoding="latin-1"
+):
+    """Parse many COUNTER files, spread across a pool of worker processes.
+
+    Reports are sent back from the workers in the compact form produced by
+    :py:meth:`CounterReport.to_compact
+    <pycounter.report.CounterReport.to_compact>`.
+
+    :param paths: sequence of paths to COUNTER report files
+    :param workers: number of worker processes. Defaults to the number of
+        CPUs; if 1, files are parsed in this process without a pool.
+    :param filetype: file type for all files, as for
+        :py:func:`pycounter.report.parse`; by default, guessed per file.
+    :param encoding: encoding to use to decode the files.
+    :param fallback_encoding: alternative encoding to use to try to decode
+        a file if the primary encoding fails.
+    :return: list with, in the same order as ``paths``, a
+        :class:`CounterReport <pycounter.report.CounterReport>` for each
+        file that was parsed and a :py:class:`FailedParse` for each that
+        could not be.
+    """
+    jobs = [(path, filetype, encoding, fallback_encoding) for path in paths]
+    if workers == 1:
+        results = map(_parse_compact, jobs)
+        return [_from_result(result) for result in results]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _parse_compact, jobs, chunksize=_chunksize(jobs, workers)
+        )
+        return [_from_result(result) for result in results]
+
+
+def convert_sushi_files(
+    paths, workers=None, output_format="tsv", output_dir=None, release=4
+):
+    """Convert many raw SUSHI responses saved on disk, in parallel.
+
+    Each file is streamed from disk into :py:func:`pycounter.sushi.raw_to_full`
+    (or :py:func:`pycounter.sushi5.raw_to_full` for release 5) in a worker
+    process, which writes the report out itself, so that only a short
+    summary is sent back. Files ending in ``.gz`` (such as those kept by
+    :py:class:`pycounter.archive.ResponseArchive`) are decompressed as they
+    are read.
+
+    :param paths: sequence of paths to SUSHI response files
+    :param workers: number of worker processes. Defaults to the number of
+        CPUs; if 1, files are converted in this process without a pool.
+    :param output_format: ``tsv`` to write each report as TSV, or
+        ``compact`` to write it as a pickle of the compact form from
+        :py:meth:`CounterReport.to_compact
+        <pycounter.report.CounterReport.to_compact>` (read it back with
+        :py:func:`read_compact`)
+    :param output_dir: directory to write the outputs to (default: next to
+        each input file). The output's name is the input's, with the
+        extension from :py:data:`OUTPUT_EXTENSIONS`.
+    :param release: SUSHI release of all the responses (4 or 5)
+    :return: list with, in the same order as ``paths``, a
+        :py:class:`ConvertedFile` for each file that was converted and a
+        :py:class:`FailedParse` for each that could not be.
+    """
+    if output_format not in OUTPUT_EXTENSIONS:
+        raise ValueError("Unknown output format %r" % output_format)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, output_format, output_dir, release) for path in paths]
+    if workers == 1:
+        return [_convert_sushi(job) for job in jobs]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(_convert_sushi, jobs, chunksize=_chunksize(jobs, workers))
+        )
+
+
+def read_compact(path):
+    """Read a report written by :py:func:`convert_sushi_files` in compact form.
+
+    The file is unpickled, so only read files from a trusted source.
+
+    :param path: path to the file
+    :return: :class:`CounterReport <pycounter.report.CounterReport>`
+    """
+    with open(path, "rb") as compact_file:
+        return counter_report.CounterReport.from_compact(pickle.load(compact_file))
+
+
+def _chunksize(jobs, workers=None):
+    """Number of jobs to hand to a worker at a time."""
+    workers = workers or os.cpu_count() or 1
+    return max(1, len(jobs) // (workers * 4))
+
+
+def _parse_compact(job):
+    """Parse one file (in a worker process) into compact form."""
+    path, filetype, encoding, fallback_encoding = job
+    try:
+        return counter_report.parse(
+            path, filetype, encoding, fallback_encoding
+        ).to_compact()
+    except Exception as exception:  # pylint: disable=broad-except
+        return FailedParse(path, type(exception).__name__, str(exception))
+
+
+def _convert_sushi(job):
+    """Convert one SUSHI response file (in a worker process) and write it out."""
+    # pylint: disable=import-outside-toplevel
+    from pycounter import sushi
+    from pycounter import sushi5
+
+    path, output_format, output_dir, release = job
+    rtf = sushi5.raw_to_full if release == 5 else sushi.raw_to_full
+    opener = gzip.open if path.endswith(".gz") else open
+    name = os.path.basename(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    name = os.path.splitext(name)[0] + OUTPUT_EXTENSIONS[output_format]
+    output = os.path.join(output_dir or os.path.dirname(path), name)
+    try:
+        with opener(path, "rb") as raw:
+            report = rtf(raw)
+        if output_format == "tsv":
+            report.write_tsv(output)
+        else:
+            with open(output, "wb") as compact_file:
+                pickle.dump(report.to_compact(), compact_file, pickle.HIGHEST_PROTOCOL)
+        return ConvertedFile(
+            path, output, report.report_type, len(report.pubs), os.path.getsize(path)
+        )
+    except Exception as exception:  # pylint: disable=broad-except
+        return FailedParse(path, type(exception).__name__, str(exception))
+
+
+def _from_result(result):
+    """Turn a worker's result back into a report, if it succeeded."""
+    if isinstance(result, FailedParse):
+        return result
+    return counter_report.CounterReport.from_compact(result)
+
+
+@click.group()
+def main():
+    """Bulk processing of COUNTER reports."""
+
+
+@main.command("parse")
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--workers", "-w", type=int, help="number of worker processes (default CPUs)"
+)
+@click.option(
+    "--output_dir",
+    "-o",
+    type=click.Path(file_okay=False, writable=True),
+    help="write each parsed report as TSV to this directory",
+)
+def parse_command(paths, workers, output_dir):
+    """Parse COUNTER report files and summarize each one."""
+    failed = False
+    for path, result in zip(paths, parse_many(paths, workers=workers)):
+        if isinstance(result, FailedParse):
+            failed = True
+            click.echo(f"{path}\tERROR\t{result.error_type}: {result.message}")
+            continue
+        click.echo(f"{path}\t{result.report_type}\t{len(result.pubs)}")
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0] + ".tsv"
+            result.write_tsv(os.path.join(output_dir, name))
+    if failed:
+        sys.exit(1)
+
+
+@main.command("convert-sushi")
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--workers", "-w", type=int, help="number of worker processes (default CPUs)"
+)
+@click.option(
+    "--format",
+    "-f",
+    "output_format",
+    type=click.Choice(sorted(OUTPUT_EXTENSIONS)),
+    default="tsv",
+    show_default=True,
+    help="output format",
+)
+@click.option(
+    "--output_dir",
+    "-o",
+    type=click.Path(file_okay=False, writable=True),
+    help="write the reports to this directory (default: next to each file)",
+)
+@click.option(
+    "--release", "-r", type=click.Choice(["4", "5"]), default="4", show_default=True
+)
+def convert_sushi_command(paths, workers, output_format, output_dir, release):
+    """Convert raw SUSHI response files to reports."""
+    started = time.perf_counter()
+    results = convert_sushi_files(
+        paths,
+        workers=workers,
+        output_format=output_format,
+        output_dir=output_dir,
+        release=int(release),
+    )
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    failed = False
+    items = size = 0
+    for result in results:
+        if isinstance(result, FailedParse):
+            failed = True
+            click.echo(f"{result.path}\tERROR\t{result.error_type}: {result.message}")
+            continue
+        items += result.items
+        size += result.size
+        click.echo(f"{result.path}\t{result.report_type}\t{result.items}")
+    click.echo(
+        f"{len(results)} files, {items} items, {size / 1e6:.1f} MB in "
+        f"{elapsed:.2f}s: {len(results) / elapsed:.1f} files/s, "
+        f"{items / elapsed:.1f} items/s, {size / 1e6 / elapsed:.2f} MB/s",
+        err=True,
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""On-disk cache of raw SUSHI responses."""
+
+import contextlib
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+#: Request parameters left out of cache keys: credentials, and options that
+#: don't change the content of the response.
+IGNORED_PARAMS = frozenset(
+    {
+        "api_key",
+        "requestor_id",
+        "requestor_email",
+        "requestor_name",
+        "sushi_dump",
+        "verify",
+        "session",
+        "limiter",
+        "stream",
+        "timeout",
+    }
+)
+
+_SUFFIX = ".gz"
+
+
+def normalize_params(params):
+    """Reduce request parameters to those that determine the response.
+
+    Parameters in :data:`IGNORED_PARAMS` or set to None are left out, the URL
+    (``url`` or ``wsdl_url``) is stored as ``url`` without a trailing slash,
+    and dates are converted to ISO format strings.
+
+    :param params: dict of keyword parameters to ``get_sushi_stats_raw``
+    :return: dict
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name in IGNORED_PARAMS or value is None:
+            continue
+        if name in ("url", "wsdl_url"):
+            name, value = "url", value.strip().rstrip("/")
+        elif isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        normalized[name] = value
+    return normalized
+
+
+class ResponseCache:
+    """Cache of raw SUSHI response bodies in a directory, gzip-compressed.
+
+    Entries are keyed by a hash of the request parameters (see
+    :meth:`key`). Entries older than ``ttl`` are ignored and removed, and
+    when the cache grows past ``max_size`` the least recently used entries
+    are removed. Several processes may share a cache directory: entries are
+    written to a temporary file and renamed into place, and eviction is
+    serialized with a lock file (on platforms with :mod:`fcntl`).
+
+    :param directory: directory to keep the cache in (created if needed)
+    :param ttl: seconds an entry stays valid, or None for no limit
+    :param max_size: greatest total size of entries in bytes (compressed),
+        or None for no limit
+    """
+
+    def __init__(self, directory, ttl=None, max_size=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(params):
+        """Make the cache key for a request.
+
+        :param params: dict of keyword parameters to ``get_sushi_stats_raw``,
+            normalized by :func:`normalize_params`
+        :return: hex digest string
+        """
+        encoded = json.dumps(normalize_params(params), sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        """Path of the file holding a cache entry."""
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def open(self, key):
+        """Open a cached response for reading.
+
+        :param key: cache key from :meth:`key`
+        :return: binary file object with the decompressed response, or None
+            if there is no valid entry
+        """
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                with self._lock():
+                    _remove(path)
+                return None
+            file_obj = gzip.open(path, "rb")
+            # the access time records use, for least-recently-used eviction
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        return file_obj
+
+    def get(self, key):
+        """Get a cached response.
+
+        :param key: cache key from :meth:`key`
+        :return: the response body as bytes, or None
+        """
+        file_obj = self.open(key)
+        if file_obj is None:
+            return None
+        with file_obj:
+            return file_obj.read()
+
+    def put(self, key, data):
+        """Store a response.
+
+        :param key: cache key from :meth:`key`
+        :param data: response body as bytes
+        """
+        with self.writer(key) as writer:
+            writer.write(data)
+
+    @contextlib.contextmanager
+    def writer(self, key):
+        """Store a response written in pieces.
+
+        The entry is only added if the ``with`` block finishes without an
+        error::
+
+            with cache.writer(key) as writer:
+                for chunk in chunks:
+                    writer.write(chunk)
+
+        :param key: cache key from :meth:`key`
+        """
+        temp = tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=".", suffix=".tmp", delete=False
+        )
+        try:
+            with temp, gzip.GzipFile(fileobj=temp, mode="wb") as writer:
+                yield writer
+            with self._lock():
+                os.replace(temp.name, self._path(key))
+                self._evict()
+        finally:
+            _remove(temp.name)
+
+    def fetch(self, params, fetch_raw, convert):
+        """Get a report through the cache.
+
+        :param params: request parameters, for :meth:`key`
+        :param fetch_raw: function returning the raw response: ``bytes``, or
+            an iterable of ``bytes`` chunks
+        :param convert: function making a report from a raw response, as
+            ``bytes`` or a binary file object (such as ``raw_to_full``)
+        :return: the converted report. The raw response is only cached if it
+            converts without error.
+        """
+        key = self.key(params)
+        cached = self.open(key)
+        if cached is not None:
+            with cached:
+                return convert(cached)
+        raw = fetch_raw()
+        if isinstance(raw, bytes):
+            report = convert(raw)
+            self.put(key, raw)
+            return report
+        with self.writer(key) as writer:
+            return convert(_tee(raw, writer))
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock():
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(_SUFFIX):
+                    _remove(entry.path)
+
+    def _evict(self):
+        """Remove expired entries, then old ones until under max_size."""
+        if self.ttl is None and self.max_size is None:
+            return
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                _remove(entry.path)
+            else:
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+        if self.max_size is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            _remove(path)
+            total -= size
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """Hold the cache directory's lock file."""
+        if fcntl is None:  # pragma: no cover
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _tee(chunks, writer):
+    """Generate chunks, writing each one to writer as well."""
+    for chunk in chunks:
+        writer.write(chunk)
+        yield chunk
+
+
+def _remove(path):
+    """Remove a file, if it exists."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
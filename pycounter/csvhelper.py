@@ -1,8 +1,16 @@
 """Read CSV as unicode from both python 2 and 3 transparently."""
 
+import codecs
 import csv
+import re
 import warnings
 
+#: Number of bytes read from a file at a time by :class:`UnicodeReader`.
+CHUNK_SIZE = 64 * 1024
+
+# split text after each line ending, keeping "\r\n" together
+_LINE_END = re.compile(r"(?<=\n)|(?<=\r)(?!\n)")
+
 
 # noinspection PyUnusedLocal
 class UnicodeReader:
@@ -13,11 +21,14 @@ class UnicodeReader:
     with UnicodeReader('myfile.csv') as reader:
         pass # do things with reader
 
-    :param filename: path to file to open
+    :param filename: path to file to open, or a binary file object to read
+        from (which is left open when the context manager exits)
     :param dialect: a csv.Dialect instance or dialect name
     :param encoding: text encoding of file
     :param fallback_encoding: encoding to fall back to if default
-             encoding fails; gives warning if it's used.
+             encoding fails; gives warning if it's used. The file is
+             decoded in chunks as it is read, and the fallback applies
+             from the first chunk that fails to decode.
 
     All other parameters will be passed through to csv.reader()
     """
@@ -39,25 +50,53 @@ class UnicodeReader:
         self.fallback_encoding = fallback_encoding
 
     def __enter__(self):
-        self.fileobj = open(self.filename, "rt", encoding=self.encoding, newline="")
-        try:
-            self.fileobj.read()
-        except UnicodeDecodeError:
-            warnings.warn(
-                "Decoding with '%s' codec failed; falling "
-                "back to '%s'" % (self.encoding, self.fallback_encoding)
-            )
-            self.fileobj = open(
-                self.filename, "rt", encoding=self.fallback_encoding, newline=""
-            )
-            self.encoding = self.fallback_encoding
-        finally:
-            self.fileobj.seek(0)
-        self.reader = csv.reader(self.fileobj, dialect=self.dialect, **self.kwargs)
+        if hasattr(self.filename, "read"):
+            self.fileobj = self.filename
+        else:
+            self.fileobj = open(self.filename, "rb")
+        self.reader = csv.reader(
+            self._iter_lines(), dialect=self.dialect, **self.kwargs
+        )
         return self
 
     def __exit__(self, type_, value, traceback):
-        self.fileobj.close()
+        if self.fileobj is not self.filename:
+            self.fileobj.close()
+
+    def _iter_lines(self):
+        """Decode the file in chunks, yielding lines with their endings.
+
+        If a chunk fails to decode, the rest of the file (including any
+        bytes the decoder was still holding from the previous chunk) is
+        decoded with the fallback encoding instead.
+        """
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        pending = ""
+        while True:
+            chunk = self.fileobj.read(CHUNK_SIZE)
+            final = not chunk
+            undecoded = decoder.getstate()[0]
+            try:
+                text = decoder.decode(chunk, final)
+            except UnicodeDecodeError:
+                warnings.warn(
+                    "Decoding with '%s' codec failed; falling "
+                    "back to '%s'" % (self.encoding, self.fallback_encoding)
+                )
+                self.encoding = self.fallback_encoding
+                decoder = codecs.getincrementaldecoder(self.encoding)()
+                text = decoder.decode(undecoded + chunk, final)
+
+            lines = _LINE_END.split(pending + text)
+            pending = lines.pop()
+            if not final and lines and lines[-1].endswith("\r"):
+                # a "\n" may still follow at the start of the next chunk
+                pending = lines.pop() + pending
+            yield from lines
+            if final:
+                break
+        if pending:
+            yield pending
 
     def __next__(self):
         return next(self.reader)
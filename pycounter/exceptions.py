@@ -23,7 +23,24 @@ class ServiceNotAvailableError(SushiException):
 
 
 class ServiceBusyError(SushiException):
-    """Fatal error: server is too busy; try again later."""
+    """Fatal error: server is too busy; try again later.
+
+    Attributes:
+        retry_after: seconds the server asked us to wait before retrying,
+            or None
+    """
+
+    def __init__(self, message, raw=None, xml=None, retry_after=None):
+        super().__init__(message, raw=raw, xml=xml)
+        self.retry_after = retry_after
+
+
+class RetriesExhaustedError(ServiceBusyError):
+    """Gave up retrying a busy service or queued report.
+
+    Raised when a :class:`pycounter.retry.RetryPolicy` runs out of attempts
+    or time; the last :class:`ServiceBusyError` is its ``__cause__``.
+    """
 
 
 class TooManyRequestsError(SushiException):
@@ -53,6 +70,10 @@ class Sushi5Error(SushiException):
         self.code = code
 
 
+class Sushi5BusyError(Sushi5Error, ServiceBusyError):
+    """SUSHI release 5 service is busy or has queued the report."""
+
+
 class ReportNotSupportedError(SushiException):
     """Server cannot serve the requested report name or version."""
 
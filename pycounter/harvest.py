@@ -0,0 +1,428 @@
+"""Harvest many SUSHI reports, described in a provider config file."""
+
+import collections
+import concurrent.futures
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+from pycounter import sushi
+from pycounter.helpers import convert_date_run, last_day, prev_month, split_period
+from pycounter.report import CounterReport, merge_reports
+from pycounter.transport import HostLimiter
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    import tomli as tomllib
+
+#: Default number of reports fetched at the same time.
+WORKERS = 4
+
+#: Default name of each output file, relative to the output directory.
+OUTPUT_TEMPLATE = "{name}_{report}_{start}_{end}.{format}"
+
+#: Keys of a provider entry passed on to :func:`pycounter.sushi.get_report`.
+REQUEST_KEYS = frozenset(
+    {
+        "url",
+        "release",
+        "requestor_id",
+        "requestor_email",
+        "requestor_name",
+        "customer_reference",
+        "customer_name",
+        "api_key",
+        "verify",
+        "chunk_months",
+    }
+)
+
+#: Other keys allowed in a provider entry.
+PROVIDER_KEYS = frozenset(
+    {
+        "name",
+        "report",
+        "reports",
+        "start_date",
+        "end_date",
+        "format",
+        "output",
+        "rate",
+        "burst",
+        "max_concurrent",
+    }
+)
+
+HarvestJob = collections.namedtuple(
+    "HarvestJob", "provider report start_date end_date output_file format_ request"
+)
+HarvestJob.__doc__ = """One report to fetch, from :py:func:`load_config`.
+
+:param provider: the provider's name
+:param report: report name, such as ``JR1`` or ``TR_J1``
+:param start_date: first day of the report period
+:param end_date: last day of the report period
+:param output_file: path to write the report to
+:param format_: output format, as for
+    :py:meth:`CounterReport.write_to_file
+    <pycounter.report.CounterReport.write_to_file>`
+:param request: dict of keyword parameters for
+    :py:func:`pycounter.sushi.get_report`
+"""
+
+HarvestResult = collections.namedtuple(
+    "HarvestResult", "job error elapsed skipped", defaults=(False,)
+)
+HarvestResult.__doc__ = """The outcome of a :py:class:`HarvestJob`.
+
+:param job: the job
+:param error: the exception that stopped it, or None if the report was
+    written
+:param elapsed: seconds taken
+:param skipped: True if the job wasn't run because a :py:class:`Journal`
+    says it was already done
+"""
+
+BatchConfig = collections.namedtuple("BatchConfig", "jobs limiter")
+BatchConfig.__doc__ = """A harvest read by :py:func:`load_config`.
+
+:param jobs: list of :py:class:`HarvestJob`
+:param limiter: :class:`pycounter.transport.HostLimiter` with the providers'
+    rate and concurrency limits
+"""
+
+
+def load_config(path, output_dir=None, today=None):
+    """Read a harvest config file.
+
+    The file is TOML, with an optional ``[defaults]`` table of settings for
+    all providers and a ``[[providers]]`` table for each provider::
+
+        [defaults]
+        release = 5
+        start_date = "2023-01"
+        end_date = "2023-12"
+
+        [[providers]]
+        name = "Example"
+        url = "https://sushi.example.com/counter/r5"
+        requestor_id = "..."
+        customer_reference = "..."
+        reports = ["TR_J1", "DR_D1"]
+        rate = 0.5
+        max_concurrent = 1
+
+    ``name`` and ``url`` are required. ``report`` (or a list of ``reports``)
+    defaults to ``JR1``, ``release`` to 4 and the dates to last month, as
+    for ``sushiclient``; dates are ``YYYY-MM-DD`` or ``YYYY-MM`` strings or
+    TOML dates, and the end date is moved to the end of its month.
+    ``output`` is a template for the output file name, with the fields
+    ``name``, ``report``, ``release``, ``start``, ``end`` (as ``YYYY-MM``)
+    and ``format`` (default :data:`OUTPUT_TEMPLATE`). ``rate``, ``burst``
+    and ``max_concurrent`` limit requests to the provider's host (see
+    :class:`pycounter.transport.HostLimiter`). Other keys are the
+    parameters of :func:`pycounter.sushi.get_report` listed in
+    :data:`REQUEST_KEYS`.
+
+    :param path: path to the file
+    :param output_dir: directory for output files with relative names
+        (default: the current directory)
+    :param today: date to find last month from (default: today)
+    :return: a :py:class:`BatchConfig`
+    :raises ValueError: if the file has an unknown key or lacks a required
+        one
+    """
+    with open(path, "rb") as config_file:
+        config = tomllib.load(config_file)
+    defaults = config.get("defaults", {})
+    default_start = prev_month(today or datetime.date.today())
+    jobs = []
+    hosts = {}
+    for number, entry in enumerate(config.get("providers", []), 1):
+        entry = dict(defaults, **entry)
+        _check_provider(number, entry)
+        limits = {
+            key: entry[key]
+            for key in ("rate", "burst", "max_concurrent")
+            if key in entry
+        }
+        if limits:
+            hosts[entry["url"]] = limits
+        jobs.extend(_provider_jobs(entry, default_start, output_dir))
+    return BatchConfig(jobs, HostLimiter(hosts=hosts))
+
+
+def _check_provider(number, entry):
+    """Check a provider entry for unknown keys and missing required ones.
+
+    :param number: the provider's position in the file, counting from 1
+    :param entry: dict of the provider's settings, with the defaults
+    :raises ValueError: if a key is unknown or missing
+    """
+    unknown = set(entry) - REQUEST_KEYS - PROVIDER_KEYS
+    if unknown:
+        raise ValueError(
+            "Unknown key(s) for provider %d: %s" % (number, ", ".join(sorted(unknown)))
+        )
+    for key in ("name", "url"):
+        if key not in entry:
+            raise ValueError("Provider %d has no %s" % (number, key))
+
+
+def _provider_jobs(entry, default_start, output_dir):
+    """Make a :py:class:`HarvestJob` for each report of a provider entry."""
+    start_date = _to_date(entry.get("start_date", default_start))
+    end_date = last_day(_to_date(entry.get("end_date", start_date)))
+    format_ = entry.get("format", "tsv")
+    request = {key: entry[key] for key in REQUEST_KEYS if key in entry}
+    if request.get("release", 4) != 5:
+        request["wsdl_url"] = request.pop("url")
+    jobs = []
+    for report in entry.get("reports", [entry.get("report", "JR1")]):
+        output_file = entry.get("output", OUTPUT_TEMPLATE).format(
+            name=_safe_name(entry["name"]),
+            report=report,
+            release=request.get("release", 4),
+            start=start_date.strftime("%Y-%m"),
+            end=end_date.strftime("%Y-%m"),
+            format=format_,
+        )
+        if output_dir is not None:
+            output_file = os.path.join(output_dir, output_file)
+        jobs.append(
+            HarvestJob(
+                entry["name"],
+                report,
+                start_date,
+                end_date,
+                output_file,
+                format_,
+                dict(
+                    request,
+                    report=report,
+                    start_date=start_date,
+                    end_date=end_date,
+                ),
+            )
+        )
+    return jobs
+
+
+class Journal:
+    """Checkpoint file recording which parts of a harvest have finished.
+
+    Each job is harvested in units of one month, or of the job's
+    ``chunk_months`` if it has them (see :meth:`units`). Each finished unit
+    is appended to the file as one line of JSON, and the file is flushed to
+    disk, so the record survives the harvest being killed; a line cut short
+    by a crash is ignored when the file is read. The unit's report is kept
+    in compact form in a directory next to the journal, so that a job
+    interrupted part way through only fetches the units it hasn't got, and
+    a job whose output file has gone is rebuilt without fetching anything.
+
+    The kept reports are unpickled when read, so only use a journal from a
+    trusted source.
+
+    :param path: path to the journal file (created if needed)
+    :param parts_dir: directory to keep the units' reports in (default: the
+        journal's path with ``.parts`` added)
+    """
+
+    def __init__(self, path, parts_dir=None):
+        self.path = path
+        self.parts_dir = parts_dir or path + ".parts"
+        self._lock = threading.Lock()
+        self._done = {}
+        # whether the file ends in a line cut short, to be ended before the
+        # next record
+        self._torn = False
+        try:
+            with open(path, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                        unit = tuple(record["unit"])
+                        done = record.get("status") == "done"
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self._done[unit] = done
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def units(job):
+        """Split a job into the units recorded in the journal.
+
+        :param job: a :py:class:`HarvestJob`
+        :return: list of keys (provider, report, start, end), with ISO
+            format dates, from :func:`pycounter.helpers.split_period`
+        """
+        months = job.request.get("chunk_months") or 1
+        return [
+            (job.provider, job.report, start.isoformat(), end.isoformat())
+            for start, end in split_period((job.start_date, job.end_date), months)
+        ]
+
+    def is_done(self, job):
+        """Whether all of a job's units have finished and its output is there."""
+        return os.path.exists(job.output_file) and all(
+            self.unit_report_path(unit) is not None for unit in self.units(job)
+        )
+
+    def unit_report_path(self, unit):
+        """Get the path of the kept report of a finished unit, or None."""
+        path = self._part_path(unit)
+        if self._done.get(unit, False) and os.path.exists(path):
+            return path
+        return None
+
+    def unit_report(self, unit):
+        """Get the report of a finished unit, or None if it isn't done.
+
+        :param unit: key from :meth:`units`
+        :return: :class:`CounterReport <pycounter.report.CounterReport>`
+        """
+        path = self.unit_report_path(unit)
+        if path is None:
+            return None
+        with open(path, "rb") as part_file:
+            return CounterReport.from_compact(pickle.load(part_file))
+
+    def _part_path(self, unit):
+        """Path to keep the report of a unit in, named by a hash of the unit."""
+        digest = hashlib.sha256(json.dumps(unit).encode("utf-8")).hexdigest()
+        return os.path.join(self.parts_dir, digest + ".pickle")
+
+    def record(self, unit, report=None, error=None, elapsed=0.0):
+        """Keep the report of a finished unit, and append its outcome.
+
+        :param unit: key from :meth:`units`
+        :param report: the unit's report, if it was fetched
+        :param error: the exception that stopped it, if it wasn't
+        :param elapsed: seconds taken
+        """
+        path = self._part_path(unit)
+        if report is not None:
+            os.makedirs(self.parts_dir, exist_ok=True)
+            temp_path = "%s.%d.tmp" % (path, threading.get_ident())
+            with open(temp_path, "wb") as part_file:
+                pickle.dump(report.to_compact(), part_file)
+                part_file.flush()
+                os.fsync(part_file.fileno())
+            os.replace(temp_path, path)
+        record = {
+            "unit": unit,
+            "status": "done" if error is None else "failed",
+            "finished_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed": round(elapsed, 3),
+        }
+        if error is not None:
+            record["error"] = "%s: %s" % (type(error).__name__, error)
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._torn:
+                line = "\n" + line
+                self._torn = False
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write(line)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self._done[unit] = error is None
+
+
+def run_jobs(jobs, workers=WORKERS, callback=None, journal=None, **kwargs):
+    """Fetch the reports for many jobs concurrently, writing each one out.
+
+    Each report is written to its output file as soon as it has been
+    fetched. A failed job doesn't stop the others.
+
+    :param jobs: sequence of :py:class:`HarvestJob`
+    :param workers: number of reports to fetch at the same time
+    :param callback: function called with each :py:class:`HarvestResult`
+        as soon as the job finishes (in the calling thread)
+    :param journal: :py:class:`Journal` to record each finished month (or
+        chunk) of each job in. Jobs it lists as done are skipped, and only
+        the units it hasn't got are fetched for the others, so that running
+        the same jobs again after an interruption only fetches failed or
+        missing parts.
+    :param kwargs: more keyword parameters for every
+        :func:`pycounter.sushi.get_report` call, such as ``session``,
+        ``limiter``, ``cache`` or ``retry_policy``
+    :return: list of :py:class:`HarvestResult`, in the order of ``jobs``
+    """
+    results = [None] * len(jobs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for index, job in enumerate(jobs):
+            if journal is not None and journal.is_done(job):
+                results[index] = HarvestResult(job, None, 0.0, skipped=True)
+                if callback is not None:
+                    callback(results[index])
+            else:
+                futures[executor.submit(_run_job, job, kwargs, journal)] = index
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if callback is not None:
+                callback(result)
+    return results
+
+
+def _run_job(job, kwargs, journal=None):
+    """Fetch and write one report (in a worker thread)."""
+    started = time.perf_counter()
+    try:
+        if journal is None:
+            report = sushi.get_report(**job.request, **kwargs)
+        else:
+            report = _get_units(job, kwargs, journal)
+        directory = os.path.dirname(job.output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report.write_to_file(job.output_file, job.format_)
+    except Exception as exception:  # pylint: disable=broad-except
+        return HarvestResult(job, exception, time.perf_counter() - started)
+    return HarvestResult(job, None, time.perf_counter() - started)
+
+
+def _get_units(job, kwargs, journal):
+    """Get a job's report unit by unit, fetching only those not yet done."""
+    request = {
+        key: value for key, value in job.request.items() if key != "chunk_months"
+    }
+    reports = []
+    for unit in journal.units(job):
+        report = journal.unit_report(unit)
+        if report is None:
+            started = time.perf_counter()
+            request["start_date"] = datetime.date.fromisoformat(unit[2])
+            request["end_date"] = datetime.date.fromisoformat(unit[3])
+            try:
+                report = sushi.get_report(**request, **kwargs)
+            except Exception as exception:
+                journal.record(
+                    unit, error=exception, elapsed=time.perf_counter() - started
+                )
+                raise
+            journal.record(unit, report, elapsed=time.perf_counter() - started)
+        reports.append(report)
+    return merge_reports(reports)
+
+
+def _to_date(value):
+    """Convert a date from a config file (a date or a string) to a date."""
+    if isinstance(value, datetime.date):
+        return value
+    return convert_date_run(value)
+
+
+def _safe_name(name):
+    """Make a provider name safe to use in a file name."""
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")
@@ -1,9 +1,16 @@
 """Helper functions used by pycounter."""
+
 import calendar
+import collections
 import datetime
+import functools
 import re
 
-import pendulum
+#: Number of bytes from the start of a file examined to guess its type.
+SNIFF_SIZE = 64 * 1024
+
+# first cell of a COUNTER 5 tabular report, and the delimiter after it
+_C5_FIRST_CELL = re.compile(rb'(?:\xef\xbb\xbf)?"?Report_Name"?([\t,])')
 
 
 def convert_covered(datestring):
@@ -37,9 +44,10 @@ def convert_date_run(datestring):
     """
     Convert a date of the format 'YYYY-MM-DD' to a datetime.date object.
 
-    (Will also accept MM/DD/YYYY format, ISO 8601 timestamps, or existing
-    datetime objects; these shouldn't be in COUNTER reports, but they
-    do show up in real world data...)
+    (Will also accept YYYY-MM (as the first day of the month), MM/DD/YYYY
+    format, ISO 8601 timestamps, or existing datetime objects; these
+    shouldn't be in COUNTER reports, but they do show up in real world
+    data...)
 
     :param datestring: the string to convert to a date.
 
@@ -49,6 +57,34 @@ def convert_date_run(datestring):
     if isinstance(datestring, datetime.date):
         return datestring
 
+    return _convert_date_string(datestring)
+
+
+@functools.lru_cache(maxsize=1024)
+def _convert_date_string(datestring):
+    """Convert a date string, caching results.
+
+    SUSHI responses repeat the same few month strings for every item, so
+    'YYYY-MM-DD' and 'YYYY-MM' are converted directly and everything else
+    is left to pendulum.
+    """
+    if (
+        len(datestring) in (7, 10)
+        and datestring[4] == "-"
+        and datestring[0:4].isdecimal()
+        and datestring[5:7].isdecimal()
+    ):
+        day = "1" if len(datestring) == 7 else datestring[8:10]
+        if (len(datestring) == 7 or datestring[7] == "-") and day.isdecimal():
+            try:
+                return datetime.date(
+                    int(datestring[0:4]), int(datestring[5:7]), int(day)
+                )
+            except ValueError:
+                pass  # let pendulum raise its usual error
+
+    import pendulum  # pylint: disable=import-outside-toplevel
+
     return pendulum.parse(datestring, strict=False).date()
 
 
@@ -118,6 +154,89 @@ def prev_month(dateobj):
     return datetime.date(dateobj.year + year_delta, old_month + 1, 1)
 
 
+def month_number(dateobj):
+    """Number the month a date falls in.
+
+    Consecutive months have consecutive numbers, so the number of months
+    between two dates is the difference of their month numbers.
+
+    :param dateobj: datetime.date within the month
+
+    :return: int
+    """
+    return dateobj.year * 12 + dateobj.month - 1
+
+
+@functools.lru_cache(maxsize=None)
+def month_from_number(number):
+    """Find the first day of a month from its number.
+
+    :param number: month number, as returned by :py:func:`month_number`
+
+    :return: datetime.date of the first day of the month
+    """
+    year, month = divmod(number, 12)
+    return datetime.date(year, month + 1, 1)
+
+
+def split_period(period, months):
+    """Split a date range into consecutive ranges of at most some months.
+
+    Each range but the first starts on the first day of a month, and each
+    but the last ends on the last day of a month.
+
+    :param period: tuple of datetime.date for the start and end of the range
+    :param months: greatest number of months in each range
+
+    :return: list of (start, end) tuples of datetime.date
+    """
+    if months < 1:
+        raise ValueError("months must be at least 1")
+    start, end = period
+    last = month_number(end)
+    chunks = []
+    while start <= end:
+        chunk_last = month_number(start) + months - 1
+        if chunk_last >= last:
+            chunks.append((start, end))
+            break
+        chunks.append((start, last_day(month_from_number(chunk_last))))
+        start = month_from_number(chunk_last + 1)
+    return chunks
+
+
+MonthAxis = collections.namedtuple("MonthAxis", "start months labels")
+MonthAxis.__doc__ = """The months covered by a report period.
+
+:param start: month number (see :py:func:`month_number`) of the first month
+:param months: tuple of datetime.date for the first day of each month
+:param labels: tuple of month column headings, like "Jan-2019"
+"""
+
+
+@functools.lru_cache(maxsize=128)
+def month_axis(period):
+    """Get the months covered by a report period.
+
+    Results are cached, so every report and resource with the same period
+    shares one :py:class:`MonthAxis`.
+
+    :param period: tuple of datetime.date for the start and end of the period
+
+    :return: MonthAxis
+    """
+    start = month_number(period[0])
+    months = tuple(
+        month_from_number(number)
+        for number in range(start, month_number(period[1]) + 1)
+    )
+    return MonthAxis(
+        start=start,
+        months=months,
+        labels=tuple(month.strftime("%b-%Y") for month in months),
+    )
+
+
 def format_stat(stat):
     """Turn numbers possibly with embedded commas into integers.
 
@@ -138,22 +257,37 @@ def format_stat(stat):
         return 0
 
 
-def guess_type_from_content(file_obj):
+def guess_type_from_content(file_obj, sample_size=SNIFF_SIZE):
     """Guess type of a spreadsheet-like file.
 
-    Defaults to assuming it's CSV, if it doesn't appear to be XLSX or TSV.
+    Defaults to assuming it's CSV, if it doesn't appear to be XLSX, gzip
+    or TSV.
+
+    Only the first ``sample_size`` bytes are examined, and the file's
+    position is left where it was, so the same file object can then be
+    handed to a parser.
+
+    :param file_obj: binary file-like object of which to determine type.
+        Must be seekable, or support ``peek()``.
 
-    :param file_obj: file-like object of which to determine type.
+    :param sample_size: maximum number of bytes to examine.
 
-    :return: string, one of "xlsx", "tsv", "csv"
+    :return: string, one of "xlsx", "gzip", "tsv", "csv"
     """
-    first_bytes = file_obj.read(2)
-    if first_bytes == b"PK":
-        filetype = "xlsx"
+    if file_obj.seekable():
+        position = file_obj.tell()
+        sample = file_obj.read(sample_size)
+        file_obj.seek(position)
     else:
-        content = file_obj.read()
-        if b"\t" in content:
-            filetype = "tsv"
-        else:
-            filetype = "csv"
-    return filetype
+        sample = file_obj.peek(sample_size)[:sample_size]
+
+    if sample.startswith(b"PK"):
+        return "xlsx"
+    if sample.startswith(b"\x1f\x8b"):
+        return "gzip"
+    c5_match = _C5_FIRST_CELL.match(sample)
+    if c5_match:
+        return "tsv" if c5_match.group(1) == b"\t" else "csv"
+    if b"\t" in sample:
+        return "tsv"
+    return "csv"
@@ -0,0 +1,159 @@
+"""Decode large JSON documents incrementally, using only the standard library."""
+
+import codecs
+import json
+
+#: Number of bytes read from a file at a time by :func:`iter_chunks`.
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+# characters that may follow the digits of a number cut off by a chunk
+_NUMBER_CONTINUATION = ".eE+-"
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Get an iterator of chunks from JSON input.
+
+    :param source: ``bytes``, ``str``, a file object opened for reading, or
+        any iterable of ``bytes`` or ``str`` chunks
+    :param chunk_size: number of bytes (or characters) read from a file
+        object at a time
+    """
+    if isinstance(source, (bytes, str)):
+        return iter((source,))
+    if hasattr(source, "read"):
+        return iter(lambda: source.read(chunk_size), source.read(0))
+    return iter(source)
+
+
+def iter_members(chunks, stream_keys=()):
+    """Decode a JSON object member by member, without reading it all first.
+
+    Generates ``(key, value)`` pairs in document order. Values are decoded
+    with :mod:`json` as usual, except that an array whose key is in
+    ``stream_keys`` is not built in memory: one ``(key, element)`` pair is
+    generated for each of its elements instead.
+
+    Input is decoded as UTF-8 (with or without a byte order mark) unless the
+    chunks are already ``str``.
+
+    :param chunks: iterable of ``bytes`` or ``str`` chunks, as returned by
+        :func:`iter_chunks`
+    :param stream_keys: keys of top-level arrays to generate element by
+        element
+    :raises json.JSONDecodeError: if the input is not a JSON object
+    """
+    buf = _Buffer(chunks)
+    buf.expect("{")
+    if buf.peek() == "}":
+        buf.pos += 1
+        buf.expect_end()
+        return
+    while True:
+        if buf.peek() != '"':
+            raise buf.error("Expecting property name enclosed in double quotes")
+        key = buf.value()
+        buf.expect(":")
+        if key in stream_keys and buf.peek() == "[":
+            buf.pos += 1
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield key, buf.value()
+                    if buf.expect(",]") == "]":
+                        break
+        else:
+            yield key, buf.value()
+        if buf.expect(",}") == "}":
+            break
+    buf.expect_end()
+
+
+class _Buffer:
+    """Decoded text read so far, with the position of the next token."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_length=1):
+        """Read at least ``min_length`` more characters, dropping consumed text.
+
+        :return: False if the input was already exhausted
+        """
+        if self.eof:
+            return False
+        new_text = []
+        added = 0
+        while added < min_length:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                new_text.append(self._decoder.decode(b"", final=True))
+                break
+            if not isinstance(chunk, str):
+                chunk = self._decoder.decode(chunk)
+            new_text.append(chunk)
+            added += len(chunk)
+        pos = self.pos
+        self.text = self.text[pos:] + "".join(new_text)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ("" at the end)."""
+        while True:
+            text = self.text
+            pos = self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of ``chars``."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise self.error("Expecting %s" % " or ".join(repr(c) for c in chars))
+        self.pos += 1
+        return char
+
+    def expect_end(self):
+        """Check that nothing but whitespace is left."""
+        if self.peek():
+            raise self.error("Extra data")
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Probably cut off at the end of the buffer; re-decoding is
+                # kept linear by at least doubling the unread text each time.
+                if not self.fill(max(len(self.text) - self.pos, 1)):
+                    raise
+                continue
+            # A number at the end of the buffer, or followed only by what
+            # may start its fraction or exponent, may continue.
+            if not self.text[end:].lstrip(_NUMBER_CONTINUATION) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def error(self, message):
+        """Make a decoding error at the current position."""
+        return json.JSONDecodeError(message, self.text, self.pos)
+
+
+_DECODER = json.JSONDecoder()
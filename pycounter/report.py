@@ -1,13 +1,13 @@
 """COUNTER journal and book reports and associated functions."""
 
+import array
 import collections
 import datetime
-import logging
+import gzip
+import os
 import re
 import warnings
 
-import pendulum
-
 from pycounter import csvhelper
 from pycounter.constants import CODES, HEADER_FIELDS, METRICS
 from pycounter.constants import REPORT_DESCRIPTIONS, TOTAL_TEXT
@@ -16,14 +16,25 @@ from pycounter.exceptions import (
     PycounterWarning,
     UnknownReportTypeError,
 )
-from pycounter.helpers import (
+from pycounter.helpers import (  # noqa: F401 pylint: disable=unused-import
     convert_covered,
     convert_date_run,
     format_stat,
     guess_type_from_content,
     is_first_last,
-    next_month,
+    month_axis,
+)
+from pycounter.resources import (  # noqa: F401 pylint: disable=unused-import
+    CounterBook,
+    CounterDatabase,
+    CounterEresource,
+    CounterJournal,
+    CounterPlatform,
+    MonthsUsage,
+    resource_from_compact,
+    sum_usage,
 )
+from pycounter.rowspec import compile_row_parser, ROW_SPECS
 
 
 class CounterReport:
@@ -98,6 +109,48 @@ class CounterReport:
     def __iter__(self):
         return iter(self.pubs)
 
+    def to_compact(self):
+        """Return the report's data as nested tuples of plain values.
+
+        This is much smaller and quicker to pickle than the report object
+        itself (for example, to pass it between processes). Use
+        :py:meth:`from_compact` to rebuild the report.
+        """
+        return (
+            self.report_type,
+            self.report_version,
+            self.metric,
+            self.customer,
+            self.institutional_identifier,
+            self.period,
+            self.date_run,
+            self.section_type,
+            # pylint: disable=protected-access
+            tuple(pub._to_compact() for pub in self.pubs),
+        )
+
+    @classmethod
+    def from_compact(cls, data):
+        """Rebuild a report from the output of :py:meth:`to_compact`.
+
+        :param data: compact report data
+        :return: CounterReport object
+        """
+        report = cls()
+        (
+            report.report_type,
+            report.report_version,
+            report.metric,
+            report.customer,
+            report.institutional_identifier,
+            report.period,
+            report.date_run,
+            report.section_type,
+            pubs,
+        ) = data
+        report.pubs = [resource_from_compact(pub, report.period) for pub in pubs]
+        return report
+
     def write_to_file(self, path, format_):
         """
         Output report to a file.
@@ -167,70 +220,43 @@ class CounterReport:
         return output_lines
 
     def _totals_lines(self):
-        """Generate Totals for COUNTER report, as list of lists of cells."""
-        total_lines = []
-        metrics = {resource.metric for resource in self.pubs}
-
-        for metric in sorted(metrics):
-            total_lines.append(self._totals_line(metric))
+        """Generate Totals for COUNTER report, as list of lists of cells.
 
-        return total_lines
+        The usage of every metric is added up in a single pass over the
+        report's pubs.
+        """
+        is_jr1 = self.report_type == "JR1"
+        totals, publishers, platforms = sum_usage(
+            self.pubs, month_axis(self.period), is_jr1
+        )
 
-    def _totals_line(self, metric):
-        """Generate Totals for a given metric."""
-        total_cells = [TOTAL_TEXT[self.report_type]]
-        publishers = {resource.publisher for resource in self.pubs}
-        if len(publishers) == 1:
-            total_cells.append(publishers.pop())
-        else:
-            total_cells.append("")
-        platforms = {resource.platform for resource in self.pubs}
-        if len(platforms) == 1:
-            total_cells.append(platforms.pop())
-        else:
-            total_cells.append("")
+        common_cells = [
+            TOTAL_TEXT[self.report_type],
+            publishers.pop() if len(publishers) == 1 else "",
+            platforms.pop() if len(platforms) == 1 else "",
+        ]
         if self.report_type in ("JR1", "BR1", "BR2", "JR2", "BR3"):
-            total_cells.extend([""] * 4)
-        if self.report_type in ("DB2", "JR2", "BR3"):
-            total_cells.append(metric)
-        total_usage = 0
-        pdf_usage = 0
-        html_usage = 0
-
-        start_month_first_day = datetime.date(
-            self.period[0].year, self.period[0].month, 1
-        )
-        months = list(
-            pendulum.Interval(start_month_first_day, self.period[1]).range("months")
-        )
-        month_data = [0] * len(months)
-        for pub in self.pubs:
-            if pub.metric != metric:
-                continue
-            if self.report_type == "JR1":
-                # pylint: disable=no-member
-                pdf_usage += pub.pdf_total  # pytype: disable=attribute-error
-                html_usage += pub.html_total  # pytype: disable=attribute-error
-            for data in pub:
-                total_usage += data[2]
-                month_data[months.index(data[0])] += data[2]
-        total_cells.append(str(total_usage))
-        if self.report_type == "JR1":
-            total_cells.append(str(html_usage))
-            total_cells.append(str(pdf_usage))
-        total_cells.extend(str(d) for d in month_data)
-        return total_cells
+            common_cells.extend([""] * 4)
+
+        total_lines = []
+        for metric in sorted(totals):
+            html_usage, pdf_usage, month_data = totals[metric]
+            total_cells = list(common_cells)
+            if self.report_type in ("DB2", "JR2", "BR3"):
+                total_cells.append(metric)
+            total_cells.append(str(sum(month_data)))
+            if is_jr1:
+                total_cells.append(str(html_usage))
+                total_cells.append(str(pdf_usage))
+            total_cells.extend(str(usage) for usage in month_data)
+            total_lines.append(total_cells)
+
+        return total_lines
 
     def _table_header(self):
         """Generate header for COUNTER table for report, as list of cells."""
         header_cells = list(HEADER_FIELDS[self.report_type])
-        start_month_first_day = datetime.date(
-            self.period[0].year, self.period[0].month, 1
-        )
-        for d_obj in pendulum.Interval(start_month_first_day, self.period[1]).range(
-            "months"
-        ):
-            header_cells.append(d_obj.strftime("%b-%Y"))
+        header_cells.extend(month_axis(self.period).labels)
         return header_cells
 
     def _ensure_required_metrics(self):
@@ -252,382 +278,163 @@ class CounterReport:
 
         for database, metrics in dbs.items():
             for metric in (m for m in required_metrics if m not in metrics):
-                self.pubs.append(
-                    CounterDatabase(
-                        title=database,
-                        platform=self.pubs[0].platform,
-                        publisher=self.pubs[0].publisher,
-                        period=self.period,
-                        metric=metric,
-                        month_data=[(self.period[0], 0)],
-                    )
+                missing_database = CounterDatabase(
+                    title=database,
+                    platform=self.pubs[0].platform,
+                    publisher=self.pubs[0].publisher,
+                    period=self.period,
+                    metric=metric,
                 )
+                # pylint: disable=protected-access
+                missing_database._fill_months()
+                self.pubs.append(missing_database)
 
 
-MonthsUsage = collections.namedtuple("MonthsUsage", "month metric usage")
-
-
-class CounterEresource:
-    """
-    Base class for COUNTER statistics lines.
-
-    Iterating returns (first_day_of_month, metric, usage) tuples.
-
-    :param period: two-tuple of datetime.date objects corresponding
-        to the beginning and end dates of the covered range
+def merge_reports(reports):
+    """Combine reports of the same kind for different periods into one.
 
-    :param metric: metric tracked by this report. Should be a value
-        from pycounter.report.METRICS dict.
+    Resources are matched by type, title, platform, publisher, identifiers
+    and metric. The usage of matching resources is combined month by month
+    (and JR1 HTML and PDF totals added up), so reports for consecutive
+    periods merge into the report that a request for the whole period would
+    have given. Resources are kept in order of first appearance.
 
-    :param month_data: a list containing usage data for this
-        resource, as (datetime.date, usage) tuples
-
-    :param title: title of the resource
-
-    :param publisher: name of the resource's publisher
-
-    :param platform: name of the platform providing the resource
+    The merged report's other header fields are those of the first report.
 
+    :param reports: iterable of :class:`CounterReport`
+    :return: a new :class:`CounterReport`; the given reports are not changed
     """
+    # pylint: disable=protected-access
+    reports = list(reports)
+    if not reports:
+        raise ValueError("no reports to merge")
+    first = reports[0]
+    period = (
+        min(report.period[0] for report in reports),
+        max(report.period[1] for report in reports),
+    )
+    merged = CounterReport(
+        report_type=first.report_type,
+        report_version=first.report_version,
+        metric=first.metric,
+        customer=first.customer,
+        institutional_identifier=first.institutional_identifier,
+        period=period,
+        date_run=first.date_run,
+        section_type=first.section_type,
+    )
+    by_key = {}
+    for report in reports:
+        for pub in report.pubs:
+            key = pub._merge_key()
+            target = by_key.get(key)
+            if target is None:
+                class_index, values, start, usage = pub._to_compact()
+                target = by_key[key] = resource_from_compact(
+                    (class_index, values, start, array.array("q", usage)), period
+                )
+                merged.pubs.append(target)
+            else:
+                target._merge_usage(pub)
+    return merged
 
-    def __init__(
-        self,
-        period=None,
-        metric=None,
-        month_data=None,
-        title="",
-        platform="",
-        publisher="",
-    ):
-        self.period = period
-
-        self.metric = metric
-        self._full_data = []
-        if month_data is not None:
-            for item in month_data:
-                self._full_data.append(item)
 
-        self.title = title
-        self.platform = platform
-        self.publisher = publisher
+def parse(filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1"):
+    """Parse a COUNTER file, first attempting to determine type.
 
-    def __iter__(self):
-        if self._full_data:
-            for item in self._full_data:
-                yield MonthsUsage(item[0], self.metric, item[1])
-
-    def _fill_months(self):
-        """Ensure each month in period represented and zero fill if not."""
-        start_month_first_day = datetime.date(
-            self.period[0].year, self.period[0].month, 1
-        )
-        start, end = start_month_first_day, self.period[1]
-        try:
-            for d_obj in pendulum.Interval(start, end).range("months"):
-                if d_obj not in (x[0] for x in self._full_data):
-                    self._full_data.append((d_obj, 0))
-        except IndexError:  # pragma: nocover
-            pass
-        else:
-            self._full_data.sort()
+    Returns a :class:`CounterReport <CounterReport>` object.
 
+    :param filename: path to COUNTER report to load and parse.
+    :param filetype: type of file provided, one of "csv", "tsv", "xlsx",
+        or "gzip" (for a gzip-compressed report of any of the other types).
+        If set to None (the default), an attempt will be made to
+        detect the correct type, first from the file extension, then from
+        the file's contents.
+    :param encoding: encoding to use to decode the file. Defaults to 'utf-8',
+        ignored for XLSX files (which specify their encoding in their XML)
+    :param fallback_encoding: alternative encoding to use to try to decode
+        the file if the primary encoding fails. This defaults to 'latin-1',
+        which will accept any bytes (possibly producing junk results...)
+        Ignored for XLSX files.
 
-class CounterJournal(CounterEresource):
     """
-    Statistics for a single electronic journal.
-
-    :param period: two-tuple of datetime.date objects corresponding
-        to the beginning and end dates of the covered range
-
-    :param metric: the metric tracked by this statistics line.
-        (Should probably always be "FT Article Requests" for
-        CounterJournal objects, as long as only JR1 is supported.)
-
-    :param issn: eJournal's print ISSN
-
-    :param eissn: eJournal's eISSN
-
-    :param month_data: a list containing usage data for this
-        journal, as (datetime.date, usage) tuples
-
-    :param title: title of the resource
-
-    :param publisher: name of the resource's publisher
-
-    :param platform: name of the platform providing the resource
+    rows = _open_rows(filename, filetype, encoding, fallback_encoding)
+    try:
+        return parse_generic(rows)
+    finally:
+        rows.close()
 
-    :param html_total: total HTML usage for this title for reporting period
 
-    :param pdf_total: total PDF usage for this title for reporting period
+def iter_parse(filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1"):
+    """Parse a COUNTER file lazily, one resource at a time.
 
-    """
-
-    def __init__(
-        self,
-        period=None,
-        metric=METRICS["JR1"],
-        issn=None,
-        eissn=None,
-        month_data=None,
-        title="",
-        platform="",
-        publisher="",
-        html_total=0,
-        pdf_total=0,
-        doi="",
-        proprietary_id="",
-    ):
-        super().__init__(period, metric, month_data, title, platform, publisher)
-        self.html_total = html_total
-        self.pdf_total = pdf_total
-        self.doi = doi
-        self.proprietary_id = proprietary_id
+    Unlike :py:func:`parse`, the rows of the report are not collected into
+    memory: the header is parsed immediately, and resources are yielded
+    as the file is read.
 
-        self.isbn = None
+    Returns a ``(report, resources)`` tuple. ``report`` is a
+    :class:`CounterReport <CounterReport>` with the header metadata set and
+    no pubs; ``resources`` is an iterator over the report's
+    :class:`CounterEresource <CounterEresource>` subclass instances. The
+    file is closed once ``resources`` is exhausted (or closed).
 
-        if issn is not None:
-            self.issn = issn
-        else:
-            self.issn = ""
+    Parameters are the same as for :py:func:`parse`.
 
-        if eissn is not None:
-            self.eissn = eissn
-        else:
-            self.eissn = ""
-
-    def __repr__(self):  # pragma: nocover
-        return """<CounterJournal {}, publisher {},
-        platform {}>""".format(
-            self.title,
-            self.publisher,
-            self.platform,
-        )
-
-    def as_generic(self):
-        """Get data for this line as list of COUNTER report cells."""
-        self._fill_months()  # Ensure fill all months with zero at least
-        data_line = [
-            self.title,
-            self.publisher,
-            self.platform,
-            self.doi,
-            self.proprietary_id,
-            self.issn,
-            self.eissn,
-        ]
-        total_usage = 0
-        month_data = []
-        for data in self:
-            total_usage += data[2]
-            month_data.append(str(data[2]))
-        if self.metric.startswith("Access"):
-            data_line.append(self.metric)
-        data_line.append(str(total_usage))
-        if not self.metric.startswith("Access"):
-            data_line.append(str(self.html_total))
-            data_line.append(str(self.pdf_total))
-        data_line.extend(month_data)
-        return data_line
-
-
-class CounterBook(CounterEresource):
     """
-    statistics for a single electronic book.
+    rows = _open_rows(filename, filetype, encoding, fallback_encoding)
+    try:
+        return iter_parse_generic(rows)
+    except BaseException:
+        rows.close()
+        raise
 
-    :ivar isbn: eBook's ISBN
 
-    :ivar issn: eBook's ISSN (if any)
+_FILE_TYPES = {"tsv": "\t", "csv": ",", "xlsx": None, "gzip": None}
 
-    :param month_data: a list containing usage data for this
-        book, as (datetime.date, usage) tuples
+_EXTENSIONS = {".tsv": "tsv", ".csv": "csv", ".xlsx": "xlsx", ".gz": "gzip"}
 
-    :param title: title of the resource
 
-    :param publisher: name of the resource's publisher
-
-    :param platform: name of the platform providing the resource
+def _open_rows(filename, filetype, encoding, fallback_encoding):
+    """Get an iterator over the rows of a COUNTER file.
 
+    The file is opened only once; if its type can't be determined from its
+    extension, it is sniffed from the same open file that is then parsed.
+    The file is closed when the iterator is exhausted or closed.
     """
-
-    def __init__(
-        self,
-        period=None,
-        metric=None,
-        month_data=None,
-        title="",
-        platform="",
-        publisher="",
-        isbn=None,
-        issn=None,
-        doi="",
-        proprietary_id="",
-        print_isbn=None,
-        online_isbn=None,
-    ):
-        super().__init__(period, metric, month_data, title, platform, publisher)
-        self.eissn = None
-        self.doi = doi
-        self.proprietary_id = proprietary_id
-
-        self._isbn = isbn
-        self.print_isbn = print_isbn
-        self.online_isbn = online_isbn
-
-        if issn is not None:
-            self.issn = issn
-        else:
-            self.issn = ""
-
-    def __repr__(self):
-        return """<CounterBook {} (ISBN: {}), publisher {},
-        platform {}>""".format(
-            self.title,
-            self.isbn,
-            self.publisher,
-            self.platform,
-        )
-
-    @property
-    def isbn(self):
-        """Return a suitable ISSN for the ebook.
-
-        The tabular COUNTER reports only report an "ISBN", while the SUSHI
-        (XML) reports include both a Print_ISBN and Online_ISBN.
-
-         This property will return a generic ISBN given in the constructor,
-         if any. If the CounterBook was created with no "isbn" but with
-         online_ISBN and/or print_ISBN, the online one, if any, will be
-         returned, otherwise the print.
-        """
-        return self._isbn or self.online_isbn or self.print_isbn or ""
-
-    def as_generic(self):
-        """Get data for this line as list of COUNTER report cells."""
-        self._fill_months()  # Ensure fill all months with zero at least
-        data_line = [
-            self.title,
-            self.publisher,
-            self.platform,
-            self.doi,
-            self.proprietary_id,
-            self.isbn,
-            self.issn,
-        ]
-        total_usage = 0
-        month_data = []
-        for data in self:
-            total_usage += data[2]
-            month_data.append(str(data[2]))
-        if self.metric and self.metric.startswith("Access"):
-            data_line.append(self.metric)
-        data_line.append(str(total_usage))
-        data_line.extend(month_data)
-        return data_line
-
-
-class CounterDatabase(CounterEresource):
-    """a COUNTER database report line."""
-
-    def __init__(
-        self,
-        period=None,
-        metric=None,
-        month_data=None,
-        title="",
-        platform="",
-        publisher="",
-    ):
-        super().__init__(period, metric, month_data, title, platform, publisher)
-        self.isbn = None
-
-    def as_generic(self):
-        """Return data for this line as list of COUNTER report cells."""
-        self._fill_months()
-
-        data_line = [self.title, self.publisher, self.platform, self.metric]
-        total_usage = 0
-        month_data = []
-
-        for data in self:
-            total_usage += data[2]
-            month_data.append(str(data[2]))
-
-        data_line.append(str(total_usage))
-        data_line.extend(month_data)
-
-        return data_line
-
-
-class CounterPlatform(CounterEresource):
-    """a COUNTER platform report line."""
-
-    def __init__(
-        self, period=None, metric=None, month_data=None, platform="", publisher=""
-    ):
-        super().__init__(
-            period=period,
-            metric=metric,
-            month_data=month_data,
-            title="",  # no title for platform report
-            platform=platform,
-            publisher=publisher,
-        )
-        self.isbn = None
-
-    def as_generic(self):
-        """Return data for this line as list of COUNTER report cells."""
-        self._fill_months()
-
-        data_line = [self.platform, self.publisher, self.metric]
-        total_usage = 0
-        month_data = []
-
-        for data in self:
-            total_usage += data[2]
-            month_data.append(str(data[2]))
-
-        data_line.append(str(total_usage))
-        data_line.extend(month_data)
-
-        return data_line
+    if filetype is None:
+        filetype = _EXTENSIONS.get(os.path.splitext(filename)[1])
+    elif filetype not in _FILE_TYPES:
+        raise PycounterException("Unknown file type %s" % filetype)
+    return _iter_file_rows(filename, filetype, encoding, fallback_encoding)
 
 
-def parse(filename, filetype=None, encoding="utf-8", fallback_encoding="latin-1"):
-    """Parse a COUNTER file, first attempting to determine type.
+def _iter_file_rows(filename, filetype, encoding, fallback_encoding):
+    """Open a file and yield its rows (see :py:func:`_open_rows`)."""
+    with open(filename, "rb") as file_obj:
+        yield from _iter_stream_rows(file_obj, filetype, encoding, fallback_encoding)
 
-    Returns a :class:`CounterReport <CounterReport>` object.
 
-    :param filename: path to COUNTER report to load and parse.
-    :param filetype: type of file provided, one of "csv", "tsv", "xlsx".
-        If set to None (the default), an attempt will be made to
-        detect the correct type, first from the file extension, then from
-        the file's contents.
-    :param encoding: encoding to use to decode the file. Defaults to 'utf-8',
-        ignored for XLSX files (which specify their encoding in their XML)
-    :param fallback_encoding: alternative encoding to use to try to decode
-        the file if the primary encoding fails. This defaults to 'latin-1',
-        which will accept any bytes (possibly producing junk results...)
-        Ignored for XLSX files.
+def _iter_stream_rows(file_obj, filetype, encoding, fallback_encoding):
+    """Yield the rows of a COUNTER report from a binary file object.
 
+    :param filetype: one of the keys of ``_FILE_TYPES``, or None to guess
+        from the content.
     """
     if filetype is None:
-        if filename.endswith(".tsv"):
-            filetype = "tsv"
-        elif filename.endswith(".xlsx"):
-            filetype = "xlsx"
-        elif filename.endswith(".csv"):
-            filetype = "csv"
-        else:
-            with open(filename, "rb") as file_obj:
-                filetype = guess_type_from_content(file_obj)
-
-    if filetype == "tsv":
-        return parse_separated(filename, "\t", encoding, fallback_encoding)
-    if filetype == "xlsx":
-        return parse_xlsx(filename)
-    if filetype == "csv":
-        return parse_separated(filename, ",", encoding, fallback_encoding)
-    raise PycounterException("Unknown file type %s" % filetype)
+        filetype = guess_type_from_content(file_obj)
+    if filetype == "gzip":
+        with gzip.GzipFile(fileobj=file_obj) as gzip_file:
+            yield from _iter_stream_rows(gzip_file, None, encoding, fallback_encoding)
+    elif filetype == "xlsx":
+        yield from _iter_xlsx_rows(file_obj)
+    else:
+        with csvhelper.UnicodeReader(
+            file_obj,
+            delimiter=_FILE_TYPES[filetype],
+            fallback_encoding=fallback_encoding,
+            encoding=encoding,
+        ) as report_reader:
+            yield from report_reader
 
 
 def parse_xlsx(filename):
@@ -637,19 +444,28 @@ def parse_xlsx(filename):
 
     :param filename: path to XLSX-format COUNTER report file.
 
+    """
+    with open(filename, "rb") as xlsx_file:
+        return parse_generic(_iter_xlsx_rows(xlsx_file))
+
+
+def _iter_xlsx_rows(xlsx_file):
+    """Yield the rows of the first sheet of an XLSX file as lists of cells.
+
+    The workbook is opened in openpyxl's read-only mode, so rows are read
+    from the file as they are needed rather than all loaded up front.
+
+    :param xlsx_file: binary file object containing the workbook
     """
     from openpyxl import load_workbook  # pylint: disable=import-outside-toplevel
 
-    with open(filename, "rb") as xlsx_file:
-        workbook = load_workbook(xlsx_file)
+    workbook = load_workbook(xlsx_file, read_only=True)
+    try:
         worksheet = workbook[workbook.sheetnames[0]]
-        row_it = worksheet.iter_rows()
-        split_row_list = (
-            [cell.value if cell.value is not None else "" for cell in row]
-            for row in row_it
-        )
-
-    return parse_generic(split_row_list)
+        for row in worksheet.iter_rows(values_only=True):
+            yield [value if value is not None else "" for value in row]
+    finally:
+        workbook.close()
 
 
 def parse_separated(filename, delimiter, encoding="utf-8", fallback_encoding="latin-1"):
@@ -685,10 +501,38 @@ def parse_generic(report_reader):
         data formatted as tabular lists
     :return: CounterReport object
 
+    """
+    report, resources = iter_parse_generic(report_reader)
+    report.pubs.extend(resources)
+    return report
+
+
+def iter_parse_generic(report_reader):
+    """Parse COUNTER report rows lazily.
+
+    The header rows are consumed from ``report_reader`` immediately; the
+    remaining rows are only read as the returned iterator is advanced.
+
+    :param report_reader: a iterable object that yields lists COUNTER
+        data formatted as tabular lists
+    :return: ``(report, resources)`` tuple of a header-only CounterReport
+        and an iterator of the report's resources
+
+    """
+    report_reader = iter(report_reader)
+    report, last_col = _parse_header(report_reader)
+    return report, _iter_resources(report_reader, report, last_col)
+
+
+def _parse_header(report_reader):
+    """Consume the header rows of a report.
+
+    :param report_reader: iterator of report rows, positioned at the start
+    :return: ``(report, last_col)`` tuple of a CounterReport with its
+        metadata set and the number of columns containing data
     """
     # pylint: disable=too-many-branches
     report = CounterReport()
-
     first_line = next(report_reader)
     if first_line[0] == "Report_Name":  # COUNTER 5 report
         second_line = next(report_reader)
@@ -753,127 +597,16 @@ def parse_generic(report_reader):
         # this report has two lines of totals
         next(report_reader)
 
+    return report, last_col
+
+
+def _iter_resources(report_reader, report, last_col):
+    """Yield a resource for each remaining (non-blank) row of a report."""
+    parse_row = compile_row_parser(report, last_col)
     for line in report_reader:
         if not line:
             continue
-        report.pubs.append(_parse_line(line, report, last_col))
-
-    return report
-
-
-def _parse_line(line, report, last_col):
-    """Parse a single line from a report.
-
-    :param line: sequence of cells in a report line
-    :param report: a CounterReport the line came from
-    :param last_col: last column number containing data
-    :return: an appropriate CounterResource subclass instance
-    """
-    # pylint: disable=too-many-locals
-    issn = None
-    eissn = None
-    isbn = None
-    html_total = 0
-    pdf_total = 0
-    doi = ""
-    prop_id = ""
-
-    metric = report.metric
-    if (
-        report.report_type.startswith("JR1")
-        or report.report_type == "TR_J1"
-        or report.report_type == "TR_J2"
-    ):
-        old_line = line
-        line = line[0:3] + line[5:7] + line[10:last_col]
-        doi = old_line[3]
-        prop_id = old_line[4]
-        html_total = format_stat(old_line[8])
-        pdf_total = format_stat(old_line[9])
-        issn = line[3].strip()
-        eissn = line[4].strip()
-        if report.report_type.startswith("TR"):
-            metric = old_line[9]
-
-    elif report.report_type in ("BR1", "BR2"):
-        line = line[0:3] + line[5:7] + line[8:last_col]
-        isbn = line[3].strip()
-        issn = line[4].strip()
-
-    elif report.report_type in ("BR3", "JR2"):
-        metric = line[7]
-        doi = line[3]
-        prop_id = line[4]
-        line = line[0:3] + line[5:7] + line[9:last_col]
-        eissn = line[4].strip()
-        if report.report_type == "BR3":
-            isbn = line[3].strip()
-        else:
-            issn = line[3].strip()
-    # For DB1 and DB2, nothing additional to do here
-    elif report.report_type in ("BR3", "JR2"):
-        metric = line[7]
-        doi = line[3]
-        prop_id = line[4]
-        line = line[0:3] + line[5:7] + line[9:last_col]
-        eissn = line[4].strip()
-        if report.report_type == "BR3":
-            isbn = line[3].strip()
-        else:
-            issn = line[3].strip()
-    # For DB1 and DB2, nothing additional to do here
-
-    logging.debug(line)
-    common_args = {
-        "title": line[0],
-        "publisher": line[1],
-        "platform": line[2],
-        "period": report.period,
-    }
-    month_data = []
-    curr_month = datetime.date(report.period[0].year, report.period[0].month, 1)
-    months_start_idx = 5 if report.report_type != "PR1" else 4
-    for data in line[months_start_idx:]:
-        month_data.append((curr_month, format_stat(data)))
-        curr_month = next_month(curr_month)
-    if (
-        report.report_type.startswith("JR")
-        or report.report_type == "TR_J1"
-        or report.report_type == "TR_J2"
-    ):
-        return CounterJournal(
-            metric=metric,
-            month_data=month_data,
-            doi=doi,
-            issn=issn,
-            eissn=eissn,
-            proprietary_id=prop_id,
-            html_total=html_total,
-            pdf_total=pdf_total,
-            **common_args
-        )
-    if report.report_type.startswith("BR"):
-        return CounterBook(
-            metric=metric,
-            month_data=month_data,
-            doi=doi,
-            issn=issn,
-            isbn=isbn,
-            proprietary_id=prop_id,
-            **common_args
-        )
-    if report.report_type.startswith("DB"):
-        return CounterDatabase(metric=line[3], month_data=month_data, **common_args)
-    if report.report_type == "PR1":
-        # there is no title in the PR1 report
-        return CounterPlatform(
-            metric=line[2],
-            month_data=month_data,
-            platform=line[0],
-            publisher=line[1],
-            period=report.period,
-        )
-    raise PycounterException("Should be unreachable")  # pragma: no cover
+        yield parse_row(line)
 
 
 def _get_type_and_version(specifier):
@@ -891,8 +624,7 @@ def _get_type_and_version(specifier):
         report_version = int(rt_match.group(3))
     else:
         raise UnknownReportTypeError("No match in line: %s" % specifier)
-    # pragma: nocover
-    if not any(report_type.startswith(x) for x in ("JR", "BR", "DB", "PR1")):
+    if report_type not in ROW_SPECS:
         raise UnknownReportTypeError(report_type)
 
     if report_version < 4:  # pragma: nocover
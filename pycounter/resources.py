@@ -0,0 +1,527 @@
+"""Lines of COUNTER reports: journals, books, databases and platforms."""
+
+import array
+import collections
+
+from pycounter.constants import METRICS
+from pycounter.helpers import month_axis, month_from_number, month_number
+
+MonthsUsage = collections.namedtuple("MonthsUsage", "month metric usage")
+
+
+class CounterEresource:
+    """
+    Base class for COUNTER statistics lines.
+
+    Iterating returns (first_day_of_month, metric, usage) tuples.
+
+    :param period: two-tuple of datetime.date objects corresponding
+        to the beginning and end dates of the covered range
+
+    :param metric: metric tracked by this report. Should be a value
+        from pycounter.report.METRICS dict.
+
+    :param month_data: a list containing usage data for this
+        resource, as (datetime.date, usage) tuples
+
+    :param title: title of the resource
+
+    :param publisher: name of the resource's publisher
+
+    :param platform: name of the platform providing the resource
+
+    """
+
+    # resources are created in large numbers, so store their attributes in
+    # slots rather than a per-instance __dict__
+    __slots__ = (
+        "period",
+        "metric",
+        "_start",
+        "_usage",
+        "title",
+        "platform",
+        "publisher",
+    )
+
+    # constructor arguments saved by _to_compact
+    _compact_fields = ("metric", "title", "platform", "publisher")
+    # compact fields that are totals, added up when resources are merged
+    _summed_fields = ()
+
+    def __init__(
+        self,
+        period=None,
+        metric=None,
+        month_data=None,
+        title="",
+        platform="",
+        publisher="",
+    ):
+        self.period = period
+
+        self.metric = metric
+        # usage is stored as the month number (see helpers.month_number) of the
+        # first month, and an array of usage for consecutive months from
+        # there, with _MISSING_USAGE for months with no data.
+        self._start = None
+        self._usage = array.array("q")
+        if month_data is not None:
+            self._add_month_data(month_data)
+
+        self.title = title
+        self.platform = platform
+        self.publisher = publisher
+
+    def __iter__(self):
+        metric = self.metric
+        for offset, usage in enumerate(self._usage):
+            if usage != _MISSING_USAGE:
+                yield MonthsUsage(
+                    month_from_number(self._start + offset), metric, usage
+                )
+
+    def _add_month_data(self, month_data):
+        """Add usage from (datetime.date, usage) tuples.
+
+        Usage for a month that already has data is added to it.
+        """
+        items = [(month_number(month), usage) for month, usage in month_data]
+        if not items:
+            return
+        self._extend_months(
+            min(item[0] for item in items), max(item[0] for item in items)
+        )
+        usage_array = self._usage
+        start = self._start
+        for month, usage in items:
+            if usage_array[month - start] == _MISSING_USAGE:
+                usage_array[month - start] = usage
+            else:
+                usage_array[month - start] += usage
+
+    def _extend_months(self, first, last):
+        """Make sure the usage array covers the given month numbers."""
+        if self._start is None:
+            self._start = first
+        elif first < self._start:
+            self._usage[0:0] = array.array("q", [_MISSING_USAGE]) * (
+                self._start - first
+            )
+            self._start = first
+        end = self._start + len(self._usage)
+        if last >= end:
+            self._usage.extend([_MISSING_USAGE] * (last - end + 1))
+
+    def _usage_values(self):
+        """List the usage of each month with data, in order."""
+        return [usage for usage in self._usage if usage != _MISSING_USAGE]
+
+    def _to_compact(self):
+        """Return the resource's data as a tuple of plain values.
+
+        The period is not included; it is shared with the report.
+        """
+        return (
+            _RESOURCE_CLASSES.index(type(self)),
+            tuple(getattr(self, name) for name in self._compact_fields),
+            self._start,
+            self._usage,
+        )
+
+    def _merge_key(self):
+        """Identify the resource and metric, for matching across reports."""
+        return (type(self),) + tuple(
+            getattr(self, name)
+            for name in self._compact_fields
+            if name not in self._summed_fields
+        )
+
+    def _merge_usage(self, other):
+        """Add the usage (and totals) of a matching resource to this one."""
+        # pylint: disable=protected-access
+        other_start, other_usage = other._start, other._usage
+        if other_start is None:
+            return
+        self._extend_months(other_start, other_start + len(other_usage) - 1)
+        usage_array = self._usage
+        shift = other_start - self._start
+        for offset, usage in enumerate(other_usage):
+            if usage == _MISSING_USAGE:
+                continue
+            if usage_array[shift + offset] == _MISSING_USAGE:
+                usage_array[shift + offset] = usage
+            else:
+                usage_array[shift + offset] += usage
+        for name in self._summed_fields:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def _fill_months(self):
+        """Ensure each month in period represented and zero fill if not.
+
+        Takes time proportional to the number of months, and does nothing
+        more than check the usage array if it's already filled.
+        """
+        axis = month_axis(self.period)
+        if not axis.months:  # pragma: nocover
+            return
+        first = axis.start
+        last = first + len(axis.months) - 1
+        self._extend_months(first, last)
+        usage_array = self._usage
+        low, high = first - self._start, last - self._start + 1
+        if _MISSING_USAGE not in usage_array[low:high]:
+            return
+        for offset in range(low, high):
+            if usage_array[offset] == _MISSING_USAGE:
+                usage_array[offset] = 0
+
+
+# placeholder in a resource's usage array for a month with no data
+_MISSING_USAGE = -(2**63)
+
+
+class CounterJournal(CounterEresource):
+    """
+    Statistics for a single electronic journal.
+
+    :param period: two-tuple of datetime.date objects corresponding
+        to the beginning and end dates of the covered range
+
+    :param metric: the metric tracked by this statistics line.
+        (Should probably always be "FT Article Requests" for
+        CounterJournal objects, as long as only JR1 is supported.)
+
+    :param issn: eJournal's print ISSN
+
+    :param eissn: eJournal's eISSN
+
+    :param month_data: a list containing usage data for this
+        journal, as (datetime.date, usage) tuples
+
+    :param title: title of the resource
+
+    :param publisher: name of the resource's publisher
+
+    :param platform: name of the platform providing the resource
+
+    :param html_total: total HTML usage for this title for reporting period
+
+    :param pdf_total: total PDF usage for this title for reporting period
+
+    """
+
+    __slots__ = (
+        "html_total",
+        "pdf_total",
+        "doi",
+        "proprietary_id",
+        "isbn",
+        "issn",
+        "eissn",
+    )
+
+    _compact_fields = CounterEresource._compact_fields + (
+        "issn",
+        "eissn",
+        "doi",
+        "proprietary_id",
+        "html_total",
+        "pdf_total",
+    )
+    _summed_fields = ("html_total", "pdf_total")
+
+    def __init__(
+        self,
+        period=None,
+        metric=METRICS["JR1"],
+        issn=None,
+        eissn=None,
+        month_data=None,
+        title="",
+        platform="",
+        publisher="",
+        html_total=0,
+        pdf_total=0,
+        doi="",
+        proprietary_id="",
+    ):
+        super().__init__(period, metric, month_data, title, platform, publisher)
+        self.html_total = html_total
+        self.pdf_total = pdf_total
+        self.doi = doi
+        self.proprietary_id = proprietary_id
+
+        self.isbn = None
+
+        if issn is not None:
+            self.issn = issn
+        else:
+            self.issn = ""
+
+        if eissn is not None:
+            self.eissn = eissn
+        else:
+            self.eissn = ""
+
+    def __repr__(self):  # pragma: nocover
+        return """<CounterJournal {}, publisher {},
+        platform {}>""".format(
+            self.title,
+            self.publisher,
+            self.platform,
+        )
+
+    def as_generic(self):
+        """Get data for this line as list of COUNTER report cells."""
+        self._fill_months()  # Ensure fill all months with zero at least
+        data_line = [
+            self.title,
+            self.publisher,
+            self.platform,
+            self.doi,
+            self.proprietary_id,
+            self.issn,
+            self.eissn,
+        ]
+        usage = self._usage_values()
+        total_usage = sum(usage)
+        month_data = [str(value) for value in usage]
+        if self.metric.startswith("Access"):
+            data_line.append(self.metric)
+        data_line.append(str(total_usage))
+        if not self.metric.startswith("Access"):
+            data_line.append(str(self.html_total))
+            data_line.append(str(self.pdf_total))
+        data_line.extend(month_data)
+        return data_line
+
+
+class CounterBook(CounterEresource):
+    """
+    statistics for a single electronic book.
+
+    :ivar isbn: eBook's ISBN
+
+    :ivar issn: eBook's ISSN (if any)
+
+    :param month_data: a list containing usage data for this
+        book, as (datetime.date, usage) tuples
+
+    :param title: title of the resource
+
+    :param publisher: name of the resource's publisher
+
+    :param platform: name of the platform providing the resource
+
+    """
+
+    __slots__ = (
+        "eissn",
+        "doi",
+        "proprietary_id",
+        "_isbn",
+        "print_isbn",
+        "online_isbn",
+        "issn",
+    )
+
+    _compact_fields = CounterEresource._compact_fields + (
+        "isbn",
+        "issn",
+        "doi",
+        "proprietary_id",
+        "print_isbn",
+        "online_isbn",
+    )
+
+    def __init__(
+        self,
+        period=None,
+        metric=None,
+        month_data=None,
+        title="",
+        platform="",
+        publisher="",
+        isbn=None,
+        issn=None,
+        doi="",
+        proprietary_id="",
+        print_isbn=None,
+        online_isbn=None,
+    ):
+        super().__init__(period, metric, month_data, title, platform, publisher)
+        self.eissn = None
+        self.doi = doi
+        self.proprietary_id = proprietary_id
+
+        self._isbn = isbn
+        self.print_isbn = print_isbn
+        self.online_isbn = online_isbn
+
+        if issn is not None:
+            self.issn = issn
+        else:
+            self.issn = ""
+
+    def __repr__(self):
+        return """<CounterBook {} (ISBN: {}), publisher {},
+        platform {}>""".format(
+            self.title,
+            self.isbn,
+            self.publisher,
+            self.platform,
+        )
+
+    @property
+    def isbn(self):
+        """Return a suitable ISSN for the ebook.
+
+        The tabular COUNTER reports only report an "ISBN", while the SUSHI
+        (XML) reports include both a Print_ISBN and Online_ISBN.
+
+         This property will return a generic ISBN given in the constructor,
+         if any. If the CounterBook was created with no "isbn" but with
+         online_ISBN and/or print_ISBN, the online one, if any, will be
+         returned, otherwise the print.
+        """
+        return self._isbn or self.online_isbn or self.print_isbn or ""
+
+    def as_generic(self):
+        """Get data for this line as list of COUNTER report cells."""
+        self._fill_months()  # Ensure fill all months with zero at least
+        data_line = [
+            self.title,
+            self.publisher,
+            self.platform,
+            self.doi,
+            self.proprietary_id,
+            self.isbn,
+            self.issn,
+        ]
+        usage = self._usage_values()
+        total_usage = sum(usage)
+        month_data = [str(value) for value in usage]
+        if self.metric and self.metric.startswith("Access"):
+            data_line.append(self.metric)
+        data_line.append(str(total_usage))
+        data_line.extend(month_data)
+        return data_line
+
+
+class CounterDatabase(CounterEresource):
+    """a COUNTER database report line."""
+
+    __slots__ = ("isbn",)
+
+    def __init__(
+        self,
+        period=None,
+        metric=None,
+        month_data=None,
+        title="",
+        platform="",
+        publisher="",
+    ):
+        super().__init__(period, metric, month_data, title, platform, publisher)
+        self.isbn = None
+
+    def as_generic(self):
+        """Return data for this line as list of COUNTER report cells."""
+        self._fill_months()
+
+        data_line = [self.title, self.publisher, self.platform, self.metric]
+        usage = self._usage_values()
+        total_usage = sum(usage)
+        month_data = [str(value) for value in usage]
+
+        data_line.append(str(total_usage))
+        data_line.extend(month_data)
+
+        return data_line
+
+
+class CounterPlatform(CounterEresource):
+    """a COUNTER platform report line."""
+
+    __slots__ = ("isbn",)
+
+    _compact_fields = ("metric", "platform", "publisher")
+
+    def __init__(
+        self, period=None, metric=None, month_data=None, platform="", publisher=""
+    ):
+        super().__init__(
+            period=period,
+            metric=metric,
+            month_data=month_data,
+            title="",  # no title for platform report
+            platform=platform,
+            publisher=publisher,
+        )
+        self.isbn = None
+
+    def as_generic(self):
+        """Return data for this line as list of COUNTER report cells."""
+        self._fill_months()
+
+        data_line = [self.platform, self.publisher, self.metric]
+        usage = self._usage_values()
+        total_usage = sum(usage)
+        month_data = [str(value) for value in usage]
+
+        data_line.append(str(total_usage))
+        data_line.extend(month_data)
+
+        return data_line
+
+
+def sum_usage(pubs, axis, with_format_totals):
+    """Add up the usage of resources by metric, in one pass.
+
+    :param pubs: iterable of resources
+    :param axis: the report's :py:func:`month_axis
+        <pycounter.helpers.month_axis>`
+    :param with_format_totals: whether to add up ``html_total`` and
+        ``pdf_total`` too (JR1)
+    :return: dict of metric to ``[html usage, pdf usage, list of usage for
+        each month]``, and the sets of publishers and platforms
+    """
+    # pylint: disable=protected-access
+    first_month = axis.start
+    month_count = len(axis.months)
+    publishers = set()
+    platforms = set()
+    totals = {}
+    for pub in pubs:
+        publishers.add(pub.publisher)
+        platforms.add(pub.platform)
+        metric_totals = totals.get(pub.metric)
+        if metric_totals is None:
+            metric_totals = totals[pub.metric] = [0, 0, [0] * month_count]
+        if with_format_totals:
+            metric_totals[0] += pub.html_total  # pytype: disable=attribute-error
+            metric_totals[1] += pub.pdf_total  # pytype: disable=attribute-error
+        if pub._start is None:
+            continue
+        month_data = metric_totals[2]
+        for index, usage in enumerate(pub._usage, pub._start - first_month):
+            if usage != _MISSING_USAGE and 0 <= index < month_count:
+                month_data[index] += usage
+    return totals, publishers, platforms
+
+
+_RESOURCE_CLASSES = (CounterJournal, CounterBook, CounterDatabase, CounterPlatform)
+
+
+def resource_from_compact(data, period):
+    """Rebuild a resource from the output of its ``_to_compact`` method."""
+    # pylint: disable=protected-access
+    class_index, values, start, usage = data
+    resource_class = _RESOURCE_CLASSES[class_index]
+    resource = resource_class(
+        period=period, **dict(zip(resource_class._compact_fields, values))
+    )
+    resource._start = start
+    resource._usage = usage
+    return resource
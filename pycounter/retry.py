@@ -0,0 +1,166 @@
+"""Retrying reports that a SUSHI server has queued or is too busy to serve."""
+
+import logging
+import random
+import time
+
+import pycounter.exceptions
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """When to retry after a :class:`pycounter.exceptions.ServiceBusyError`.
+
+    The wait after the n-th failed attempt is ``initial_delay *
+    multiplier ** (n - 1)``, capped at ``max_delay`` and then varied at
+    random by up to ``jitter`` (a fraction of the delay) so that many
+    clients don't retry in lockstep. If the server said how long to wait
+    (``Retry-After``), that is used instead.
+
+    :param initial_delay: seconds to wait after the first failed attempt
+    :param multiplier: factor by which each wait is longer than the last
+    :param max_delay: longest wait in seconds between attempts, before jitter
+    :param jitter: fraction of each wait to add or subtract at random
+    :param max_attempts: number of attempts after which to give up, or None
+        to keep trying
+    :param deadline: seconds after the first attempt after which to give
+        up, or None to keep trying; no retry is scheduled past the deadline
+    :param respect_retry_after: whether to wait as long as the server asks
+    """
+
+    def __init__(
+        self,
+        initial_delay=60,
+        multiplier=2.0,
+        max_delay=900,
+        jitter=0.1,
+        max_attempts=None,
+        deadline=None,
+        respect_retry_after=True,
+    ):
+        # pylint: disable=too-many-arguments
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.respect_retry_after = respect_retry_after
+
+    @classmethod
+    def immediate(cls, max_attempts=None):
+        """Policy that retries at once; probably don't use it on a real server."""
+        return cls(initial_delay=0, max_delay=0, jitter=0, max_attempts=max_attempts)
+
+    def delay(self, attempts, retry_after=None):
+        """Get the number of seconds to wait before the next attempt.
+
+        :param attempts: number of attempts made so far
+        :param retry_after: seconds the server asked us to wait, or None
+        """
+        if retry_after is not None and self.respect_retry_after:
+            return max(float(retry_after), 0.0)
+        delay = min(
+            self.initial_delay * self.multiplier ** (attempts - 1), self.max_delay
+        )
+        if self.jitter:
+            delay += delay * self.jitter * random.uniform(-1, 1)
+        return max(delay, 0.0)
+
+    def next_delay(self, attempts, elapsed, error):
+        """Decide whether to retry after a failed attempt.
+
+        :param attempts: number of attempts made so far
+        :param elapsed: seconds since the first attempt started
+        :param error: the :class:`pycounter.exceptions.ServiceBusyError`
+            from the last attempt
+        :return: seconds to wait before the next attempt
+        :raises pycounter.exceptions.RetriesExhaustedError: if there should
+            be no more attempts
+        """
+        if self.max_attempts is not None and attempts >= self.max_attempts:
+            raise pycounter.exceptions.RetriesExhaustedError(
+                "Gave up after %d attempts: %s" % (attempts, error),
+                retry_after=error.retry_after,
+            ) from error
+        delay = self.delay(attempts, error.retry_after)
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            raise pycounter.exceptions.RetriesExhaustedError(
+                "Gave up after %d attempts in %.0f seconds: %s"
+                % (attempts, elapsed, error),
+                retry_after=error.retry_after,
+            ) from error
+        return delay
+
+
+class PendingReport:
+    """A report request that may have to be retried later.
+
+    :meth:`poll` makes an attempt only once the wait chosen by the policy
+    has passed, so a harvester can keep many pending reports and poll each
+    of them in turn without blocking on any one.
+
+    :param fetch: callable that requests and returns the report, raising
+        :class:`pycounter.exceptions.ServiceBusyError` if it isn't ready
+    :param policy: the :class:`RetryPolicy` to follow
+    :param clock: function returning the current time in seconds
+    """
+
+    def __init__(self, fetch, policy, clock=time.monotonic):
+        self._fetch = fetch
+        self.policy = policy
+        self._clock = clock
+        self.attempts = 0
+        self.started = None
+        self.ready_at = clock()
+        self.report = None
+
+    @property
+    def done(self):
+        """Whether the report has been received."""
+        return self.report is not None
+
+    def wait_time(self):
+        """Seconds until the next attempt is due (0 if due now or done)."""
+        if self.done:
+            return 0
+        return max(self.ready_at - self._clock(), 0)
+
+    def poll(self):
+        """Request the report if an attempt is due.
+
+        :return: the :class:`pycounter.report.CounterReport`, or None if it
+            isn't ready yet
+        :raises pycounter.exceptions.RetriesExhaustedError: if the policy
+            gives up; other errors from the request are raised as they are
+        """
+        if self.report is not None:
+            return self.report
+        now = self._clock()
+        if now < self.ready_at:
+            return None
+        if self.started is None:
+            self.started = now
+        self.attempts += 1
+        try:
+            self.report = self._fetch()
+        except pycounter.exceptions.ServiceBusyError as error:
+            delay = self.policy.next_delay(
+                self.attempts, self._clock() - self.started, error
+            )
+            logger.warning("Service busy, retrying in %d seconds", delay)
+            self.ready_at = self._clock() + delay
+        return self.report
+
+    def result(self, sleep=time.sleep):
+        """Wait for the report, polling whenever an attempt is due.
+
+        :param sleep: function to wait a number of seconds with
+        :return: the :class:`pycounter.report.CounterReport`
+        """
+        while True:
+            report = self.poll()
+            if report is not None:
+                return report
+            sleep(self.wait_time())
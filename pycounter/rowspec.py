@@ -0,0 +1,119 @@
+"""Column layouts of the data rows of tabular COUNTER reports."""
+
+import array
+import collections
+
+from pycounter.exceptions import UnknownReportTypeError
+from pycounter.helpers import format_stat, month_axis
+from pycounter.resources import (
+    CounterBook,
+    CounterDatabase,
+    CounterJournal,
+    CounterPlatform,
+)
+
+RowSpec = collections.namedtuple(
+    "RowSpec", "resource_class text stripped totals metric_col first_month trim"
+)
+RowSpec.__doc__ = """Layout of the data rows of a tabular report type.
+
+:param resource_class: CounterEresource subclass to create for each row
+:param text: dict of constructor argument to column index, passed as is
+:param stripped: dict of constructor argument to column index, stripped of
+    surrounding whitespace
+:param totals: dict of constructor argument to column index, converted
+    with :py:func:`format_stat <pycounter.helpers.format_stat>`
+:param metric_col: column holding the row's metric, or None to use the
+    report's metric
+:param first_month: column holding the first month's usage
+:param trim: whether to ignore columns past the last non-empty header cell
+"""
+
+_JOURNAL_TEXT = {
+    "title": 0,
+    "publisher": 1,
+    "platform": 2,
+    "doi": 3,
+    "proprietary_id": 4,
+}
+_TITLE_TEXT = {"title": 0, "publisher": 1, "platform": 2}
+_JR1_SPEC = RowSpec(
+    CounterJournal,
+    _JOURNAL_TEXT,
+    {"issn": 5, "eissn": 6},
+    {"html_total": 8, "pdf_total": 9},
+    None,
+    10,
+    True,
+)
+_TR_J_SPEC = _JR1_SPEC._replace(metric_col=9)
+_BR_SPEC = RowSpec(CounterBook, _TITLE_TEXT, {"isbn": 5, "issn": 6}, {}, None, 8, True)
+_DB_SPEC = RowSpec(CounterDatabase, _TITLE_TEXT, {}, {}, 3, 5, False)
+
+#: Row layouts of tabular reports, by report type.
+ROW_SPECS = {
+    "JR1": _JR1_SPEC,
+    "JR1 GOA": _JR1_SPEC,
+    "JR2": RowSpec(
+        CounterJournal, _JOURNAL_TEXT, {"issn": 5, "eissn": 6}, {}, 7, 9, True
+    ),
+    "BR1": _BR_SPEC,
+    "BR2": _BR_SPEC,
+    "BR3": RowSpec(CounterBook, _JOURNAL_TEXT, {"isbn": 5}, {}, 7, 9, True),
+    "DB1": _DB_SPEC,
+    "DB2": _DB_SPEC,
+    "PR1": RowSpec(
+        CounterPlatform, {"platform": 0, "publisher": 1}, {}, {}, 2, 4, False
+    ),
+    "TR_J1": _TR_J_SPEC,
+    "TR_J2": _TR_J_SPEC,
+}
+
+
+def compile_row_parser(report, last_col):
+    """Build a function converting rows of a report into resources.
+
+    The report type's :py:class:`RowSpec` is looked up once, so that
+    parsing each row only has to pick out the cells it names.
+
+    :param report: a CounterReport the rows come from
+    :param last_col: last column number containing data
+    :return: function taking a sequence of cells in a report line and
+        returning an appropriate CounterResource subclass instance
+    """
+    try:
+        spec = ROW_SPECS[report.report_type]
+    except KeyError:
+        raise UnknownReportTypeError(report.report_type)
+
+    resource_class = spec.resource_class
+    text = tuple(spec.text.items())
+    stripped = tuple(spec.stripped.items())
+    totals = tuple(spec.totals.items())
+    metric_col = spec.metric_col
+    first_month = spec.first_month
+    stop = last_col if spec.trim else None
+    period = report.period
+    metric = report.metric
+
+    start = month_axis(period).start
+
+    def parse_row(line):
+        # pylint: disable=protected-access
+        kwargs = {name: line[col] for name, col in text}
+        for name, col in stripped:
+            kwargs[name] = line[col].strip()
+        for name, col in totals:
+            kwargs[name] = format_stat(line[col])
+        resource = resource_class(
+            period=period,
+            metric=metric if metric_col is None else line[metric_col],
+            **kwargs
+        )
+        # months are consecutive from the start of the period, so the usage
+        # array can be filled in directly
+        resource._start = start
+        resource._usage = array.array("q", map(format_stat, line[first_month:stop]))
+        return resource
+
+    return parse_row
@@ -1,27 +1,28 @@
 """NISO SUSHI support."""
 
 import collections
+import concurrent.futures
 import datetime
+import inspect
+import io
 import logging
-import time
 import uuid
 import warnings
 
-from lxml import etree
-from lxml import objectify
-import pendulum
-import requests
-
 from pycounter import sushi5
+from pycounter import transport
 import pycounter.constants
 import pycounter.exceptions
-from pycounter.helpers import convert_date_run
+from pycounter.helpers import convert_date_run, split_period
 import pycounter.report
-
+from pycounter.retry import PendingReport, RetryPolicy
 
 logger = logging.getLogger(__name__)
 NS = pycounter.constants.NS
 
+#: Default greatest number of parts of a chunked report fetched at once.
+CHUNK_WORKERS = 4
+
 
 def get_sushi_stats_raw(
     wsdl_url,
@@ -36,6 +37,9 @@ def get_sushi_stats_raw(
     release=4,
     sushi_dump=False,
     verify=True,
+    session=None,
+    timeout=30,
+    limiter=None,
     **extra_params,
 ):
     """Get SUSHI stats for a given site in raw XML format.
@@ -65,13 +69,74 @@ def get_sushi_stats_raw(
 
     :param verify: bool: whether to verify SSL certificates
 
+    :param session: :class:`requests.Session` to make the request with, such
+        as one from :func:`pycounter.transport.make_session`
+
+    :param timeout: seconds to wait for the server to respond
+
+    :param limiter: :class:`pycounter.transport.HostLimiter` to pace the
+        request and cap concurrent requests to the server's host
+
     :param extra_params: extra params are passed to requests.post
 
     """
     # pylint: disable=too-many-locals
+    request = _report_request(
+        wsdl_url,
+        start_date,
+        end_date,
+        requestor_id=requestor_id,
+        requestor_email=requestor_email,
+        requestor_name=requestor_name,
+        customer_reference=customer_reference,
+        customer_name=customer_name,
+        report=report,
+        release=release,
+    )
+    with transport.limited(limiter, request.url):
+        response = transport.http_client(session).post(
+            url=request.url,
+            headers=request.headers,
+            data=request.data,
+            verify=verify,
+            timeout=timeout,
+            **extra_params,
+        )
+    transport.check_busy(response)
+
+    if sushi_dump:
+        logger.debug(
+            "SUSHI DUMP: request: %s \n\n response: %s",
+            request.data,
+            response.content,
+        )
+    return response.content
+
+
+def _report_request(
+    wsdl_url,
+    start_date,
+    end_date,
+    requestor_id=None,
+    requestor_email=None,
+    requestor_name=None,
+    customer_reference=None,
+    customer_name=None,
+    report="JR1",
+    release=4,
+):
+    """Build the SOAP request for a report.
+
+    Parameters are as for :func:`get_sushi_stats_raw`.
+
+    :return: a :class:`pycounter.transport.Request`
+    """
+    # pylint: disable=too-many-locals,import-outside-toplevel
+    from lxml import etree
+
     root = etree.Element("{%(SOAP-ENV)s}Envelope" % NS, nsmap=NS)
     body = etree.SubElement(root, "{%(SOAP-ENV)s}Body" % NS)
-    timestamp = pendulum.now("UTC").isoformat()
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
     report_req = etree.SubElement(
         body,
         "{%(sushicounter)s}ReportRequest" % NS,
@@ -115,65 +180,156 @@ def get_sushi_stats_raw(
         "User-Agent": "pycounter/%s" % pycounter.__version__,
         "Content-Length": str(len(payload)),
     }
-
-    response = requests.post(
-        url=wsdl_url,
-        headers=headers,
-        data=payload,
-        verify=verify,
-        timeout=30,
-        **extra_params,
-    )
-
-    if sushi_dump:
-        logger.debug(
-            "SUSHI DUMP: request: %s \n\n response: %s", payload, response.content
-        )
-    return response.content
+    return transport.Request("POST", wsdl_url, None, payload, headers)
 
 
-def get_status(url: str, release: int) -> str:
+def get_status(url: str, release: int, session=None) -> str:
     """Request SUSHI server status."""
     if release != 5:
         raise NotImplementedError(f"Status for COUNTER {release} is not implemented.")
 
-    return sushi5.get_status(url)
+    return sushi5.get_status(url, session=session)
 
 
 def get_report(*args, **kwargs):
     """Get a usage report from a SUSHI server.
 
-    returns a :class:`pycounter.report.CounterReport` object.
+    returns a :class:`pycounter.report.CounterReport` object (or a
+    :class:`pycounter.retry.PendingReport`, with ``wait=False``).
 
     parameters: see get_sushi_stats_raw
 
-    :param no_delay: don't delay in retrying Report Queued
+    :param no_delay: don't delay in retrying Report Queued (same as
+        ``retry_policy=RetryPolicy.immediate()``)
+
+    :param retry_policy: :class:`pycounter.retry.RetryPolicy` saying how to
+        retry a busy service or queued report (default: ``RetryPolicy()``,
+        which keeps trying with exponential backoff)
+
+    :param wait: if False, return a :class:`pycounter.retry.PendingReport`
+        after the first attempt, instead of waiting for the report
+
+    :param session: :class:`requests.Session` to reuse connections from, such
+        as one from :func:`pycounter.transport.make_session`
+
+    :param limiter: :class:`pycounter.transport.HostLimiter` shared by the
+        requests of a harvest, to keep within each host's rate and
+        concurrency limits
+
+    :param stream: (COUNTER 5 only) decode the JSON response incrementally
+        as it is downloaded, rather than all at once
+
+    :param chunk_months: if given, request the report in parts of at most
+        this many months, concurrently, and merge them with
+        :func:`pycounter.report.merge_reports`
+
+    :param max_workers: number of parts of a chunked request to fetch at the
+        same time (default: up to :data:`CHUNK_WORKERS`)
+
+    :param cache: :class:`pycounter.cache.ResponseCache` to get the report
+        from if it has already been fetched with the same parameters, and
+        to store the response in otherwise
+
+    :param archive: :class:`pycounter.archive.ResponseArchive` to keep a copy
+        of each response fetched from the server in
     """
-    if kwargs.get("release") == 5:
+    release = kwargs.get("release", 4)
+    if release == 5:
         gssr = sushi5.get_sushi_stats_raw
         rtf = sushi5.raw_to_full
 
     else:
         gssr = get_sushi_stats_raw
         rtf = raw_to_full
-        if "api_key" in kwargs:
-            if kwargs["api_key"] is not None:
-                warnings.warn(
-                    pycounter.exceptions.SushiWarning(
-                        "api_key only supported in COUNTER 5"
-                    )
-                )
-            kwargs.pop("api_key", None)
+        _drop_api_key(kwargs)
+
+    chunk_months = kwargs.pop("chunk_months", None)
+    max_workers = kwargs.pop("max_workers", None)
+    if chunk_months:
+        if not kwargs.get("wait", True):
+            raise ValueError("chunk_months can't be used with wait=False")
+        kwargs = _keyword_args(gssr, args, kwargs)
+        chunks = split_period((kwargs["start_date"], kwargs["end_date"]), chunk_months)
+        if len(chunks) > 1:
+            return _get_chunked_report(kwargs, chunks, max_workers)
+        args = ()
 
     no_delay = kwargs.pop("no_delay", False)
-    delay_amount = 0 if no_delay else 60
-    while True:
-        try:
-            raw_report = gssr(*args, **kwargs)
-            return rtf(raw_report)
-        except pycounter.exceptions.ServiceBusyError:
-            print("Service busy, retrying in %d seconds" % delay_amount)
-            time.sleep(delay_amount)
+    retry_policy = kwargs.pop("retry_policy", None)
+    wait = kwargs.pop("wait", True)
+    cache = kwargs.pop("cache", None)
+    archive = kwargs.pop("archive", None)
+    if retry_policy is None:
+        retry_policy = RetryPolicy.immediate() if no_delay else RetryPolicy()
+
+    fetch = _report_fetcher(gssr, rtf, args, kwargs, cache, archive)
+    pending = PendingReport(fetch, retry_policy)
+    if not wait:
+        pending.poll()
+        return pending
+    return pending.result()
+
+
+def _report_fetcher(gssr, rtf, args, kwargs, cache, archive):
+    """Make a function that fetches and converts a report once.
+
+    :param gssr: function to get the raw report with
+    :param rtf: function to convert the raw report with
+    :param args: positional arguments for ``gssr``
+    :param kwargs: keyword arguments for ``gssr``, including ``release``
+        for COUNTER 5
+    :param cache: :class:`pycounter.cache.ResponseCache` or None
+    :param archive: :class:`pycounter.archive.ResponseArchive` or None
+    """
+
+    if kwargs.get("release") == 5 and (cache is not None or archive is not None):
+        # get the body undecoded, to keep it exactly as the server sent it
+        kwargs = dict(kwargs, stream=True)
+
+    def params():
+        return dict(_keyword_args(gssr, args, kwargs), release=kwargs.get("release", 4))
+
+    def fetch_raw():
+        raw = gssr(*args, **kwargs)
+        if archive is not None:
+            raw = archive.record(params(), raw)
+        return raw
+
+    def fetch():
+        if cache is not None:
+            return cache.fetch(params(), fetch_raw, rtf)
+        return rtf(fetch_raw())
+
+    return fetch
+
+
+def _keyword_args(func, args, kwargs):
+    """Turn positional arguments to a function into keyword arguments."""
+    names = list(inspect.signature(func).parameters)
+    return dict(zip(names, args), **kwargs)
+
+
+def _get_chunked_report(kwargs, chunks, max_workers):
+    """Get a report for each (start, end) chunk concurrently, and merge them."""
+    if max_workers is None:
+        max_workers = min(len(chunks), CHUNK_WORKERS)
+
+    def get_chunk(chunk):
+        return get_report(**dict(kwargs, start_date=chunk[0], end_date=chunk[1]))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        reports = list(executor.map(get_chunk, chunks))
+    return pycounter.report.merge_reports(reports)
+
+
+def _drop_api_key(kwargs):
+    """Remove api_key from COUNTER 4 request arguments, warning if it is set."""
+    if "api_key" in kwargs:
+        if kwargs["api_key"] is not None:
+            warnings.warn(
+                pycounter.exceptions.SushiWarning("api_key only supported in COUNTER 5")
+            )
+        kwargs.pop("api_key", None)
 
 
 def ns(namespace, name):
@@ -185,232 +341,358 @@ def ns(namespace, name):
     return "{" + NS[namespace] + "}" + name
 
 
+_BEGIN = ns("sushi", "Begin")
+_END = ns("sushi", "End")
+_MESSAGE = ns("sushi", "Message")
+_REPORT_DEFINITION = ns("sushi", "ReportDefinition")
+_COUNTER_REPORT = ns("counter", "Report")
+_CUSTOMER = ns("counter", "Customer")
+_CUSTOMER_ID = ns("counter", "ID")
+_CUSTOMER_NAME = ns("counter", "Name")
+_REPORT_ITEMS = ns("counter", "ReportItems")
+_ITEM_PUBLISHER = ns("counter", "ItemPublisher")
+_ITEM_NAME = ns("counter", "ItemName")
+_ITEM_PLATFORM = ns("counter", "ItemPlatform")
+_ITEM_IDENTIFIER = ns("counter", "ItemIdentifier")
+_ITEM_PERFORMANCE = ns("counter", "ItemPerformance")
+_IDENTIFIER_TYPE = ns("counter", "Type")
+_IDENTIFIER_VALUE = ns("counter", "Value")
+_PERIOD_BEGIN = ns("counter", "Period") + "/" + ns("counter", "Begin")
+_INSTANCE = ns("counter", "Instance")
+_METRIC_TYPE = ns("counter", "MetricType")
+_COUNT = ns("counter", "Count")
+
+# Only these elements produce iterparse events; everything else is still
+# built into the tree but never reaches Python.
+_STREAM_TAGS = (
+    _BEGIN,
+    _END,
+    _MESSAGE,
+    _REPORT_DEFINITION,
+    _COUNTER_REPORT,
+    _CUSTOMER,
+    _CUSTOMER_ID,
+    _CUSTOMER_NAME,
+    _REPORT_ITEMS,
+)
+
+
 def raw_to_full(raw_report):
     """Convert a raw report to CounterReport.
 
-    :param raw_report: raw XML report
+    :param raw_report: raw XML report, as bytes, str or a binary file object
     :return: a :class:`pycounter.report.CounterReport`
     """
-    # pylint: disable=too-many-statements,too-many-branches,too-many-locals
+    report, resources = iter_raw_to_full(raw_report)
+    report.pubs.extend(resources)
+    return report
+
+
+def iter_raw_to_full(raw_report):
+    """Convert a raw report to CounterReport, streaming its resources.
+
+    The XML is parsed incrementally; each ``ReportItems`` element is
+    converted as soon as it has been read and then discarded, so memory use
+    does not grow with the size of the response.
+
+    :param raw_report: raw XML report, as bytes, str or a binary file object
+    :return: ``(report, resources)`` tuple, where ``report`` is a
+        :class:`pycounter.report.CounterReport` with an empty ``pubs`` list
+        and ``resources`` is an iterator of
+        :class:`pycounter.report.CounterEresource` objects
+    """
+    resources = _iter_report(raw_report)
+    report = next(resources)
+    return report, resources
+
+
+def _iter_report(raw_report):
+    """Generate the report header followed by its resources.
+
+    The first value generated is the :class:`CounterReport`; all later ones
+    are resources belonging to it.
+    """
+    # pylint: disable=too-many-statements,too-many-branches
+    # pylint: disable=import-outside-toplevel
+    from lxml import etree
+
+    if hasattr(raw_report, "read"):
+        source = raw_report
+    else:
+        if isinstance(raw_report, str):
+            raw_report = raw_report.encode("utf-8")
+        source = io.BytesIO(raw_report)
+
+    events = etree.iterparse(
+        source, events=("start", "end"), tag=_STREAM_TAGS, huge_tree=True
+    )
+    header = {"customer": "", "inst_id": ""}
+    report = None
+    customer = None
+    messages = []
+
     try:
-        root = etree.fromstring(raw_report)
+        for event, elem in events:
+            tag = elem.tag
+            if event == "start":
+                if tag == _REPORT_DEFINITION:
+                    header.setdefault("definition", elem)
+                elif tag == _COUNTER_REPORT:
+                    header.setdefault("created", elem.get("Created"))
+                elif tag == _CUSTOMER and "created" in header:
+                    if "customer_seen" not in header:
+                        header["customer_seen"] = True
+                        customer = elem
+                continue
+
+            if tag == _REPORT_ITEMS:
+                if customer is not None and elem.getparent() is customer:
+                    if report is None:
+                        report = _build_report(header)
+                        yield report
+                    yield from _item_resources(elem, report)
+                # Drop the item (converted or another customer's) and
+                # everything before it.
+                _drop_element(elem)
+            elif tag == _BEGIN:
+                header.setdefault("begin", elem.text)
+            elif tag == _END:
+                header.setdefault("end", elem.text)
+            elif tag == _CUSTOMER_ID:
+                if customer is not None and elem.getparent() is customer:
+                    header["inst_id"] = elem.text
+            elif tag == _CUSTOMER_NAME:
+                if customer is not None and elem.getparent() is customer:
+                    header["customer"] = elem.text
+            elif tag == _CUSTOMER:
+                if elem is customer:
+                    customer = None
+                _drop_element(elem)
+            elif tag == _MESSAGE:
+                messages.append(elem.text or "")
     except etree.XMLSyntaxError:
         logger.error("XML syntax error: %s", raw_report)
         raise pycounter.exceptions.SushiException(
             message="XML syntax error", raw=raw_report
         )
-    o_root = objectify.fromstring(raw_report)
-    rep = None
-    try:
-        rep = o_root.Body[ns("sushicounter", "ReportResponse")]
-        c_report = rep.Report[ns("counter", "Report")]
-    except AttributeError:
-        try:
-            c_report = rep.Report[ns("counter", "Reports")].Report
-        except AttributeError:
-            if b"Report Queued" in raw_report:
+
+    if report is None:
+        if "created" not in header:
+            if any("Report Queued" in message for message in messages) or (
+                isinstance(raw_report, bytes) and b"Report Queued" in raw_report
+            ):
                 raise pycounter.exceptions.ServiceBusyError("Report Queued")
             logger.error("report not found in XML: %s", raw_report)
             raise pycounter.exceptions.SushiException(
-                message="report not found in XML", raw=raw_report, xml=o_root
+                message="report not found in XML", raw=raw_report, xml=events.root
             )
-    logger.debug("COUNTER report: %s", etree.tostring(c_report))
-    start_date = datetime.datetime.strptime(
-        root.find(".//%s" % ns("sushi", "Begin")).text, "%Y-%m-%d"
-    ).date()
+        yield _build_report(header)
 
-    end_date = datetime.datetime.strptime(
-        root.find(".//%s" % ns("sushi", "End")).text, "%Y-%m-%d"
-    ).date()
 
-    report_data = {"period": (start_date, end_date)}
+def _drop_element(elem):
+    """Clear a parsed element, and remove its earlier siblings from the tree."""
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    while elem.getprevious() is not None:
+        del parent[0]
 
-    rep_def = root.find(".//%s" % ns("sushi", "ReportDefinition"))
-    report_data["report_version"] = int(rep_def.get("Release"))
 
-    report_data["report_type"] = rep_def.get("Name")
+def _build_report(header):
+    """Make an empty CounterReport from header values seen while streaming."""
+    # pylint: disable=import-outside-toplevel
+    import pendulum
 
-    customer = root.find(".//%s" % ns("counter", "Customer"))
-    try:
-        report_data["customer"] = customer.find(".//%s" % ns("counter", "Name")).text
-    except AttributeError:
-        report_data["customer"] = ""
-
-    try:
-        inst_id = customer.find(".//%s" % ns("counter", "ID")).text
-    except AttributeError:
-        inst_id = ""
-    report_data["institutional_identifier"] = inst_id
-
-    rep_root = root.find(".//%s" % ns("counter", "Report"))
-    created_string = rep_root.get("Created")
+    start_date = datetime.datetime.strptime(header["begin"], "%Y-%m-%d").date()
+    end_date = datetime.datetime.strptime(header["end"], "%Y-%m-%d").date()
+    rep_def = header["definition"]
+    created_string = header["created"]
     if created_string is not None:
-        report_data["date_run"] = pendulum.parse(created_string)
+        date_run = pendulum.parse(created_string)
     else:
-        report_data["date_run"] = datetime.datetime.now()
-
-    report = pycounter.report.CounterReport(**report_data)
-
-    report.metric = pycounter.constants.METRICS.get(report_data["report_type"])
-
-    for item in c_report.Customer.ReportItems:
-        try:
-            publisher_name = item.ItemPublisher.text
-        except AttributeError:
-            publisher_name = ""
-        title = item.ItemName.text
-        platform = item.ItemPlatform.text
-
-        eissn = issn = ""
-        print_isbn = None
-        online_isbn = None
-        doi = ""
-        prop_id = ""
-
-        try:
-            for identifier in item.ItemIdentifier:
-                if identifier.Type == "Print_ISSN":
-                    issn = identifier.Value.text
-                    if issn is None:
-                        issn = ""
-                elif identifier.Type == "Online_ISSN":
-                    eissn = identifier.Value.text
-                    if eissn is None:
-                        eissn = ""
-                elif identifier.Type == "Online_ISBN":
-                    online_isbn = identifier.Value.text
-                elif identifier.Type == "Print_ISBN":
-                    print_isbn = identifier.Value.text
-                elif identifier.Type == "DOI":
-                    doi = identifier.Value.text
-                elif identifier.Type == "Proprietary":
-                    prop_id = identifier.Value.text
-
-        except AttributeError:
-            pass
-
-        month_data = []
-        html_usage = 0
-        pdf_usage = 0
-
-        metrics_for_db = collections.OrderedDict()
-
-        for perform_item in item.ItemPerformance:
-            item_date = convert_date_run(perform_item.Period.Begin.text)
-            logger.debug("perform_item date: %r", item_date)
-            usage = None
-            if hasattr(perform_item, "Instance"):
-                for inst in perform_item.Instance:
-                    if inst.MetricType == "ft_total":
-                        usage = str(inst.Count)
-                    elif inst.MetricType == "ft_pdf":
-                        pdf_usage += int(inst.Count)
-                    elif inst.MetricType == "ft_html":
-                        html_usage += int(inst.Count)
-                    elif report.report_type.startswith("DB") or report.report_type in (
-                        "PR1",
-                        "JR2",
-                        "BR3",
-                    ):
-                        metrics_for_db.setdefault(inst.MetricType, []).append(
-                            (item_date, int(inst.Count))
-                        )
-            if usage is not None:
-                month_data.append((item_date, int(usage)))
-
-        if report.report_type:
-            if report.report_type == "JR1":
-                report.pubs.append(
-                    pycounter.report.CounterJournal(
-                        title=title,
-                        platform=platform,
-                        publisher=publisher_name,
-                        period=report.period,
-                        metric=report.metric,
-                        issn=issn,
-                        eissn=eissn,
-                        doi=doi,
-                        proprietary_id=prop_id,
-                        month_data=month_data,
-                        html_total=html_usage,
-                        pdf_total=pdf_usage,
-                    )
+        date_run = datetime.datetime.now()
+
+    report = pycounter.report.CounterReport(
+        period=(start_date, end_date),
+        report_version=int(rep_def.get("Release")),
+        report_type=rep_def.get("Name"),
+        customer=header["customer"],
+        institutional_identifier=header["inst_id"],
+        date_run=date_run,
+    )
+    report.metric = pycounter.constants.METRICS.get(report.report_type)
+    return report
+
+
+def _item_resources(item, report):
+    """Convert one ReportItems element to resources.
+
+    :param item: a fully parsed ``ReportItems`` element
+    :param report: the :class:`pycounter.report.CounterReport` it belongs to
+    :return: list of :class:`pycounter.report.CounterEresource`
+    """
+    # pylint: disable=too-many-branches,too-many-locals
+    publisher = item.find(_ITEM_PUBLISHER)
+    publisher_name = "" if publisher is None else publisher.text
+    title = item.find(_ITEM_NAME).text
+    platform = item.find(_ITEM_PLATFORM).text
+
+    eissn = issn = ""
+    print_isbn = None
+    online_isbn = None
+    doi = ""
+    prop_id = ""
+
+    for identifier in item.iterfind(_ITEM_IDENTIFIER):
+        id_type = identifier.findtext(_IDENTIFIER_TYPE)
+        value = identifier.find(_IDENTIFIER_VALUE)
+        value = None if value is None else value.text
+        if id_type == "Print_ISSN":
+            issn = value or ""
+        elif id_type == "Online_ISSN":
+            eissn = value or ""
+        elif id_type == "Online_ISBN":
+            online_isbn = value
+        elif id_type == "Print_ISBN":
+            print_isbn = value
+        elif id_type == "DOI":
+            doi = value
+        elif id_type == "Proprietary":
+            prop_id = value
+
+    keeps_metrics = report.report_type.startswith("DB") or report.report_type in (
+        "PR1",
+        "JR2",
+        "BR3",
+    )
+    month_data, html_usage, pdf_usage, metrics_for_db = _item_usage(item, keeps_metrics)
+
+    resources = []
+    if report.report_type == "JR1":
+        resources.append(
+            pycounter.report.CounterJournal(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric=report.metric,
+                issn=issn,
+                eissn=eissn,
+                doi=doi,
+                proprietary_id=prop_id,
+                month_data=month_data,
+                html_total=html_usage,
+                pdf_total=pdf_usage,
+            )
+        )
+    elif report.report_type == "BR3":
+        for metric_code, month_data in metrics_for_db.items():
+            metric = pycounter.constants.DB_METRIC_MAP[metric_code]
+            resources.append(
+                pycounter.report.CounterBook(
+                    title=title,
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=metric,
+                    issn=issn,
+                    print_isbn=print_isbn,
+                    online_isbn=online_isbn,
+                    doi=doi,
+                    proprietary_id=prop_id,
+                    month_data=month_data,
                 )
-            elif report.report_type == "BR3":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        pycounter.report.CounterBook(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            issn=issn,
-                            print_isbn=print_isbn,
-                            online_isbn=online_isbn,
-                            doi=doi,
-                            proprietary_id=prop_id,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type.startswith("BR"):
-                # BR1, BR2
-                report.pubs.append(
-                    pycounter.report.CounterBook(
-                        title=title,
-                        platform=platform,
-                        publisher=publisher_name,
-                        period=report.period,
-                        metric=report.metric,
-                        issn=issn,
-                        doi=doi,
-                        proprietary_id=prop_id,
-                        print_isbn=print_isbn,
-                        online_isbn=online_isbn,
-                        month_data=month_data,
-                    )
+            )
+    elif report.report_type.startswith("BR"):
+        # BR1, BR2
+        resources.append(
+            pycounter.report.CounterBook(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric=report.metric,
+                issn=issn,
+                doi=doi,
+                proprietary_id=prop_id,
+                print_isbn=print_isbn,
+                online_isbn=online_isbn,
+                month_data=month_data,
+            )
+        )
+    elif report.report_type.startswith("DB"):
+        for metric_code, month_data in metrics_for_db.items():
+            metric = pycounter.constants.DB_METRIC_MAP[metric_code]
+            resources.append(
+                pycounter.report.CounterDatabase(
+                    title=title,
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=metric,
+                    month_data=month_data,
                 )
-            elif report.report_type.startswith("DB"):
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        pycounter.report.CounterDatabase(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type == "PR1":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        pycounter.report.CounterPlatform(
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            month_data=month_data,
-                        )
-                    )
-            elif report.report_type == "JR2":
-                for metric_code, month_data in metrics_for_db.items():
-                    metric = pycounter.constants.DB_METRIC_MAP[metric_code]
-                    report.pubs.append(
-                        pycounter.report.CounterJournal(
-                            title=title,
-                            platform=platform,
-                            publisher=publisher_name,
-                            period=report.period,
-                            metric=metric,
-                            issn=issn,
-                            eissn=eissn,
-                            doi=doi,
-                            proprietary_id=prop_id,
-                            month_data=month_data,
-                        )
-                    )
-    return report
+            )
+    elif report.report_type == "PR1":
+        for metric_code, month_data in metrics_for_db.items():
+            metric = pycounter.constants.DB_METRIC_MAP[metric_code]
+            resources.append(
+                pycounter.report.CounterPlatform(
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=metric,
+                    month_data=month_data,
+                )
+            )
+    elif report.report_type == "JR2":
+        for metric_code, month_data in metrics_for_db.items():
+            metric = pycounter.constants.DB_METRIC_MAP[metric_code]
+            resources.append(
+                pycounter.report.CounterJournal(
+                    title=title,
+                    platform=platform,
+                    publisher=publisher_name,
+                    period=report.period,
+                    metric=metric,
+                    issn=issn,
+                    eissn=eissn,
+                    doi=doi,
+                    proprietary_id=prop_id,
+                    month_data=month_data,
+                )
+            )
+    return resources
+
+
+def _item_usage(item, keeps_metrics):
+    """Add up the usage in the ItemPerformance elements of a ReportItems.
+
+    :param item: a fully parsed ``ReportItems`` element
+    :param keeps_metrics: whether to keep the usage of metrics other than
+        the full-text ones, for reports with a line per metric
+    :return: tuple of ``ft_total`` usage as (datetime.date, usage) tuples,
+        ``ft_html`` and ``ft_pdf`` totals, and an OrderedDict of other
+        metrics' usage as (datetime.date, usage) tuples
+    """
+    month_data = []
+    html_usage = 0
+    pdf_usage = 0
+    metrics_for_db = collections.OrderedDict()
+    for perform_item in item.iterfind(_ITEM_PERFORMANCE):
+        item_date = convert_date_run(perform_item.findtext(_PERIOD_BEGIN))
+        usage = None
+        for inst in perform_item.iterfind(_INSTANCE):
+            metric_type = inst.findtext(_METRIC_TYPE)
+            if metric_type == "ft_total":
+                usage = inst.findtext(_COUNT)
+            elif metric_type == "ft_pdf":
+                pdf_usage += int(inst.findtext(_COUNT))
+            elif metric_type == "ft_html":
+                html_usage += int(inst.findtext(_COUNT))
+            elif keeps_metrics:
+                metrics_for_db.setdefault(metric_type, []).append(
+                    (item_date, int(inst.findtext(_COUNT)))
+                )
+        if usage is not None:
+            month_data.append((item_date, int(usage)))
+    return month_data, html_usage, pdf_usage, metrics_for_db
@@ -1,18 +1,21 @@
 """COUNTER 5 SUSHI support."""
 
 import collections
+import contextlib
 import datetime
 import logging
 import warnings
 
-import pendulum
-import requests
-
+from pycounter import jsonstream
+from pycounter import transport
 import pycounter.exceptions
 from pycounter.helpers import convert_date_run
 import pycounter.report
 
 DEPRECATED_KEYS = {"requestor_email", "requestor_name", "customer_name"}
+#: COUNTER 5 exception codes meaning "try again later": Service Busy and
+#: Report Queued for Processing.
+BUSY_CODES = {1010, 1011}
 
 logger = logging.getLogger(__name__)
 
@@ -71,16 +74,101 @@ def _get_identifiers(item):
 def raw_to_full(raw_report):
     """Convert a raw report to CounterReport.
 
-    :param raw_report: raw report as dict decoded from JSON
+    :param raw_report: raw report as dict decoded from JSON, or undecoded JSON
+        in any form accepted by :func:`iter_raw_to_full`
     :return: a :class:`pycounter.report.CounterReport`
     """
-    # pylint: disable=too-many-locals
-    header = raw_report["Report_Header"]
+    report, resources = iter_raw_to_full(raw_report)
+    report.pubs.extend(resources)
+    return report
+
+
+def iter_raw_to_full(raw_report):
+    """Convert a raw report to CounterReport, streaming its resources.
+
+    Undecoded JSON is decoded incrementally: ``Report_Header`` is read
+    first, and each of ``Report_Items`` is converted as soon as it has been
+    decoded, so the full item list is never held in memory. As in
+    :func:`get_sushi_stats_raw`, exceptions in the header of undecoded JSON
+    raise :class:`pycounter.exceptions.Sushi5Error`.
+
+    :param raw_report: raw report as dict decoded from JSON, or as JSON
+        ``bytes``, ``str``, binary file object or iterable of ``bytes`` chunks
+        (such as returned by ``get_sushi_stats_raw(stream=True)``)
+    :return: ``(report, resources)`` tuple, where ``report`` is a
+        :class:`pycounter.report.CounterReport` with an empty ``pubs`` list
+        and ``resources`` is an iterator of
+        :class:`pycounter.report.CounterEresource` objects
+    """
+    resources = _iter_report(raw_report)
+    report = next(resources)
+    return report, resources
+
+
+def _iter_members(raw_report):
+    """Generate top-level (key, value) pairs, one per item for Report_Items."""
+    if isinstance(raw_report, dict):
+        for key, value in raw_report.items():
+            if key == "Report_Items":
+                for item in value:
+                    yield key, item
+            else:
+                yield key, value
+    else:
+        chunks = jsonstream.iter_chunks(raw_report)
+        yield from jsonstream.iter_members(chunks, stream_keys=("Report_Items",))
+
+
+def _iter_report(raw_report):
+    """Generate the report header followed by its resources.
+
+    The first value generated is the :class:`CounterReport`; all later ones
+    are resources belonging to it.
+    """
+    check_exceptions = not isinstance(raw_report, dict)
+    top_level = {}
+    report = None
+    # items that came before Report_Header, which is not required to be first
+    pending = []
+
+    for key, value in _iter_members(raw_report):
+        if key != "Report_Items":
+            top_level[key] = value
+        elif report is None and "Report_Header" not in top_level:
+            pending.append(value)
+        else:
+            if report is None:
+                report = _build_report(top_level, check_exceptions)
+                yield report
+                for item in pending:
+                    yield from _item_resources(item, report)
+                pending = []
+            yield from _item_resources(value, report)
+
+    if report is None:
+        report = _build_report(top_level, check_exceptions)
+        yield report
+        for item in pending:
+            yield from _item_resources(item, report)
+
+
+def _build_report(top_level, check_exceptions):
+    """Make an empty CounterReport from top-level members of a raw report."""
+    import pendulum  # pylint: disable=import-outside-toplevel
+
+    try:
+        header = top_level["Report_Header"]
+    except KeyError:
+        raise pycounter.exceptions.SushiException(
+            message="Report_Header not found in JSON"
+        )
+    if check_exceptions:
+        _check_exceptions(header)
     period = _dates_from_filters(header["Report_Filters"])
     date_run = header.get("Created")
-    report = pycounter.report.CounterReport(
+    return pycounter.report.CounterReport(
         period=period,
-        report_version=int(header.get("Release", raw_report.get("Release", 5))),
+        report_version=int(header.get("Release", top_level.get("Release", 5))),
         report_type=header["Report_ID"],
         customer=header.get("Institution_Name", ""),
         institutional_identifier=header.get("Customer_ID", ""),
@@ -88,78 +176,99 @@ def raw_to_full(raw_report):
         date_run=pendulum.parse(date_run) if date_run else datetime.datetime.now(),
     )
 
-    for item in raw_report["Report_Items"]:
-        publisher_name = item.get("Publisher", "")
-        platform = item.get("Platform", "")
-        title = item["Title"]
 
-        identifiers = _get_identifiers(item)
+def _item_resources(item, report):
+    """Convert one of Report_Items to resources.
 
-        metrics_data = collections.OrderedDict()
+    :param item: a report item, as dict decoded from JSON
+    :param report: the :class:`pycounter.report.CounterReport` it belongs to
+    :return: list of :class:`pycounter.report.CounterEresource`
+    """
+    publisher_name = item.get("Publisher", "")
+    platform = item.get("Platform", "")
+    title = item["Title"]
 
-        for perform_item in item["Performance"]:
-            item_date = convert_date_run(perform_item["Period"]["Begin_Date"])
-            for inst in perform_item["Instance"]:
-                usage = inst["Count"]
-                metrics_data.setdefault(inst["Metric_Type"], []).append(
-                    (item_date, int(usage))
-                )
+    identifiers = _get_identifiers(item)
+
+    metrics_data = collections.OrderedDict()
 
-        if report.report_type == "TR_J1":
-            report.pubs.append(
+    for perform_item in item["Performance"]:
+        item_date = convert_date_run(perform_item["Period"]["Begin_Date"])
+        for inst in perform_item["Instance"]:
+            usage = inst["Count"]
+            metrics_data.setdefault(inst["Metric_Type"], []).append(
+                (item_date, int(usage))
+            )
+
+    resources = []
+    if report.report_type == "TR_J1":
+        resources.append(
+            pycounter.report.CounterJournal(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric="Total_Item_Requests",
+                issn=identifiers["issn"],
+                eissn=identifiers["eissn"],
+                doi=identifiers["doi"],
+                proprietary_id=identifiers["prop_id"],
+                month_data=metrics_data["Total_Item_Requests"],
+            )
+        )
+    elif report.report_type == "TR_J2":
+        for metric, data in metrics_data.items():
+            resources.append(
                 pycounter.report.CounterJournal(
                     title=title,
                     platform=platform,
                     publisher=publisher_name,
                     period=report.period,
-                    metric="Total_Item_Requests",
+                    metric=metric,
                     issn=identifiers["issn"],
                     eissn=identifiers["eissn"],
                     doi=identifiers["doi"],
                     proprietary_id=identifiers["prop_id"],
-                    month_data=metrics_data["Total_Item_Requests"],
+                    month_data=data,
                 )
             )
-        elif report.report_type == "TR_J2":
-            for metric, data in metrics_data.items():
-                report.pubs.append(
-                    pycounter.report.CounterJournal(
-                        title=title,
-                        platform=platform,
-                        publisher=publisher_name,
-                        period=report.period,
-                        metric=metric,
-                        issn=identifiers["issn"],
-                        eissn=identifiers["eissn"],
-                        doi=identifiers["doi"],
-                        proprietary_id=identifiers["prop_id"],
-                        month_data=data,
-                    )
-                )
-        elif report.report_type.startswith("TR_B"):
-            report.pubs.append(
-                pycounter.report.CounterBook(
-                    title=title,
-                    platform=platform,
-                    publisher=publisher_name,
-                    period=report.period,
-                    metric="Total_Item_Requests",
-                    issn=identifiers["issn"],
-                    isbn=identifiers["isbn"],
-                    doi=identifiers["doi"],
-                    proprietary_id=identifiers["prop_id"],
-                    month_data=metrics_data["Total_Item_Requests"],
-                )
+    elif report.report_type.startswith("TR_B"):
+        resources.append(
+            pycounter.report.CounterBook(
+                title=title,
+                platform=platform,
+                publisher=publisher_name,
+                period=report.period,
+                metric="Total_Item_Requests",
+                issn=identifiers["issn"],
+                isbn=identifiers["isbn"],
+                doi=identifiers["doi"],
+                proprietary_id=identifiers["prop_id"],
+                month_data=metrics_data["Total_Item_Requests"],
             )
-        else:
-            raise pycounter.exceptions.UnknownReportTypeError
+        )
+    else:
+        raise pycounter.exceptions.UnknownReportTypeError
+    return resources
 
-    return report
+
+def _check_exceptions(header):
+    """Raise Sushi5Error for the first exception in a report header."""
+    if "Exceptions" in header:
+        if header["Exceptions"][0]["Code"] in BUSY_CODES:
+            error_class = pycounter.exceptions.Sushi5BusyError
+        else:
+            error_class = pycounter.exceptions.Sushi5Error
+        raise error_class(
+            message=header["Exceptions"][0]["Message"],
+            severity=header["Exceptions"][0]["Severity"],
+            code=header["Exceptions"][0]["Code"],
+        )
 
 
-def get_status(url: str) -> str:
+def get_status(url: str, session=None) -> str:
     """Request SUSHI server status."""
-    response = requests.get(f"{url}/status", timeout=30)
+    response = transport.http_client(session).get(f"{url}/status", timeout=30)
     return response.content
 
 
@@ -175,6 +284,10 @@ def get_sushi_stats_raw(
     verify=True,
     url=None,
     api_key=None,
+    stream=False,
+    session=None,
+    timeout=30,
+    limiter=None,
     **kwargs,
 ):
     """Get SUSHI stats for a given site in dict (decoded from JSON) format.
@@ -204,8 +317,86 @@ def get_sushi_stats_raw(
     :param api_key: str: API key for SUSHI provider (not used by all vendors; see
         vendor instructions to determine if this is needed)
 
+    :param stream: bool: don't download and decode the response up front;
+        instead return an iterator of raw ``bytes`` chunks of the body, to be
+        decoded incrementally by :func:`raw_to_full` or
+        :func:`iter_raw_to_full`
+
+    :param session: :class:`requests.Session` to make the request with, such
+        as one from :func:`pycounter.transport.make_session`
+
+    :param timeout: seconds to wait for the server to respond
+
+    :param limiter: :class:`pycounter.transport.HostLimiter` to pace the
+        request and cap concurrent requests to the server's host. With
+        ``stream``, the request counts against the cap until its chunks have
+        all been read or the iterator is closed.
+
     """
     # pylint: disable=too-many-locals
+    request = _report_request(
+        wsdl_url=wsdl_url,
+        start_date=start_date,
+        end_date=end_date,
+        requestor_id=requestor_id,
+        customer_reference=customer_reference,
+        report=report,
+        release=release,
+        url=url,
+        api_key=api_key,
+        **kwargs,
+    )
+    with contextlib.ExitStack() as slot:
+        slot.enter_context(transport.limited(limiter, request.url))
+        response = transport.http_client(session).get(
+            request.url,
+            params=request.params,
+            headers=request.headers,
+            verify=verify,
+            timeout=timeout,
+            stream=stream,
+        )
+        transport.check_busy(response)
+        if stream:
+            # the host's slot is held until the body has been read
+            chunks = _iter_response(response, slot.pop_all())
+            next(chunks)
+
+    if sushi_dump and stream:  # pragma: no cover
+        logger.debug("SUSHI DUMP: request: %s", vars(response.request))
+    elif sushi_dump:  # pragma: no cover
+        logger.debug(
+            "SUSHI DUMP: request: %s \n\n response: %s",
+            vars(response.request),
+            response.content,
+        )
+
+    if stream:
+        return chunks
+
+    response_data = response.json()
+    _check_exceptions(response_data["Report_Header"])
+    return response_data
+
+
+def _report_request(
+    wsdl_url=None,
+    start_date=None,
+    end_date=None,
+    requestor_id=None,
+    customer_reference=None,
+    report="TR_J1",
+    release=5,
+    url=None,
+    api_key=None,
+    **kwargs,
+):
+    """Build the request for a report.
+
+    Parameters are as for :func:`get_sushi_stats_raw`.
+
+    :return: a :class:`pycounter.transport.Request`
+    """
     _check_params(kwargs, release)
     if url is None and wsdl_url:  # pragma: no cover
         warnings.warn(
@@ -227,31 +418,20 @@ def get_sushi_stats_raw(
 
     url_full = "{url}/reports/{report}".format(**url_params)
     logger.debug(f"Making request to {url_full} with params {req_params}")
-    response = requests.get(
-        url_full,
-        params=req_params,
-        headers={"User-Agent": "pycounter/%s" % pycounter.__version__},
-        verify=verify,
-        timeout=30,
-    )
+    headers = {"User-Agent": "pycounter/%s" % pycounter.__version__}
+    return transport.Request("GET", url_full, req_params, None, headers)
 
-    if sushi_dump:  # pragma: no cover
-        logger.debug(
-            "SUSHI DUMP: request: %s \n\n response: %s",
-            vars(response.request),
-            response.content,
-        )
 
-    response_data = response.json()
+def _iter_response(response, slot):
+    """Generate chunks of a streamed response body, closing it at the end.
 
-    if "Exceptions" in response_data["Report_Header"]:
-        raise pycounter.exceptions.Sushi5Error(
-            message=response_data["Report_Header"]["Exceptions"][0]["Message"],
-            severity=response_data["Report_Header"]["Exceptions"][0]["Severity"],
-            code=response_data["Report_Header"]["Exceptions"][0]["Code"],
-        )
-
-    return response_data
+    The first value generated is None, so that once it has been taken, the
+    response is closed and ``slot`` (a context manager holding the host's
+    limiter slot) exited even if the body is never read.
+    """
+    with slot, contextlib.closing(response):
+        yield None
+        yield from response.iter_content(jsonstream.CHUNK_SIZE)
 
 
 def _check_params(kwargs, release):
@@ -3,14 +3,47 @@
 import datetime
 import logging
 import sys
+import time
 
 import click
 
+from pycounter import harvest
 from pycounter import sushi
+from pycounter import transport
+from pycounter.archive import ResponseArchive
+from pycounter.cache import ResponseCache
 from pycounter.helpers import convert_date_run, last_day, prev_month
 
 
-@click.command()
+class _DefaultGroup(click.Group):
+    """Group that runs its default command unless a subcommand is named.
+
+    This keeps ``sushiclient URL [OPTIONS]`` working alongside subcommands.
+    A help option on its own is the group's, listing the subcommands.
+    """
+
+    def __init__(self, *args, default_command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(
+    cls=_DefaultGroup,
+    default_command="fetch",
+    context_settings={"help_option_names": ["-h", "--help"]},
+)
+def main():
+    """SUSHI client: fetch a report (default) or a batch of reports."""
+
+
+@main.command("fetch")
 @click.argument("url")
 @click.option("--report", "-r", default="JR1", help="report name (default JR1)")
 @click.option("--release", "-l", default=4, help="COUNTER release (default 4)")
@@ -53,7 +86,28 @@ from pycounter.helpers import convert_date_run, last_day, prev_month
     "Probably don't do this to a real server.",
 )
 @click.option("--status", is_flag=True, help="Request server status and exit.")
-def main(
+@click.option(
+    "--chunk_months",
+    type=int,
+    help="Request the report in parts of at most this many months, "
+    "concurrently, and merge them",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, writable=True),
+    help="Reuse responses to identical requests cached in this directory",
+)
+@click.option(
+    "--cache-ttl",
+    type=float,
+    help="Seconds before a cached response expires (default: never)",
+)
+@click.option(
+    "--archive-dir",
+    type=click.Path(file_okay=False, writable=True),
+    help="Keep a compressed copy of each response from the server in this directory",
+)
+def fetch_command(
     url,
     report,
     release,
@@ -71,15 +125,23 @@ def main(
     no_ssl_verify,
     no_delay,
     status,
+    chunk_months,
+    cache_dir,
+    cache_ttl,
+    archive_dir,
 ):
-    """Main function for the SUSHI client."""
+    """Fetch a report from a SUSHI server.
+
+    See "sushiclient batch --help" to fetch many reports at once.
+    """
     # pylint: disable=too-many-locals
     if dump:
         logging.basicConfig(level=logging.DEBUG)
     else:
         logging.basicConfig()
     if status:
-        status_response = sushi.get_status(url, release)
+        with transport.make_session() as session:
+            status_response = sushi.get_status(url, release, session=session)
         click.echo(status_response)
         sys.exit(0)
     click.echo(f"pycounter SUSHI client for URL {url} ({report} R{release})")
@@ -95,26 +157,161 @@ def main(
     else:
         converted_end_date = convert_date_run(end_date)
 
-    report = sushi.get_report(
-        wsdl_url=url,
-        report=report,
-        release=release,
-        requestor_id=requestor_id,
-        requestor_name=requestor_name,
-        requestor_email=requestor_email,
-        customer_reference=customer_reference,
-        customer_name=customer_name,
-        start_date=converted_start_date,
-        end_date=converted_end_date,
-        sushi_dump=dump,
-        no_delay=no_delay,
-        verify=not no_ssl_verify,
-        api_key=api_key,
-    )
+    cache = None
+    if cache_dir is not None:
+        cache = ResponseCache(cache_dir, ttl=cache_ttl)
+    archive = None
+    if archive_dir is not None:
+        archive = ResponseArchive(archive_dir)
+
+    with transport.make_session() as session:
+        report = sushi.get_report(
+            wsdl_url=url,
+            report=report,
+            release=release,
+            requestor_id=requestor_id,
+            requestor_name=requestor_name,
+            requestor_email=requestor_email,
+            customer_reference=customer_reference,
+            customer_name=customer_name,
+            start_date=converted_start_date,
+            end_date=converted_end_date,
+            sushi_dump=dump,
+            no_delay=no_delay,
+            verify=not no_ssl_verify,
+            api_key=api_key,
+            session=session,
+            chunk_months=chunk_months,
+            cache=cache,
+            archive=archive,
+        )
     if "%s" in output_file:
         output_file = output_file % format_
     report.write_to_file(output_file, format_)
 
 
+@main.command("batch")
+@click.argument("config", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--workers",
+    "-w",
+    type=int,
+    default=harvest.WORKERS,
+    show_default=True,
+    help="Number of reports to fetch at the same time",
+)
+@click.option(
+    "--output_dir",
+    "-o",
+    type=click.Path(file_okay=False, writable=True),
+    help="Directory to write reports to (default: current directory)",
+)
+@click.option("--dump", "-d", is_flag=True)
+@click.option(
+    "--no-delay",
+    is_flag=True,
+    help="Do not delay before rerequesting a queued report. "
+    "Probably don't do this to a real server.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, writable=True),
+    help="Reuse responses to identical requests cached in this directory",
+)
+@click.option(
+    "--archive-dir",
+    type=click.Path(file_okay=False, writable=True),
+    help="Keep a compressed copy of each response from the server in this directory",
+)
+@click.option(
+    "--journal",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Record each finished month of each report in this file, and skip "
+    "those it lists as done; rerun with the same file to resume an "
+    "interrupted harvest",
+)
+def batch_command(
+    config, workers, output_dir, dump, no_delay, cache_dir, archive_dir, journal
+):
+    """Fetch the reports for all the providers in a TOML config file.
+
+    Reports are fetched concurrently, sharing connections, and each is
+    written as soon as it arrives. A table of results is printed at the
+    end. See the documentation of pycounter.harvest.load_config for the
+    file format.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    logging.basicConfig(level=logging.DEBUG if dump else logging.WARNING)
+    try:
+        batch = harvest.load_config(config, output_dir=output_dir)
+    except ValueError as exception:
+        click.echo(f"Invalid config file {config}: {exception}", err=True)
+        sys.exit(1)
+    cache = ResponseCache(cache_dir) if cache_dir is not None else None
+    archive = ResponseArchive(archive_dir) if archive_dir is not None else None
+    if journal is not None:
+        journal = harvest.Journal(journal)
+
+    def progress(result):
+        status = "FAILED" if result.error is not None else _status(result)
+        click.echo(f"{status}: {result.job.provider} {result.job.report}")
+
+    started = time.perf_counter()
+    with transport.make_session(
+        pool_maxsize=max(workers, transport.POOL_MAXSIZE)
+    ) as session:
+        results = harvest.run_jobs(
+            batch.jobs,
+            workers=workers,
+            callback=progress,
+            session=session,
+            limiter=batch.limiter,
+            cache=cache,
+            archive=archive,
+            no_delay=no_delay,
+            sushi_dump=dump,
+            journal=journal,
+        )
+    _echo_table(
+        ["Provider", "Report", "Status", "Seconds", "Output"],
+        [
+            [
+                result.job.provider,
+                result.job.report,
+                _status(result),
+                "%.1f" % result.elapsed,
+                result.job.output_file if result.error is None else str(result.error),
+            ]
+            for result in results
+        ],
+    )
+    failures = sum(result.error is not None for result in results)
+    skipped = sum(result.skipped for result in results)
+    click.echo(
+        f"{len(results)} reports, {failures} failed, {skipped} already done, "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    if failures:
+        sys.exit(1)
+
+
+def _status(result):
+    """Describe the outcome of a harvest job in a word."""
+    if result.error is not None:
+        return type(result.error).__name__
+    return "skipped" if result.skipped else "ok"
+
+
+def _echo_table(header, rows):
+    """Print rows of strings as a table with aligned columns."""
+    widths = [
+        max(len(row[col]) for row in [header, *rows]) for col in range(len(header))
+    ]
+    for row in [header, *rows]:
+        click.echo(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        )
+
+
 if __name__ == "__main__":
-    main()  # pylint: disable=no-value-for-parameter
+    main()
@@ -1,11 +1,15 @@
 """Tests for COUNTER 5 SUSHI support."""
 
+import datetime
+import io
+import json
 import os
 
 from httmock import all_requests, HTTMock
 import pytest
 
 import pycounter.exceptions
+import pycounter.sushi
 import pycounter.sushi5
 
 
@@ -62,3 +66,83 @@ def test_bk_data(sushi5_report_trb1):
     publication = next(iter(sushi5_report_trb1))
     data = [month[2] for month in publication]
     assert data[0] == 22
+
+
+def _data_path(filename):
+    """Path to a file in the COUNTER 5 test data directory."""
+    return os.path.join(os.path.dirname(__file__), "data", filename)
+
+
+@all_requests
+def simple_report(url_unused, request_unused):
+    """Mocked SUSHI service."""
+    with open(_data_path("sushi_simple.json"), "r", encoding="utf-8") as datafile:
+        return datafile.read()
+
+
+def _summary(report):
+    """Summarize a report's resources for comparison."""
+    return [
+        (pub.title, pub.metric, pub.issn, pub.eissn, pub.doi, list(pub))
+        for pub in report
+    ]
+
+
+@pytest.mark.parametrize("filename", ["sushi_simple.json", "sushi_book.json"])
+def test_streamed_matches_decoded(filename):
+    with open(_data_path(filename), "rb") as datafile:
+        raw = datafile.read()
+    decoded = pycounter.sushi5.raw_to_full(json.loads(raw))
+    stream = io.BytesIO(raw)
+    chunks = list(iter(lambda: stream.read(7), b""))
+    streamed = pycounter.sushi5.raw_to_full(chunks)
+    assert streamed.report_type == decoded.report_type
+    assert streamed.period == decoded.period
+    assert streamed.institutional_identifier == decoded.institutional_identifier
+    assert _summary(streamed) == _summary(decoded)
+
+
+def test_iter_raw_to_full_file_object():
+    with open(_data_path("sushi_simple.json"), "rb") as datafile:
+        report, resources = pycounter.sushi5.iter_raw_to_full(datafile)
+        assert report.report_type == "TR_J1"
+        assert report.pubs == []
+        pubs = list(resources)
+    assert pubs[0].doi == "some.fake.doi"
+
+
+def test_items_before_header():
+    with open(_data_path("sushi_simple.json"), "rb") as datafile:
+        data = json.load(datafile)
+    reordered = {"Report_Items": data["Report_Items"]}
+    reordered["Report_Header"] = data["Report_Header"]
+    report = pycounter.sushi5.raw_to_full(json.dumps(reordered))
+    assert len(report.pubs) == len(data["Report_Items"])
+
+
+def test_streamed_missing_header():
+    with pytest.raises(pycounter.exceptions.SushiException):
+        pycounter.sushi5.raw_to_full(b'{"Report_Items": []}')
+
+
+def test_streamed_error_not_authorized():
+    with HTTMock(not_authorized):
+        chunks = pycounter.sushi5.get_sushi_stats_raw(
+            url="https://example.com/sushi", release=5, stream=True
+        )
+        with pytest.raises(pycounter.exceptions.Sushi5Error) as exception:
+            pycounter.sushi5.raw_to_full(chunks)
+    assert exception.value.code == 2000
+
+
+def test_get_report_stream(sushi5_report_trj1):
+    with HTTMock(simple_report):
+        report = pycounter.sushi.get_report(
+            url="http://www.example.com/Sushi",
+            start_date=datetime.date(2019, 1, 1),
+            end_date=datetime.date(2019, 2, 28),
+            release=5,
+            report="TR_J1",
+            stream=True,
+        )
+    assert _summary(report) == _summary(sushi5_report_trj1)
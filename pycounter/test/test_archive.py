@@ -0,0 +1,149 @@
+"""Tests for the archive of raw SUSHI responses."""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+
+from click.testing import CliRunner
+from httmock import all_requests, HTTMock
+import pytest
+
+from pycounter import sushi
+from pycounter import sushiclient
+from pycounter.archive import ResponseArchive
+from pycounter.bulk import FailedParse
+from pycounter.test.utils import (
+    c4_request,
+    C5_DATA_DIR,
+    c5_request,
+    DATA_DIR,
+    read_file,
+)
+
+
+@all_requests
+def c4_mock(url_unused, request_unused):
+    return read_file(os.path.join(DATA_DIR, "sushi_simple.xml"))
+
+
+@all_requests
+def c5_mock(url_unused, request_unused):
+    return read_file(os.path.join(C5_DATA_DIR, "sushi_simple.json"))
+
+
+def test_record_bytes(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    raw = read_file(os.path.join(DATA_DIR, "sushi_simple.xml"))
+    params = dict(c4_request(), release=4, report="JR1")
+    assert archive.record(params, raw) is raw
+    entries = archive.entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry.path.endswith(".xml.gz")
+    with archive.open(entry) as body:
+        assert body.read() == raw
+    metadata = entry.metadata
+    assert metadata["url"] == "http://www.example.com/Sushi"
+    assert metadata["start_date"] == "2013-01-01"
+    assert metadata["customer_reference"] == "exampleLibrary"
+    assert metadata["format"] == "xml"
+    assert metadata["size"] == len(raw)
+    assert metadata["sha256"] == hashlib.sha256(raw).hexdigest()
+    assert "requestor_id" not in metadata
+    datetime.datetime.fromisoformat(metadata["fetched_at"])
+
+
+def test_record_chunks(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    chunks = archive.record(c5_request(), iter([b'{"a": ', b"1}"]))
+    assert not archive.entries()
+    assert list(chunks) == [b'{"a": ', b"1}"]
+    entries = archive.entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry.path.endswith(".json.gz")
+    assert "api_key" not in entry.metadata
+    with gzip.open(entry.path, "rb") as body:
+        assert json.load(body) == {"a": 1}
+
+
+def test_incomplete_chunks_not_recorded(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    chunks = archive.record(c5_request(), iter([b"{", b"}"]))
+    next(chunks)
+    chunks.close()
+    assert not os.listdir(tmp_path)
+
+
+def test_unread_chunks_leave_no_files(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    chunks = archive.record(c5_request(), iter([b"{}"]))
+    assert not os.listdir(tmp_path)
+    chunks.close()
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_get_report_archive(tmp_path, stream):
+    archive = ResponseArchive(str(tmp_path))
+    with HTTMock(c4_mock):
+        c4_report = sushi.get_report(archive=archive, **c4_request())
+    with HTTMock(c5_mock):
+        c5_report = sushi.get_report(archive=archive, **c5_request(stream=stream))
+    entries = archive.entries()
+    assert [entry.metadata["release"] for entry in entries] == [4, 5]
+    assert entries[1].metadata["report"] == "TR_J1"
+    # bodies are kept exactly as the server sent them
+    sent_paths = [
+        os.path.join(DATA_DIR, "sushi_simple.xml"),
+        os.path.join(C5_DATA_DIR, "sushi_simple.json"),
+    ]
+    for entry, path in zip(entries, sent_paths):
+        with gzip.open(entry.path, "rb") as body:
+            assert body.read() == read_file(path)
+        assert entry.metadata["sha256"] == hashlib.sha256(read_file(path)).hexdigest()
+
+    replayed = archive.replay(workers=1)
+    assert [entry for entry, _ in replayed] == entries
+    for (_, report), original in zip(replayed, [c4_report, c5_report]):
+        assert report.report_type == original.report_type
+        assert [list(pub) for pub in report] == [list(pub) for pub in original]
+
+
+def test_replay_parallel(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    for name in ("sushi_simple.xml", "sushi_simple_db1.xml", "sushi_error.xml"):
+        archive.record({"release": 4}, read_file(os.path.join(DATA_DIR, name)))
+    archive.record(
+        {"release": 5},
+        read_file(os.path.join(C5_DATA_DIR, "not_authorized.json")),
+    )
+    serial = archive.replay(workers=1)
+    parallel = archive.replay(workers=2)
+    assert [entry for entry, _ in parallel] == [entry for entry, _ in serial]
+    results = [result for _, result in parallel]
+    assert [result.report_type for result in results[:2]] == ["JR1", "DB1"]
+    assert [list(pub) for pub in results[0]] == [list(pub) for pub in serial[0][1]]
+    for failed in results[2:]:
+        assert isinstance(failed, FailedParse)
+
+
+def test_sushiclient_archive_dir(tmp_path):
+    arglist = [
+        "http://www.example.com/Sushi",
+        "-s",
+        "2013-01-01",
+        "--archive-dir",
+        str(tmp_path / "archive"),
+        "-o",
+        str(tmp_path / "report.tsv"),
+    ]
+    with HTTMock(c4_mock):
+        result = CliRunner().invoke(sushiclient.main, arglist)
+    assert result.exit_code == 0
+    entries = ResponseArchive(str(tmp_path / "archive")).entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry.metadata["report"] == "JR1"
@@ -0,0 +1,262 @@
+"""Tests for concurrent SUSHI harvesting with asyncio."""
+
+import asyncio
+import datetime
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from pycounter import asyncsushi
+from pycounter import transport
+from pycounter.archive import ResponseArchive
+from pycounter.cache import ResponseCache
+import pycounter.exceptions
+from pycounter.retry import RetryPolicy
+from pycounter.test.utils import (
+    c4_request,
+    C5_DATA_DIR,
+    c5_request,
+    DATA_DIR,
+    fake_sushi5,
+    read_file,
+)
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """Stub SUSHI server.
+
+    POSTs are COUNTER 4 requests: ``/queued`` answers "Report Queued" to the
+    first request and a report after that. GETs are COUNTER 5 requests.
+    """
+
+    state = {}
+
+    def _send(self, body):
+        """Send a response with the given body."""
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer a COUNTER 4 request."""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        state = self.state
+        with state["lock"]:
+            state["requests"] += 1
+            queued = self.path == "/queued" and not state["queued_sent"]
+            state["queued_sent"] = state["queued_sent"] or queued
+        if queued:
+            self._send(read_file(os.path.join(DATA_DIR, "sushi_queued.xml")))
+        else:
+            self._send(read_file(os.path.join(DATA_DIR, "sushi_simple.xml")))
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer a COUNTER 5 request, slowly."""
+        state = self.state
+        with state["lock"]:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(0.05)
+        with state["lock"]:
+            state["active"] -= 1
+        self._send(read_file(os.path.join(C5_DATA_DIR, "sushi_simple.json")))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="stub_server")
+def fixture_stub_server():
+    """Run a stub SUSHI server, and return its URL."""
+    _StubHandler.state = {
+        "lock": threading.Lock(),
+        "requests": 0,
+        "queued_sent": False,
+        "active": 0,
+        "max_active": 0,
+    }
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_report_async_c4(stub_server):
+    report = asyncio.run(
+        asyncsushi.get_report_async(
+            wsdl_url=stub_server + "/sushi",
+            start_date=datetime.date(2013, 1, 1),
+            end_date=datetime.date(2013, 1, 31),
+        )
+    )
+    assert report.report_type == "JR1"
+    assert len(report.pubs) == 1
+
+
+def test_get_report_async_c5(stub_server):
+    report = asyncio.run(asyncsushi.get_report_async(**c5_request(url=stub_server)))
+    assert report.report_type == "TR_J1"
+    assert report.pubs[0].doi == "some.fake.doi"
+
+
+def test_queued_wait_does_not_block(stub_server):
+    async def harvest():
+        queued = asyncio.create_task(
+            asyncsushi.get_report_async(
+                wsdl_url=stub_server + "/queued",
+                start_date=datetime.date(2013, 1, 1),
+                end_date=datetime.date(2013, 1, 31),
+                retry_policy=RetryPolicy(initial_delay=0.3, jitter=0),
+            )
+        )
+        other = await asyncsushi.get_report_async(**c5_request(url=stub_server))
+        # the other report arrived while the queued one was still waiting
+        assert not queued.done()
+        return await queued, other
+
+    queued_report, other_report = asyncio.run(harvest())
+    assert queued_report.report_type == "JR1"
+    assert other_report.report_type == "TR_J1"
+    assert _StubHandler.state["requests"] == 2
+
+
+def test_get_reports_async_host_limit(stub_server):
+    with transport.make_session() as session:
+        reports = asyncio.run(
+            asyncsushi.get_reports_async(
+                [c5_request(url=stub_server) for _ in range(6)],
+                transport=asyncsushi.ThreadedTransport(session),
+                max_per_host=2,
+            )
+        )
+    assert [report.report_type for report in reports] == ["TR_J1"] * 6
+    assert _StubHandler.state["max_active"] == 2
+
+
+def test_get_reports_async_exceptions():
+    class ErrorTransport:  # pylint: disable=too-few-public-methods
+        """Answer every request with something that isn't a SUSHI response."""
+
+        async def request(self, _request, **_options):
+            """Return a bogus response body."""
+            return b"Bogus response with no XML"
+
+    results = asyncio.run(
+        asyncsushi.get_reports_async(
+            [c4_request()],
+            transport=ErrorTransport(),
+        )
+    )
+    assert isinstance(results[0], pycounter.exceptions.SushiException)
+
+
+class _CountingTransport:  # pylint: disable=too-few-public-methods
+    """Answer every request with a COUNTER 4 report, counting requests."""
+
+    def __init__(self):
+        self.count = 0
+
+    async def request(self, _request, **_options):
+        """Return the report."""
+        self.count += 1
+        return read_file(os.path.join(DATA_DIR, "sushi_simple.xml"))
+
+
+def test_get_report_async_cache_archive(tmp_path):
+    counting = _CountingTransport()
+    cache = ResponseCache(str(tmp_path / "cache"))
+    archive = ResponseArchive(str(tmp_path / "archive"))
+
+    async def harvest():
+        first = await asyncsushi.get_report_async(
+            transport=counting, cache=cache, archive=archive, **c4_request()
+        )
+        second = await asyncsushi.get_report_async(
+            transport=counting, cache=cache, archive=archive, **c4_request()
+        )
+        return first, second
+
+    first, second = asyncio.run(harvest())
+    assert counting.count == 1
+    assert [list(pub) for pub in second] == [list(pub) for pub in first]
+    entries = archive.entries()
+    assert len(entries) == 1
+    assert entries[0].metadata["url"] == "http://www.example.com/Sushi"
+    assert entries[0].metadata["customer_reference"] == "exampleLibrary"
+
+
+@pytest.mark.parametrize("name", asyncsushi.UNSUPPORTED_PARAMS)
+def test_unsupported_params(name):
+    counting = _CountingTransport()
+    with pytest.raises(TypeError, match=name):
+        asyncio.run(
+            asyncsushi.get_report_async(
+                transport=counting, **c4_request(**{name: False})
+            )
+        )
+    assert counting.count == 0
+
+
+def test_host_limits_per_host():
+    limits = asyncsushi.HostLimits(3)
+    assert limits("http://Example.com/a") is limits("http://example.com/b")
+    assert limits("http://example.com/") is not limits("http://example.org/")
+
+
+def test_get_report_async_chunked():
+    class JsonTransport:  # pylint: disable=too-few-public-methods
+        """Answer each COUNTER 5 request with a report for its dates."""
+
+        def __init__(self):
+            self.ranges = []
+
+        async def request(self, request, **_options):
+            """Return a report for the requested dates."""
+            start = request.params["begin_date"]
+            end = request.params["end_date"]
+            self.ranges.append((start, end))
+            return json.dumps(fake_sushi5(start, end)).encode("utf-8")
+
+    fake_transport = JsonTransport()
+    request = c5_request(report="TR_J2", end_date=datetime.date(2019, 12, 31))
+    report = asyncio.run(
+        asyncsushi.get_report_async(transport=fake_transport, chunk_months=4, **request)
+    )
+    assert len(fake_transport.ranges) == 3
+    assert report.period == (datetime.date(2019, 1, 1), datetime.date(2019, 12, 31))
+    assert [month.month for month, _, _ in report.pubs[0]] == list(range(1, 13))
+
+
+def test_get_reports_async_limiter(stub_server):
+    limiter = transport.HostLimiter(
+        hosts={stub_server: {"rate": 20, "max_concurrent": 1}}
+    )
+    started = time.monotonic()
+    reports = asyncio.run(
+        asyncsushi.get_reports_async(
+            [c5_request(url=stub_server) for _ in range(4)],
+            max_per_host=3,
+            limiter=limiter,
+        )
+    )
+    assert [report.report_type for report in reports] == ["TR_J1"] * 4
+    assert _StubHandler.state["max_active"] == 1
+    # 4 requests at 20 per second, one at a time: at least 3 gaps of 0.05s
+    assert time.monotonic() - started >= 0.15
+
+
+def test_host_limits_from_limiter():
+    # pylint: disable=protected-access
+    limiter = transport.HostLimiter(hosts={"example.org": {"max_concurrent": 5}})
+    limits = asyncsushi.HostLimits(2, limiter)
+    assert limits("http://example.org/")._value == 5
+    assert limits("http://example.com/")._value == 2
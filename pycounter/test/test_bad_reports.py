@@ -6,9 +6,18 @@ from pycounter import report
 import pycounter.exceptions
 
 
-@pytest.mark.parametrize("report_type", ["Bogus Report 7 (R4)"])
+@pytest.mark.parametrize(
+    "report_type",
+    [
+        "Bogus Report 7 (R4)",
+        # known report types without a known row layout
+        "Journal Report 3 (R4)",
+        "Journal Report 5 (R4)",
+        "Book Report 4 (R4)",
+    ],
+)
 def test_report_type(report_type):
-    """Report type doesn't exist."""
+    """Report type doesn't exist, or can't be parsed."""
     data = [[report_type]]
     with pytest.raises(pycounter.exceptions.UnknownReportTypeError):
         report.parse_generic(iter(data))
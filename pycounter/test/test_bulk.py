@@ -0,0 +1,107 @@
+"""Tests for parsing reports in bulk."""
+
+import gzip
+import os
+
+from click.testing import CliRunner
+import pytest
+
+from pycounter import bulk
+from pycounter import report
+from pycounter import sushi
+from pycounter.test.utils import datafile
+
+
+def test_compact_roundtrip(all_reports):
+    rebuilt = report.CounterReport.from_compact(all_reports.to_compact())
+    assert rebuilt.as_generic() == all_reports.as_generic()
+
+
+def test_compact_sushi_roundtrip(sushi_report_all):
+    rebuilt = report.CounterReport.from_compact(sushi_report_all.to_compact())
+    assert [list(pub) for pub in rebuilt] == [list(pub) for pub in sushi_report_all]
+    assert [pub.isbn for pub in rebuilt] == [pub.isbn for pub in sushi_report_all]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many(workers):
+    paths = [datafile("C4BR1.tsv"), datafile("no_such_file.tsv"), datafile("PR1.tsv")]
+    results = bulk.parse_many(paths, workers=workers)
+    assert results[0].report_type == "BR1"
+    assert isinstance(results[1], bulk.FailedParse)
+    assert results[1].path == paths[1]
+    assert results[1].error_type == "FileNotFoundError"
+    assert results[2].report_type == "PR1"
+    assert results[2].as_generic() == report.parse(paths[2]).as_generic()
+
+
+def test_parse_command(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        bulk.main,
+        ["parse", "-w", "1", "-o", str(tmp_path), datafile("C4JR1.csv")],
+    )
+    assert result.exit_code == 0
+    assert "\tJR1\t" in result.output
+    assert report.parse(str(tmp_path / "C4JR1.tsv")).report_type == "JR1"
+
+
+def test_parse_command_failure(tmp_path):
+    bad_file = tmp_path / "bad.tsv"
+    bad_file.write_text("Not a report\n")
+    result = CliRunner().invoke(bulk.main, ["parse", "-w", "1", str(bad_file)])
+    assert result.exit_code == 1
+    assert "ERROR" in result.output
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_sushi_files(tmp_path, workers):
+    paths = [
+        datafile("sushi_simple.xml"),
+        datafile("sushi_error.xml"),
+        datafile("sushi_simple_db1.xml"),
+    ]
+    results = bulk.convert_sushi_files(
+        paths, workers=workers, output_format="compact", output_dir=str(tmp_path)
+    )
+    assert results[0].report_type == "JR1"
+    assert results[0].items == 1
+    assert results[0].size == os.path.getsize(paths[0])
+    assert isinstance(results[1], bulk.FailedParse)
+    assert results[2].output == str(tmp_path / "sushi_simple_db1.pickle")
+    with open(paths[2], "rb") as raw:
+        expected = sushi.raw_to_full(raw)
+    rebuilt = bulk.read_compact(results[2].output)
+    assert rebuilt.report_type == "DB1"
+    assert [list(pub) for pub in rebuilt] == [list(pub) for pub in expected]
+
+
+def test_convert_sushi_gzip(tmp_path):
+    compressed = tmp_path / "response.xml.gz"
+    with open(datafile("sushi_simple.xml"), "rb") as raw:
+        compressed.write_bytes(gzip.compress(raw.read()))
+    (result,) = bulk.convert_sushi_files([str(compressed)], workers=1)
+    assert result.output == str(tmp_path / "response.tsv")
+    assert report.parse(result.output).report_type == "JR1"
+
+
+def test_convert_sushi_command(tmp_path):
+    result = CliRunner().invoke(
+        bulk.main,
+        ["convert-sushi", "-w", "1", "-o", str(tmp_path), datafile("sushi_simple.xml")],
+    )
+    assert result.exit_code == 0
+    assert "\tJR1\t1" in result.output
+    assert "files/s" in result.output
+    assert "items/s" in result.output
+    assert "MB/s" in result.output
+    assert report.parse(str(tmp_path / "sushi_simple.tsv")).report_type == "JR1"
+
+
+def test_convert_sushi_command_failure(tmp_path):
+    result = CliRunner().invoke(
+        bulk.main,
+        ["convert-sushi", "-w", "1", "-o", str(tmp_path), datafile("sushi_error.xml")],
+    )
+    assert result.exit_code == 1
+    assert "ERROR" in result.output
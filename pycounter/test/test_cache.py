@@ -0,0 +1,159 @@
+"""Tests for the on-disk SUSHI response cache."""
+
+import datetime
+import gzip
+import os
+import time
+
+from click.testing import CliRunner
+from httmock import all_requests, HTTMock
+import pytest
+
+from pycounter import sushi
+from pycounter import sushiclient
+from pycounter.cache import ResponseCache
+import pycounter.exceptions
+from pycounter.retry import RetryPolicy
+from pycounter.test.utils import c4_request, C5_DATA_DIR, DATA_DIR, read_file
+
+
+class CountingMock:
+    """HTTMock handler serving a file and counting requests."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def __call__(self, url_unused, request_unused):
+        self.count += 1
+        return read_file(self.path)
+
+
+def test_key_normalized():
+    base = {
+        "url": "https://example.com/sushi/",
+        "report": "TR_J1",
+        "release": 5,
+        "start_date": datetime.date(2019, 1, 1),
+        "end_date": datetime.date(2019, 1, 31),
+        "customer_reference": "abc",
+    }
+    key = ResponseCache.key(base)
+    same = dict(base, url="https://example.com/sushi", api_key="secret")
+    same["requestor_id"] = "me"
+    same["sushi_dump"] = True
+    assert ResponseCache.key(same) == key
+    assert ResponseCache.key(dict(base, customer_reference="xyz")) != key
+    assert ResponseCache.key(dict(base, end_date=datetime.date(2019, 2, 28))) != key
+
+
+def test_put_get(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get("abc") is None
+    cache.put("abc", b"some data")
+    assert cache.get("abc") == b"some data"
+    cache.clear()
+    assert cache.get("abc") is None
+
+
+def test_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put("abc", b"some data")
+    path = tmp_path / "abc.gz"
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert cache.get("abc") is None
+    assert not path.exists()
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("first", os.urandom(1000))
+    size = (tmp_path / "first.gz").stat().st_size
+    cache.max_size = size * 2
+    cache.put("second", os.urandom(1000))
+    # use "first" more recently than "second"
+    os.utime(tmp_path / "second.gz", (1, time.time()))
+    cache.get("first")
+    cache.put("third", os.urandom(1000))
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_failed_write_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with cache.writer("abc") as writer:
+            writer.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert cache.get("abc") is None
+    assert not os.listdir(tmp_path) or os.listdir(tmp_path) == [".lock"]
+
+
+def test_get_report_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    handler = CountingMock(os.path.join(DATA_DIR, "sushi_simple.xml"))
+    with HTTMock(all_requests(handler)):
+        first = sushi.get_report(cache=cache, **c4_request())
+        second = sushi.get_report(cache=cache, **c4_request())
+        sushi.get_report(cache=cache, **c4_request(customer_reference="other"))
+    assert handler.count == 2
+    assert [list(pub) for pub in second] == [list(pub) for pub in first]
+
+
+def test_queued_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    handler = CountingMock(os.path.join(DATA_DIR, "sushi_queued.xml"))
+    with HTTMock(all_requests(handler)):
+        with pytest.raises(pycounter.exceptions.RetriesExhaustedError):
+            sushi.get_report(
+                cache=cache,
+                retry_policy=RetryPolicy.immediate(2),
+                **c4_request(),
+            )
+    assert handler.count == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".gz")]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_get_report_cached_c5(tmp_path, stream):
+    cache = ResponseCache(str(tmp_path))
+    handler = CountingMock(os.path.join(C5_DATA_DIR, "sushi_simple.json"))
+    request = {
+        "url": "https://www.example.com/sushi",
+        "release": 5,
+        "report": "TR_J1",
+        "start_date": datetime.date(2019, 1, 1),
+        "end_date": datetime.date(2019, 2, 28),
+        "stream": stream,
+    }
+    with HTTMock(all_requests(handler)):
+        first = sushi.get_report(cache=cache, **request)
+        second = sushi.get_report(cache=cache, **request)
+    assert handler.count == 1
+    # the body is cached as the server sent it
+    (path,) = tmp_path.glob("*.gz")
+    with gzip.open(path, "rb") as body:
+        assert body.read() == read_file(handler.path)
+    assert second.pubs[0].doi == first.pubs[0].doi == "some.fake.doi"
+    assert list(second.pubs[0]) == list(first.pubs[0])
+
+
+def test_sushiclient_cache_dir(tmp_path):
+    handler = CountingMock(os.path.join(DATA_DIR, "sushi_simple.xml"))
+    arglist = [
+        "http://www.example.com/Sushi",
+        "-s",
+        "2013-01-01",
+        "--cache-dir",
+        str(tmp_path / "cache"),
+        "-o",
+        str(tmp_path / "report.tsv"),
+    ]
+    runner = CliRunner()
+    with HTTMock(all_requests(handler)):
+        for _ in range(2):
+            result = runner.invoke(sushiclient.main, arglist)
+            assert result.exit_code == 0
+    assert handler.count == 1
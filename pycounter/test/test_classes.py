@@ -19,3 +19,63 @@ def test_report_gaps():
     output_data = journal.as_generic()
     assert output_data[11] == "0"
     assert output_data[12] == "99"
+
+
+def test_sparse_month_data():
+    journal = report.CounterJournal(
+        metric="FT Article Requests",
+        month_data=[(datetime.date(2018, 3, 1), 99), (datetime.date(2018, 1, 1), 50)],
+    )
+    assert list(journal) == [
+        (datetime.date(2018, 1, 1), "FT Article Requests", 50),
+        (datetime.date(2018, 3, 1), "FT Article Requests", 99),
+    ]
+
+
+def test_month_data_across_years():
+    book = report.CounterBook(
+        period=(datetime.date(2017, 11, 1), datetime.date(2018, 2, 28)),
+        month_data=[(datetime.date(2018, 1, 1), 3), (datetime.date(2017, 11, 1), 4)],
+    )
+    assert book.as_generic()[-5:] == ["7", "4", "0", "3", "0"]
+    assert [month[0] for month in book] == [
+        datetime.date(2017, 11, 1),
+        datetime.date(2017, 12, 1),
+        datetime.date(2018, 1, 1),
+        datetime.date(2018, 2, 1),
+    ]
+
+
+def test_no_month_data():
+    database = report.CounterDatabase(metric="Regular Searches")
+    assert not list(database)
+
+
+def test_fill_months_idempotent():
+    # pylint: disable=protected-access
+    journal = report.CounterJournal(
+        period=(datetime.date(2018, 1, 1), datetime.date(2018, 4, 30)),
+        month_data=[(datetime.date(2018, 2, 1), 7)],
+    )
+    journal._fill_months()
+    filled = list(journal)
+    journal._fill_months()
+    assert list(journal) == filled
+    assert [month[2] for month in filled] == [0, 7, 0, 0]
+
+
+def test_required_metrics_zero_filled():
+    period = (datetime.date(2018, 1, 1), datetime.date(2018, 3, 31))
+    rpt = report.CounterReport(report_type="DB1", period=period)
+    rpt.pubs = [
+        report.CounterDatabase(
+            period=period,
+            title="DB",
+            metric="Regular Searches",
+            month_data=[(datetime.date(2018, 2, 1), 5)],
+        )
+    ]
+    rpt.as_generic()
+    assert len(rpt.pubs) == 4
+    for database in rpt.pubs[1:]:
+        assert [month[2] for month in database] == [0, 0, 0]
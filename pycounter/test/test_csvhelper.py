@@ -0,0 +1,28 @@
+"""Tests for the csvhelper module."""
+
+import pytest
+
+from pycounter import csvhelper
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_read_across_chunks(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "report.csv"
+    path.write_bytes('a,"b\r\nc"\r\ndé,e\rf,g\n'.encode("utf-8"))
+    with csvhelper.UnicodeReader(str(path)) as reader:
+        rows = list(reader)
+    assert rows == [["a", "b\r\nc"], ["dé", "e"], ["f", "g"]]
+
+
+@pytest.mark.parametrize("chunk_size", [4, 64 * 1024])
+def test_fallback_encoding(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(csvhelper, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "report.csv"
+    path.write_bytes(b"abc,def\nCaf\xe9,1\n")
+    with pytest.warns(UserWarning):
+        with csvhelper.UnicodeReader(str(path)) as reader:
+            rows = list(reader)
+    assert rows == [["abc", "def"], ["Café", "1"]]
+    assert reader.encoding == "latin-1"
+    assert reader.fileobj.closed
@@ -0,0 +1,265 @@
+"""Tests for batch harvesting from a provider config file."""
+
+import datetime
+import os
+import re
+
+from click.testing import CliRunner
+from httmock import all_requests, HTTMock, urlmatch
+import pytest
+
+from pycounter import harvest
+from pycounter import report
+from pycounter import sushiclient
+from pycounter.test.utils import DATA_DIR
+
+CONFIG = """
+[defaults]
+start_date = "2013-01"
+requestor_id = "me"
+
+[[providers]]
+name = "Example Press"
+url = "http://www.example.com/Sushi"
+reports = ["JR1", "DB1"]
+customer_reference = "exampleLibrary"
+rate = 2
+max_concurrent = 1
+
+[[providers]]
+name = "Broken"
+url = "http://broken.example.com/Sushi"
+end_date = 2013-03-15
+output = "broken/{report}-{start}-{end}.{format}"
+"""
+
+
+@pytest.fixture(name="config_file")
+def fixture_config_file(tmp_path):
+    """Write the example config to a file, and return its path."""
+    path = tmp_path / "providers.toml"
+    path.write_text(CONFIG, encoding="utf-8")
+    return str(path)
+
+
+@urlmatch(netloc="www.example.com")
+def example_mock(url_unused, request):
+    name = "sushi_simple_db1.xml" if b"DB1" in request.body else "sushi_simple.xml"
+    with open(os.path.join(DATA_DIR, name), "rb") as datafile:
+        return datafile.read()
+
+
+@all_requests
+def broken_mock(url_unused, request_unused):
+    return {"status_code": 500, "content": b"Internal Server Error"}
+
+
+def test_load_config(config_file, tmp_path):
+    jobs, limiter = harvest.load_config(
+        config_file, output_dir=str(tmp_path), today=datetime.date(2020, 5, 5)
+    )
+    assert [(job.provider, job.report) for job in jobs] == [
+        ("Example Press", "JR1"),
+        ("Example Press", "DB1"),
+        ("Broken", "JR1"),
+    ]
+    assert jobs[0].output_file == str(
+        tmp_path / "Example_Press_JR1_2013-01_2013-01.tsv"
+    )
+    assert jobs[0].request == {
+        "wsdl_url": "http://www.example.com/Sushi",
+        "report": "JR1",
+        "requestor_id": "me",
+        "customer_reference": "exampleLibrary",
+        "start_date": datetime.date(2013, 1, 1),
+        "end_date": datetime.date(2013, 1, 31),
+    }
+    assert jobs[2].end_date == datetime.date(2013, 3, 31)
+    assert jobs[2].output_file == str(tmp_path / "broken" / "JR1-2013-01-2013-03.tsv")
+    assert limiter.limits("http://www.example.com/").rate == 2
+    assert limiter.limits("http://www.example.com/").max_concurrent == 1
+    assert limiter.limits("http://broken.example.com/").rate is None
+
+
+def test_load_config_default_dates(tmp_path):
+    path = tmp_path / "providers.toml"
+    path.write_text('[[providers]]\nname = "A"\nurl = "http://a.example.com"\n')
+    (job,) = harvest.load_config(str(path), today=datetime.date(2020, 1, 15)).jobs
+    assert (job.start_date, job.end_date) == (
+        datetime.date(2019, 12, 1),
+        datetime.date(2019, 12, 31),
+    )
+    assert job.output_file == "A_JR1_2019-12_2019-12.tsv"
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        'name = "A"\nurl = "http://a.example.com"\ncustomer = "typo"\n',
+        'name = "A"\n',
+    ],
+)
+def test_load_config_invalid(tmp_path, entry):
+    path = tmp_path / "providers.toml"
+    path.write_text("[[providers]]\n" + entry)
+    with pytest.raises(ValueError):
+        harvest.load_config(str(path))
+
+
+def test_run_jobs(config_file, tmp_path):
+    batch = harvest.load_config(config_file, output_dir=str(tmp_path))
+    finished = []
+    with HTTMock(example_mock, broken_mock):
+        results = harvest.run_jobs(
+            batch.jobs,
+            workers=3,
+            callback=finished.append,
+            limiter=batch.limiter,
+            no_delay=True,
+        )
+    assert [result.job for result in results] == batch.jobs
+    assert sorted(finished, key=lambda result: batch.jobs.index(result.job)) == results
+    assert results[0].error is None
+    assert results[1].error is None
+    assert results[2].error is not None
+    assert report.parse(results[0].job.output_file).report_type == "JR1"
+    assert report.parse(results[1].job.output_file).report_type == "DB1"
+    assert not os.path.exists(results[2].job.output_file)
+
+
+def test_sushiclient_batch(config_file, tmp_path):
+    output_dir = tmp_path / "out"
+    with HTTMock(example_mock, broken_mock):
+        result = CliRunner().invoke(
+            sushiclient.main,
+            ["batch", config_file, "-o", str(output_dir), "--no-delay"],
+        )
+    assert result.exit_code == 1
+    lines = result.output.splitlines()
+    assert lines[-1].startswith("3 reports, 1 failed")
+    assert any(line.split()[:2] == ["Provider", "Report"] for line in lines)
+    assert "SushiException" in result.output
+    assert sorted(os.listdir(output_dir)) == [
+        "Example_Press_DB1_2013-01_2013-01.tsv",
+        "Example_Press_JR1_2013-01_2013-01.tsv",
+    ]
+
+
+@pytest.mark.parametrize("option", ["--help", "-h"])
+def test_sushiclient_help_lists_commands(option):
+    result = CliRunner().invoke(sushiclient.main, [option])
+    assert result.exit_code == 0
+    assert "Commands:" in result.output
+    assert "batch" in result.output
+
+
+def test_sushiclient_batch_invalid_config(tmp_path):
+    path = tmp_path / "providers.toml"
+    path.write_text("[[providers]]\nname = 'A'\n")
+    result = CliRunner().invoke(sushiclient.main, ["batch", str(path)])
+    assert result.exit_code == 1
+    assert "no url" in result.output
+
+
+def test_journal_resume(config_file, tmp_path):
+    batch = harvest.load_config(config_file, output_dir=str(tmp_path))
+    journal_path = str(tmp_path / "journal.jsonl")
+    with HTTMock(example_mock, broken_mock):
+        harvest.run_jobs(
+            batch.jobs, journal=harvest.Journal(journal_path), no_delay=True
+        )
+    # records without a status, or cut short by a crash, are ignored
+    with open(journal_path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"unit": ["Broken", "JR1", "2013-01-01", "2013-01-31"]}\n')
+        journal_file.write('{"unit": ["Broken", "JR1", "2013-01-')
+
+    journal = harvest.Journal(journal_path)
+    assert journal.units(batch.jobs[2]) == [
+        ("Broken", "JR1", "2013-01-01", "2013-01-31"),
+        ("Broken", "JR1", "2013-02-01", "2013-02-28"),
+        ("Broken", "JR1", "2013-03-01", "2013-03-31"),
+    ]
+    assert [journal.is_done(job) for job in batch.jobs] == [True, True, False]
+    os.remove(batch.jobs[1].output_file)
+    assert not journal.is_done(batch.jobs[1])
+
+    requested = []
+
+    @all_requests
+    def fixed_mock(url, request_unused):
+        requested.append(url.netloc)
+        with open(os.path.join(DATA_DIR, "sushi_simple_db1.xml"), "rb") as datafile:
+            return datafile.read()
+
+    with HTTMock(fixed_mock):
+        results = harvest.run_jobs(batch.jobs, journal=journal, no_delay=True)
+    assert [result.skipped for result in results] == [True, False, False]
+    assert all(result.error is None for result in results)
+    # the missing output is rebuilt from the journal, without a request
+    assert report.parse(batch.jobs[1].output_file).report_type == "DB1"
+    assert requested == ["broken.example.com"] * 3
+    assert all(harvest.Journal(journal_path).is_done(job) for job in batch.jobs)
+
+
+def test_journal_skips_done_months(config_file, tmp_path):
+    job = harvest.load_config(config_file, output_dir=str(tmp_path)).jobs[2]
+    journal_path = str(tmp_path / "journal.jsonl")
+    requested = []
+
+    @all_requests
+    def february_broken_mock(url_unused, request):
+        begin = re.search(rb"Begin>([\d-]+)<", request.body).group(1)
+        requested.append(begin.decode("ascii"))
+        if begin == b"2013-02-01" and len(requested) < 3:
+            return {"status_code": 500, "content": b"Internal Server Error"}
+        with open(os.path.join(DATA_DIR, "sushi_simple.xml"), "rb") as datafile:
+            return datafile.read()
+
+    with HTTMock(february_broken_mock):
+        (first,) = harvest.run_jobs(
+            [job], journal=harvest.Journal(journal_path), no_delay=True
+        )
+        assert first.error is not None
+        assert requested == ["2013-01-01", "2013-02-01"]
+        (second,) = harvest.run_jobs(
+            [job], journal=harvest.Journal(journal_path), no_delay=True
+        )
+    assert second.error is None
+    assert requested == ["2013-01-01", "2013-02-01", "2013-02-01", "2013-03-01"]
+    assert report.parse(job.output_file).report_type == "JR1"
+
+
+def test_journal_parts_distinct(tmp_path):
+    journal = harvest.Journal(str(tmp_path / "journal.jsonl"))
+    parsed = report.parse(os.path.join(DATA_DIR, "simpleJR1.tsv"))
+    first = ("A B", "JR1", "2013-01-01", "2013-01-31")
+    second = ("A_B", "JR1", "2013-01-01", "2013-01-31")
+    journal.record(first, parsed)
+    assert journal.unit_report(first) is not None
+    assert journal.unit_report(second) is None
+    journal.record(second, parsed)
+    assert journal.unit_report_path(first) != journal.unit_report_path(second)
+
+
+def test_sushiclient_batch_journal(config_file, tmp_path):
+    arglist = [
+        "batch",
+        config_file,
+        "-o",
+        str(tmp_path / "out"),
+        "--no-delay",
+        "--journal",
+        str(tmp_path / "journal.jsonl"),
+    ]
+    runner = CliRunner()
+    with HTTMock(example_mock, broken_mock):
+        first = runner.invoke(sushiclient.main, arglist)
+    assert first.exit_code == 1
+    with HTTMock(example_mock, broken_mock):
+        second = runner.invoke(sushiclient.main, arglist)
+    assert second.exit_code == 1
+    assert second.output.splitlines()[-1].startswith(
+        "3 reports, 1 failed, 2 already done"
+    )
+    # in the progress lines and the table
+    assert second.output.count("skipped") == 4
@@ -1,15 +1,21 @@
 """Tests for the helpers module"""
 
 import datetime
+import io
 
 import pytest
 
 from pycounter.helpers import (
     convert_covered,
     convert_date_run,
+    guess_type_from_content,
     is_first_last,
+    month_axis,
+    month_from_number,
+    month_number,
     next_month,
     prev_month,
+    split_period,
 )
 
 
@@ -66,8 +72,78 @@ def test_convert_covered(covered_line, expected):
 
 @pytest.mark.parametrize(
     "date_run, expected",
-    [("2017-01-01", (2017, 1, 1)), ("2020-01-24T14:04:36Z", (2020, 1, 24))],
+    [
+        ("2017-01-01", (2017, 1, 1)),
+        ("2020-01-24T14:04:36Z", (2020, 1, 24)),
+        ("2019-05", (2019, 5, 1)),
+        ("2019-5-1", (2019, 5, 1)),
+        ("20190531", (2019, 5, 31)),
+    ],
 )
 def test_convert_date_run(date_run, expected):
     expected_date = datetime.date(*expected)
     assert convert_date_run(date_run) == expected_date
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (b"PK\x03\x04rest of zip", "xlsx"),
+        (b"\x1f\x8b\x08\x00", "gzip"),
+        (b"Report_Name\tTitle Master Report\n", "tsv"),
+        (b'"Report_Name","Title Master Report"\n', "csv"),
+        (b"\xef\xbb\xbfReport_Name,Journal\tReport\n", "csv"),
+        (b'"Journal Report 1 (R4)"\t"Number"\n', "tsv"),
+        (b'"Journal Report 1 (R4)","Number"\n', "csv"),
+    ],
+)
+def test_guess_type_from_content(content, expected):
+    file_obj = io.BytesIO(b"xx" + content)
+    file_obj.read(2)
+    assert guess_type_from_content(file_obj) == expected
+    assert file_obj.tell() == 2
+
+
+def test_guess_type_bounded_sample():
+    file_obj = io.BytesIO(b"a,b\n" * 10 + b"\t")
+    assert guess_type_from_content(file_obj, sample_size=40) == "csv"
+    assert guess_type_from_content(file_obj, sample_size=41) == "tsv"
+
+
+def test_month_axis():
+    axis = month_axis((datetime.date(2019, 11, 1), datetime.date(2020, 2, 29)))
+    assert axis.months == (
+        datetime.date(2019, 11, 1),
+        datetime.date(2019, 12, 1),
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 2, 1),
+    )
+    assert axis.labels == ("Nov-2019", "Dec-2019", "Jan-2020", "Feb-2020")
+    assert month_from_number(axis.start) == axis.months[0]
+    assert month_axis((datetime.date(2019, 11, 1), datetime.date(2020, 2, 29))) is axis
+
+
+@pytest.mark.parametrize(
+    "date", [(2000, 1, 1), (2000, 12, 31), (1999, 6, 15), (2019, 2, 28)]
+)
+def test_month_number_roundtrip(date):
+    dateobj = datetime.date(*date)
+    assert month_from_number(month_number(dateobj)) == dateobj.replace(day=1)
+    assert month_number(next_month(dateobj)) == month_number(dateobj) + 1
+
+
+def test_convert_date_run_invalid():
+    with pytest.raises(ValueError):
+        convert_date_run("2019-02-30")
+
+
+def test_split_period():
+    period = (datetime.date(2019, 11, 15), datetime.date(2020, 3, 10))
+    assert split_period(period, 2) == [
+        (datetime.date(2019, 11, 15), datetime.date(2019, 12, 31)),
+        (datetime.date(2020, 1, 1), datetime.date(2020, 2, 29)),
+        (datetime.date(2020, 3, 1), datetime.date(2020, 3, 10)),
+    ]
+    assert split_period(period, 5) == [period]
+    with pytest.raises(ValueError):
+        split_period(period, 0)
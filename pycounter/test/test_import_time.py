@@ -0,0 +1,49 @@
+"""Guard the cost of importing pycounter."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("lxml", "pendulum", "requests", "openpyxl")
+
+
+def _import_times(statement):
+    """Run ``python -X importtime`` and return {module: cumulative us}.
+
+    The dict is empty if the interpreter doesn't report import times.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, module = line.removeprefix("import time:").split("|")
+            times[module.strip()] = int(cumulative)
+        except ValueError:  # the header line
+            continue
+    return times
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import pycounter",
+        "import pycounter.report",
+        "import pycounter.sushi",
+        "import pycounter.sushiclient",
+    ],
+)
+def test_no_heavy_imports(statement):
+    """Heavy dependencies should only be loaded when they're used."""
+    times = _import_times(statement)
+    if not times:
+        pytest.skip("interpreter doesn't support -X importtime")
+    loaded = {name.split(".")[0] for name in times} & set(HEAVY_MODULES)
+    assert not loaded, "%s loaded %s" % (statement, ", ".join(sorted(loaded)))
@@ -1,7 +1,12 @@
 """Test COUNTER JR1 journal report (Excel)"""
 
+import os
+from unittest import mock
+
 import pytest
 
+from pycounter import report
+
 
 def test_report_type(jr1_report_xlsx):
     assert jr1_report_xlsx.report_type == "JR1"
@@ -34,3 +39,23 @@ def test_platform(jr1_report_xlsx):
 def test_stats(jr1_report_xlsx, pub_number, expected):
     publication = jr1_report_xlsx.pubs[pub_number]
     assert [x[2] for x in publication] == expected
+
+
+def test_workbook_read_only_and_closed():
+    import openpyxl  # pylint: disable=import-outside-toplevel
+
+    workbooks = []
+
+    def load_workbook(*args, **kwargs):
+        workbook = real_load_workbook(*args, **kwargs)
+        workbook.close = mock.Mock(wraps=workbook.close)
+        workbooks.append((kwargs, workbook))
+        return workbook
+
+    real_load_workbook = openpyxl.load_workbook
+    with mock.patch("openpyxl.load_workbook", load_workbook):
+        report.parse(os.path.join(os.path.dirname(__file__), "data", "JR1.xlsx"))
+    assert len(workbooks) == 1
+    kwargs, workbook = workbooks[0]
+    assert kwargs["read_only"]
+    workbook.close.assert_called_once_with()
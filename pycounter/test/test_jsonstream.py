@@ -0,0 +1,63 @@
+"""Tests for incremental JSON decoding."""
+
+import io
+import json
+
+import pytest
+
+from pycounter import jsonstream
+
+DOCUMENT = {
+    "Report_Header": {"Report_ID": "TR_J1", "Filters": [1, 2.5, None, True]},
+    "Report_Items": [
+        {"Title": "Journal é %d" % num, "Count": num} for num in range(50)
+    ],
+    "Trailer": 12345,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 1 << 20])
+def test_iter_members_chunked(chunk_size):
+    raw = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+    chunks = jsonstream.iter_chunks(io.BytesIO(raw), chunk_size)
+    members = list(jsonstream.iter_members(chunks, stream_keys=("Report_Items",)))
+    assert members[0] == ("Report_Header", DOCUMENT["Report_Header"])
+    assert [value for key, value in members if key == "Report_Items"] == DOCUMENT[
+        "Report_Items"
+    ]
+    # a number at the end of a chunk is not cut short
+    assert members[-1] == ("Trailer", 12345)
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [b'{"a": 12.', b"5}"],
+        [b'{"a": 1', b"2.5}"],
+        [b'{"a": 1e', b"5}"],
+        [b'{"a": 1E+', b"5}"],
+        [b'{"a": 1.5e-', b"5}"],
+        [b'{"a": -', b"12.5}"],
+    ],
+)
+def test_iter_members_number_split(chunks):
+    expected = json.loads(b"".join(chunks))
+    assert dict(jsonstream.iter_members(chunks)) == expected
+
+
+def test_iter_members_not_streamed():
+    members = list(jsonstream.iter_members([json.dumps(DOCUMENT)]))
+    assert dict(members) == DOCUMENT
+
+
+def test_iter_members_bom_and_empty():
+    assert not list(jsonstream.iter_members([b"\xef\xbb\xbf { } "]))
+    assert not list(jsonstream.iter_members([b'{"a": []}'], stream_keys=("a",)))
+
+
+@pytest.mark.parametrize(
+    "raw", [b"", b"[1, 2]", b'{"a": 1', b'{"a": 1} x', b"{1: 2}", b'{"a": [1 2]}']
+)
+def test_iter_members_invalid(raw):
+    with pytest.raises(json.JSONDecodeError):
+        list(jsonstream.iter_members([raw], stream_keys=("a",)))
@@ -0,0 +1,89 @@
+"""Memory use of resources in a large report."""
+
+import datetime
+import tracemalloc
+
+import pytest
+
+from pycounter import report
+
+PERIOD = (datetime.date(2019, 1, 1), datetime.date(2019, 12, 31))
+
+#: Greatest fraction of the memory taken by an unslotted copy of a journal
+#: that a slotted one may take, apart from their attribute values.
+MAX_SLOTTED_RATIO = 0.9
+
+
+class _UnslottedJournal:
+    """Holds a journal's attributes in a ``__dict__``, as without slots."""
+
+
+def _synthetic_journals(count):
+    """Make ``count`` journals with a little usage each."""
+    return [
+        report.CounterJournal(
+            period=PERIOD,
+            title="Journal %d" % number,
+            publisher="Publisher",
+            platform="Platform",
+            issn="1234-5678",
+            eissn="8765-4321",
+            doi="10.5555/%d" % number,
+            proprietary_id="J%d" % number,
+            html_total=number,
+            pdf_total=number,
+            month_data=[(datetime.date(2019, month, 1), number) for month in (1, 2)],
+        )
+        for number in range(count)
+    ]
+
+
+def _copy_journal(journal, cls=report.CounterJournal):
+    """Copy a journal to an object of ``cls``, sharing its attribute values."""
+    copy = cls.__new__(cls)
+    for base in type(journal).__mro__:
+        for name in getattr(base, "__slots__", ()):
+            setattr(copy, name, getattr(journal, name))
+    return copy
+
+
+def _bytes_per_copy(journals, cls):
+    """Average memory taken by a copy of each journal made by _copy_journal."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        copies = [_copy_journal(journal, cls) for journal in journals]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(copies) == len(journals)
+    return (after - before) / len(journals)
+
+
+@pytest.mark.parametrize(
+    "resource_class",
+    [
+        report.CounterJournal,
+        report.CounterBook,
+        report.CounterDatabase,
+        report.CounterPlatform,
+    ],
+)
+def test_resources_slotted(resource_class):
+    for cls in resource_class.__mro__[:-1]:
+        assert "__slots__" in vars(cls), cls
+    resource = resource_class.__new__(resource_class)
+    assert not hasattr(resource, "__dict__")
+    with pytest.raises(AttributeError):
+        resource.not_an_attribute = 1
+
+
+def test_journal_memory():
+    """Per-journal overhead, compared to the same attributes in a __dict__."""
+    journals = _synthetic_journals(20000)
+    unslotted = _bytes_per_copy(journals, _UnslottedJournal)
+    slotted = _bytes_per_copy(journals, report.CounterJournal)
+    assert slotted < unslotted * MAX_SLOTTED_RATIO, "%d bytes, %d unslotted" % (
+        slotted,
+        unslotted,
+    )
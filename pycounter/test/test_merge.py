@@ -0,0 +1,121 @@
+"""Tests for merging reports and fetching reports in date-range chunks."""
+
+import datetime
+import os
+from unittest import mock
+
+import pytest
+
+from pycounter import report
+from pycounter import sushi
+from pycounter.helpers import next_month
+from pycounter.test.utils import fake_sushi5
+
+FULL_PERIOD = (datetime.date(2019, 1, 1), datetime.date(2019, 12, 31))
+
+
+def _get(**kwargs):
+    """Get a TR_J2 report for 2019 from :func:`fake_sushi5`."""
+    with mock.patch("pycounter.sushi5.get_sushi_stats_raw", side_effect=fake_sushi5):
+        return sushi.get_report(
+            url="http://www.example.com/sushi",
+            release=5,
+            report="TR_J2",
+            start_date=FULL_PERIOD[0],
+            end_date=FULL_PERIOD[1],
+            **kwargs,
+        )
+
+
+def _rows(rep):
+    """Summarize a report's resources for comparison."""
+    return [(type(pub), pub.title, pub.issn, pub.metric, list(pub)) for pub in rep.pubs]
+
+
+@pytest.mark.parametrize("chunk_months", [1, 3, 5, 12])
+def test_chunked_report_matches_full(chunk_months):
+    full = _get()
+    chunked = _get(chunk_months=chunk_months)
+    assert chunked.period == full.period
+    assert chunked.institutional_identifier == full.institutional_identifier
+    assert _rows(chunked) == _rows(full)
+    assert chunked.as_generic() == full.as_generic()
+
+
+def test_chunked_requests():
+    with mock.patch(
+        "pycounter.sushi5.get_sushi_stats_raw", side_effect=fake_sushi5
+    ) as gssr:
+        sushi.get_report(
+            url="http://www.example.com/sushi",
+            release=5,
+            report="TR_J2",
+            start_date=FULL_PERIOD[0],
+            end_date=FULL_PERIOD[1],
+            chunk_months=5,
+            max_workers=2,
+        )
+    ranges = sorted(
+        (call.kwargs["start_date"], call.kwargs["end_date"])
+        for call in gssr.call_args_list
+    )
+    assert ranges == [
+        (datetime.date(2019, 1, 1), datetime.date(2019, 5, 31)),
+        (datetime.date(2019, 6, 1), datetime.date(2019, 10, 31)),
+        (datetime.date(2019, 11, 1), datetime.date(2019, 12, 31)),
+    ]
+
+
+def test_chunked_not_pending():
+    with pytest.raises(ValueError):
+        _get(chunk_months=3, wait=False)
+
+
+def test_merge_jr1_totals():
+    path = os.path.join(os.path.dirname(__file__), "data", "C4JR1.csv")
+    full = report.parse(path)
+    # pylint: disable=no-member
+    # (a JR1 only has journals, with HTML and PDF totals)
+    halves = []
+    for start, end in [
+        (full.period[0], datetime.date(full.period[0].year, 6, 30)),
+        (datetime.date(full.period[0].year, 7, 1), full.period[1]),
+    ]:
+        part = report.CounterReport(
+            report_type=full.report_type,
+            report_version=full.report_version,
+            metric=full.metric,
+            period=(start, end),
+        )
+        for pub in full.pubs:
+            part.pubs.append(
+                report.CounterJournal(
+                    period=part.period,
+                    title=pub.title,
+                    platform=pub.platform,
+                    publisher=pub.publisher,
+                    issn=pub.issn,
+                    eissn=pub.eissn,
+                    doi=pub.doi,
+                    proprietary_id=pub.proprietary_id,
+                    html_total=pub.html_total // 2,
+                    pdf_total=pub.pdf_total - pub.pdf_total // 2,
+                    month_data=[
+                        (month, usage)
+                        for month, _, usage in pub
+                        if start <= month < next_month(end)
+                    ],
+                )
+            )
+        halves.append(part)
+    merged = report.merge_reports(halves)
+    assert merged.period == full.period
+    assert [list(pub) for pub in merged] == [list(pub) for pub in full]
+    assert [pub.pdf_total for pub in merged] == [pub.pdf_total for pub in full]
+    # the parts are left alone
+    assert len(list(halves[0].pubs[0])) <= 6
+
+
+def test_merge_nothing():
+    with pytest.raises(ValueError):
+        report.merge_reports([])
@@ -0,0 +1,55 @@
+"""Tests for opening and parsing report files."""
+
+import gzip
+
+import pytest
+
+from pycounter import report
+from pycounter.test.utils import datafile
+
+
+@pytest.mark.parametrize(
+    "filename", ["C4JR1.csv", "simpleJR1.tsv", "JR1.xlsx", "C4DB1.tsv", "PR1.tsv"]
+)
+def test_iter_parse_matches_parse(filename):
+    full = report.parse(datafile(filename))
+    header, resources = report.iter_parse(datafile(filename))
+    assert header.report_type == full.report_type
+    assert header.period == full.period
+    assert header.customer == full.customer
+    assert header.pubs == []
+    streamed = list(resources)
+    assert [pub.title for pub in streamed] == [pub.title for pub in full]
+    assert [list(pub) for pub in streamed] == [list(pub) for pub in full]
+
+
+def test_iter_parse_is_lazy():
+    header, resources = report.iter_parse(datafile("C4JR1.csv"))
+    first = next(resources)
+    assert first.title == "Abstracts of Working Papers in Economics"
+    assert header.pubs == []
+    resources.close()
+
+
+def test_iter_parse_generic_rows():
+    with open(datafile("simpleJR1.tsv"), encoding="utf-8") as tsv_file:
+        rows = [line.rstrip("\n").split("\t") for line in tsv_file]
+    header, resources = report.iter_parse_generic(rows)
+    assert header.report_type == "JR1"
+    assert len(list(resources)) == len(report.parse(datafile("simpleJR1.tsv")).pubs)
+
+
+@pytest.mark.parametrize("filename", ["C4JR1.csv", "simpleJR1.tsv", "JR1.xlsx"])
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+def test_parse_sniffed_and_compressed(tmp_path, filename, suffix):
+    with open(datafile(filename), "rb") as original:
+        content = original.read()
+    path = tmp_path / ("report" + suffix)
+    if suffix:
+        with gzip.open(path, "wb") as compressed:
+            compressed.write(content)
+    else:
+        path.write_bytes(content)
+    expected = report.parse(datafile(filename))
+    parsed = report.parse(str(path))
+    assert [list(pub) for pub in parsed] == [list(pub) for pub in expected]
@@ -0,0 +1,176 @@
+"""Tests for retrying busy services and queued reports."""
+
+import datetime
+import email.utils
+import json
+import os
+from unittest import mock
+
+from httmock import all_requests, HTTMock, response
+import pytest
+
+from pycounter import sushi
+from pycounter import sushi5
+from pycounter import transport
+import pycounter.exceptions
+from pycounter.retry import PendingReport, RetryPolicy
+from pycounter.test.utils import DATA_DIR
+
+
+def _busy(retry_after=None):
+    """Make a ServiceBusyError."""
+    return pycounter.exceptions.ServiceBusyError("busy", retry_after=retry_after)
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the clock forward, as time.sleep would."""
+        self.now += seconds
+
+
+def test_delay_backoff():
+    policy = RetryPolicy(initial_delay=10, multiplier=3, max_delay=100, jitter=0)
+    assert [policy.delay(n) for n in range(1, 5)] == [10, 30, 90, 100]
+
+
+def test_delay_jitter():
+    policy = RetryPolicy(initial_delay=10, jitter=0.5)
+    delays = [policy.delay(1) for _ in range(100)]
+    assert all(5 <= delay <= 15 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_delay_retry_after():
+    assert RetryPolicy().delay(1, retry_after=7) == 7
+    policy = RetryPolicy(initial_delay=10, jitter=0, respect_retry_after=False)
+    assert policy.delay(1, retry_after=7) == 10
+
+
+def test_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    policy.next_delay(2, 0, _busy())
+    error = _busy()
+    with pytest.raises(pycounter.exceptions.RetriesExhaustedError) as excinfo:
+        policy.next_delay(3, 0, error)
+    assert excinfo.value.__cause__ is error
+
+
+def test_deadline():
+    policy = RetryPolicy(initial_delay=60, jitter=0, deadline=100)
+    assert policy.next_delay(1, 30, _busy()) == 60
+    with pytest.raises(pycounter.exceptions.RetriesExhaustedError):
+        policy.next_delay(2, 50, _busy())
+
+
+def test_pending_report_poll():
+    clock = FakeClock()
+    fetch = mock.Mock(side_effect=[_busy(), _busy(), "report"])
+    pending = PendingReport(fetch, RetryPolicy(initial_delay=10, jitter=0), clock=clock)
+    assert pending.poll() is None
+    assert pending.wait_time() == 10
+    # not due yet: no request is made
+    assert pending.poll() is None
+    assert fetch.call_count == 1
+    clock.sleep(10)
+    assert pending.poll() is None
+    assert pending.wait_time() == 20
+    assert pending.result(sleep=clock.sleep) == "report"
+    assert pending.done
+    assert pending.attempts == 3
+    assert clock.now == 130
+
+
+def test_pending_report_gives_up():
+    clock = FakeClock()
+    fetch = mock.Mock(side_effect=_busy())
+    pending = PendingReport(fetch, RetryPolicy(max_attempts=2), clock=clock)
+    with pytest.raises(pycounter.exceptions.RetriesExhaustedError):
+        pending.result(sleep=clock.sleep)
+    assert fetch.call_count == 2
+
+
+def test_pending_report_other_errors():
+    fetch = mock.Mock(side_effect=pycounter.exceptions.SushiException("broken"))
+    with pytest.raises(pycounter.exceptions.SushiException):
+        PendingReport(fetch, RetryPolicy()).poll()
+
+
+@all_requests
+def queued_mock(url_unused, request_unused):
+    with open(os.path.join(DATA_DIR, "sushi_queued.xml"), "rb") as datafile:
+        return datafile.read()
+
+
+@all_requests
+def simple_mock(url_unused, request_unused):
+    with open(os.path.join(DATA_DIR, "sushi_simple.xml"), "rb") as datafile:
+        return datafile.read()
+
+
+@all_requests
+def retry_after_mock(url_unused, request_unused):
+    return response(503, b"", {"Retry-After": "120"})
+
+
+REQUEST = {
+    "wsdl_url": "http://www.example.com/Sushi",
+    "start_date": datetime.date(2013, 1, 1),
+    "end_date": datetime.date(2013, 1, 31),
+}
+
+
+def test_get_report_pending():
+    with HTTMock(queued_mock):
+        pending = sushi.get_report(
+            wait=False, retry_policy=RetryPolicy(initial_delay=0), **REQUEST
+        )
+    assert isinstance(pending, PendingReport)
+    assert not pending.done
+    with HTTMock(simple_mock):
+        report = pending.poll()
+    assert report.report_type == "JR1"
+
+
+def test_get_report_gives_up():
+    with HTTMock(queued_mock):
+        with pytest.raises(pycounter.exceptions.RetriesExhaustedError):
+            sushi.get_report(retry_policy=RetryPolicy.immediate(3), **REQUEST)
+
+
+def test_get_report_retry_after():
+    with HTTMock(retry_after_mock):
+        with pytest.raises(pycounter.exceptions.RetriesExhaustedError) as excinfo:
+            sushi.get_report(retry_policy=RetryPolicy(max_attempts=1), **REQUEST)
+    assert excinfo.value.retry_after == 120
+
+
+def test_retry_after_http_date():
+    when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        seconds=300
+    )
+    resp = mock.Mock(headers={"Retry-After": email.utils.format_datetime(when)})
+    assert 290 < transport.retry_after(resp) <= 300
+    resp = mock.Mock(headers={"Retry-After": "soon"})
+    assert transport.retry_after(resp) is None
+
+
+def test_sushi5_queued_is_busy():
+    header = {
+        "Report_Header": {
+            "Exceptions": [
+                {"Code": 1011, "Severity": "Warning", "Message": "Report Queued"}
+            ]
+        }
+    }
+    with pytest.raises(pycounter.exceptions.Sushi5BusyError) as excinfo:
+        sushi5.raw_to_full(json.dumps(header))
+    assert isinstance(excinfo.value, pycounter.exceptions.ServiceBusyError)
+    assert excinfo.value.code == 1011
@@ -7,6 +7,7 @@ from unittest import mock
 
 from click.testing import CliRunner
 from httmock import HTTMock, urlmatch
+from lxml import etree
 import pytest
 
 from pycounter import sushi
@@ -319,3 +320,92 @@ def test_sushi_client_queued_report():
 def test_missing_issn(sushi_missing_ii):
     publication = next(iter(sushi_missing_ii))
     assert publication.issn == ""
+
+
+def test_raw_to_full_file_object():
+    """Raw reports can be streamed from a binary file object."""
+    path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+    with open(path, "rb") as datafile:
+        from_file = sushi.raw_to_full(datafile)
+    with open(path, "rb") as datafile:
+        from_bytes = sushi.raw_to_full(datafile.read())
+    assert from_file.report_type == from_bytes.report_type
+    assert from_file.customer == from_bytes.customer
+    assert [list(pub) for pub in from_file.pubs] == [
+        list(pub) for pub in from_bytes.pubs
+    ]
+
+
+def test_iter_raw_to_full():
+    """Header is available before any resource has been converted."""
+    path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+    with open(path, "rb") as datafile:
+        report, resources = sushi.iter_raw_to_full(datafile)
+        assert report.report_type == "JR1"
+        assert report.period == (datetime.date(2013, 1, 1), datetime.date(2013, 1, 31))
+        assert report.pubs == []
+        pubs = list(resources)
+    assert len(pubs) == 1
+    assert pubs[0].title == "Journal of fake data"
+
+
+def test_raw_to_full_many_items():
+    """Every streamed ReportItems element is converted, in order."""
+    path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+    with open(path, "rb") as datafile:
+        raw = datafile.read()
+    start = raw.index(b"<ReportItems>")
+    end = raw.index(b"</ReportItems>") + len(b"</ReportItems>")
+    item = raw[start:end]
+    items = b"".join(
+        item.replace(b"Journal of fake data", b"Journal %d" % num) for num in range(500)
+    )
+    report = sushi.raw_to_full(raw[:start] + items + raw[end:])
+    assert [pub.title for pub in report.pubs] == ["Journal %d" % n for n in range(500)]
+
+
+def test_raw_to_full_other_customers_dropped():
+    """Items of customers after the first are dropped as they're parsed."""
+    path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+    with open(path, "rb") as datafile:
+        raw = datafile.read()
+    start = raw.index(b"<Customer>")
+    end = raw.index(b"</Customer>") + len(b"</Customer>")
+    other = raw[start:end].replace(b"Journal of fake data", b"Other journal")
+    raw = raw[:end] + other * 50 + raw[end:]
+    parsers = []
+    real_iterparse = etree.iterparse
+
+    def iterparse(*args, **kwargs):
+        parsers.append(real_iterparse(*args, **kwargs))
+        return parsers[-1]
+
+    with mock.patch("lxml.etree.iterparse", iterparse):
+        report = sushi.raw_to_full(raw)
+    assert [pub.title for pub in report.pubs] == ["Journal of fake data"]
+    # what's left of the tree doesn't grow with the number of customers
+    assert len(list(parsers[0].root.iter())) < 50
+
+
+def test_raw_to_full_syntax_error():
+    with pytest.raises(pycounter.exceptions.SushiException) as excinfo:
+        sushi.raw_to_full(b"Bogus response with no XML")
+    assert excinfo.value.raw == b"Bogus response with no XML"
+
+
+def test_sushi_client_chunk_months():
+    arglist = [
+        "http://www.example.com/Sushi",
+        "-s",
+        "2013-01-01",
+        "-e",
+        "2013-03-31",
+        "--chunk_months",
+        "1",
+    ]
+    with HTTMock(sushi_mock):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(sushiclient.main, arglist)
+            assert result.exit_code == 0
+            assert os.path.exists("report.tsv")
@@ -0,0 +1,294 @@
+"""Tests for shared HTTP sessions and request limits."""
+
+import datetime
+import http.server
+import json
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from pycounter import sushi
+from pycounter import sushi5
+from pycounter import transport
+from pycounter.retry import PendingReport
+
+DATA = os.path.join(os.path.dirname(__file__), "counter5", "data", "sushi_simple.json")
+
+
+def test_make_session_adapters():
+    session = transport.make_session(pool_connections=3, pool_maxsize=7, retries=2)
+    with session:
+        adapter = session.get_adapter("https://example.com/")
+        assert adapter._pool_connections == 3  # pylint: disable=protected-access
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 7
+        assert adapter.max_retries.total == 2
+        assert "POST" in adapter.max_retries.allowed_methods
+        assert 503 not in adapter.max_retries.status_forcelist
+        assert not adapter.max_retries.respect_retry_after_header
+        assert session.get_adapter("http://example.com/") is adapter
+        assert session.headers["User-Agent"].startswith("pycounter/")
+
+
+def test_http_client_default():
+    import requests  # pylint: disable=import-outside-toplevel
+
+    assert transport.http_client() is requests
+    session = mock.Mock()
+    assert transport.http_client(session) is session
+
+
+def test_session_used_for_sushi4():
+    path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+    with open(path, "rb") as datafile:
+        content = datafile.read()
+    session = mock.Mock()
+    session.post.return_value.content = content
+    report = sushi.get_report(
+        wsdl_url="http://www.example.com/Sushi",
+        start_date=datetime.date(2013, 1, 1),
+        end_date=datetime.date(2013, 1, 31),
+        session=session,
+    )
+    assert report.report_type == "JR1"
+    assert session.post.call_count == 1
+
+
+class _CountingHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the same COUNTER 5 report for every request, keeping alive."""
+
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the report."""
+        self.connections.add(self.client_address)
+        with open(DATA, "rb") as datafile:
+            body = datafile.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _BusyHandler(http.server.BaseHTTPRequestHandler):
+    """Answer every request with 503 and a long Retry-After, counting them."""
+
+    requests = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Say the service is busy."""
+        type(self).requests += 1
+        self.send_response(503)
+        self.send_header("Retry-After", "120")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(handler):
+    """Run a stub server in a thread; generate its URL, then stop it."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name="stub_server")
+def fixture_stub_server():
+    """Serve a COUNTER 5 report, recording the connections made."""
+    _CountingHandler.connections = set()
+    yield from _serve(_CountingHandler)
+
+
+@pytest.fixture(name="busy_server")
+def fixture_busy_server():
+    """Serve 503 responses with Retry-After."""
+    _BusyHandler.requests = 0
+    yield from _serve(_BusyHandler)
+
+
+def test_session_reuses_connection(stub_server):
+    with transport.make_session() as session:
+        for _ in range(3):
+            report = sushi.get_report(
+                url=stub_server,
+                release=5,
+                report="TR_J1",
+                start_date=datetime.date(2019, 1, 1),
+                end_date=datetime.date(2019, 2, 28),
+                session=session,
+            )
+            assert report.report_type == "TR_J1"
+    assert len(_CountingHandler.connections) == 1
+
+
+def test_session_busy_not_waited_for(busy_server):
+    started = time.monotonic()
+    with transport.make_session() as session:
+        pending = sushi.get_report(
+            url=busy_server,
+            release=5,
+            report="TR_J1",
+            start_date=datetime.date(2019, 1, 1),
+            end_date=datetime.date(2019, 2, 28),
+            session=session,
+            wait=False,
+        )
+    assert isinstance(pending, PendingReport)
+    assert not pending.done
+    assert pending.wait_time() > 60
+    assert _BusyHandler.requests == 1
+    assert time.monotonic() - started < 5
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the clock forward, as time.sleep would."""
+        self.now += seconds
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = transport.TokenBucket(rate=2, burst=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now = 10
+    assert bucket.acquire(sleep=clock.sleep) == 0
+    assert bucket.acquire(sleep=clock.sleep) == 0
+    assert bucket.acquire(sleep=clock.sleep) == pytest.approx(0.5)
+    assert clock.now == pytest.approx(10.5)
+
+
+def test_token_bucket_rate_positive():
+    with pytest.raises(ValueError):
+        transport.TokenBucket(rate=0)
+
+
+def test_host_limiter_per_host():
+    clock = FakeClock()
+    limiter = transport.HostLimiter(
+        rate=10,
+        hosts={
+            "https://Slow.example.com/sushi": {"rate": 1, "max_concurrent": 1},
+            "other.example.com:8443": transport.EndpointLimits(burst=3),
+        },
+        clock=clock,
+    )
+    assert limiter.limits("https://slow.example.com/x") == (1, 1, 1)
+    assert limiter.limits("https://other.example.com:8443/") == (None, 3, None)
+    assert limiter.limits("https://fast.example.com/") == (10, 1, None)
+    assert limiter.reserve("https://slow.example.com/a") == 0
+    assert limiter.reserve("https://slow.example.com/b") == pytest.approx(1)
+    assert limiter.reserve("https://fast.example.com/") == 0
+    assert limiter.reserve("https://fast.example.com/") == pytest.approx(0.1)
+    assert limiter.reserve("https://other.example.com:8443/") == 0
+
+
+def test_host_limiter_concurrency():
+    limiter = transport.HostLimiter(max_concurrent=2)
+    state = {"active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    def request(url):
+        with limiter.limit(url):
+            with lock:
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            threading.Event().wait(0.02)
+            with lock:
+                state["active"] -= 1
+
+    threads = [
+        threading.Thread(target=request, args=("http://example.com/%d" % i,))
+        for i in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["max_active"] == 2
+
+
+@pytest.mark.parametrize("release", [4, 5])
+def test_limiter_used_for_request(release):
+    limiter = mock.MagicMock()
+    session = mock.Mock()
+    if release == 4:
+        path = os.path.join(os.path.dirname(__file__), "data", "sushi_simple.xml")
+        with open(path, "rb") as datafile:
+            session.post.return_value.content = datafile.read()
+        url = "http://www.example.com/Sushi"
+    else:
+        with open(DATA, "rb") as datafile:
+            session.get.return_value.json.return_value = json.load(datafile)
+        url = "https://www.example.com/sushi"
+    report = sushi.get_report(
+        **{"wsdl_url" if release == 4 else "url": url},
+        start_date=datetime.date(2013, 1, 1),
+        end_date=datetime.date(2013, 1, 31),
+        release=release,
+        session=session,
+        limiter=limiter,
+    )
+    assert report.pubs
+    limiter.limit.assert_called_once()
+    assert limiter.limit.call_args[0][0].startswith(url)
+
+
+def test_limiter_slot_held_while_streaming():
+    limiter = mock.MagicMock()
+    slot = limiter.limit.return_value
+    session = mock.Mock()
+    with open(DATA, "rb") as datafile:
+        session.get.return_value.iter_content.return_value = iter([datafile.read()])
+    chunks = sushi5.get_sushi_stats_raw(
+        url="https://www.example.com/sushi",
+        start_date=datetime.date(2013, 1, 1),
+        end_date=datetime.date(2013, 1, 31),
+        stream=True,
+        session=session,
+        limiter=limiter,
+    )
+    slot.__enter__.assert_called_once()
+    slot.__exit__.assert_not_called()
+    report = sushi5.raw_to_full(chunks)
+    assert report.pubs
+    slot.__exit__.assert_called_once()
+    session.get.return_value.close.assert_called_once()
+
+
+def test_limiter_slot_released_if_stream_unread():
+    limiter = mock.MagicMock()
+    chunks = sushi5.get_sushi_stats_raw(
+        url="https://www.example.com/sushi",
+        start_date=datetime.date(2013, 1, 1),
+        end_date=datetime.date(2013, 1, 31),
+        stream=True,
+        session=mock.Mock(),
+        limiter=limiter,
+    )
+    chunks.close()
+    limiter.limit.return_value.__exit__.assert_called_once()
@@ -0,0 +1,97 @@
+"""Helpers shared by the tests."""
+
+import datetime
+import os
+
+from pycounter.helpers import month_from_number, month_number
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+C5_DATA_DIR = os.path.join(os.path.dirname(__file__), "counter5", "data")
+
+
+def datafile(filename):
+    """Path to a file in the test data directory."""
+    return os.path.join(DATA_DIR, filename)
+
+
+def read_file(path):
+    """Return the contents of a file as bytes."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def c4_request(**kwargs):
+    """Keyword arguments for a COUNTER 4 JR1 request, overridden by kwargs."""
+    request = {
+        "wsdl_url": "http://www.example.com/Sushi",
+        "start_date": datetime.date(2013, 1, 1),
+        "end_date": datetime.date(2013, 1, 31),
+        "requestor_id": "me",
+        "customer_reference": "exampleLibrary",
+    }
+    request.update(kwargs)
+    return request
+
+
+def c5_request(**kwargs):
+    """Keyword arguments for a COUNTER 5 TR_J1 request, overridden by kwargs."""
+    request = {
+        "url": "https://www.example.com/sushi",
+        "release": 5,
+        "report": "TR_J1",
+        "start_date": datetime.date(2019, 1, 1),
+        "end_date": datetime.date(2019, 2, 28),
+        "api_key": "secret",
+    }
+    request.update(kwargs)
+    return request
+
+
+def _months(start, end):
+    """List the first days of the months from start to end."""
+    return [
+        month_from_number(number)
+        for number in range(month_number(start), month_number(end) + 1)
+    ]
+
+
+def _c5_item(title, issn, months):
+    """Make a COUNTER 5 report item with usage for the given months."""
+    return {
+        "Title": title,
+        "Platform": "PlatformX",
+        "Publisher": "Publisher X",
+        "Item_ID": [{"Type": "Print_ISSN", "Value": issn}],
+        "Performance": [
+            {
+                "Period": {"Begin_Date": month.isoformat()},
+                "Instance": [
+                    {"Metric_Type": "Total_Item_Requests", "Count": month.month * 10},
+                    {"Metric_Type": "Unique_Item_Requests", "Count": month.month},
+                ],
+            }
+            for month in months
+        ],
+    }
+
+
+def fake_sushi5(start_date, end_date, **kwargs):
+    """Stand-in for sushi5.get_sushi_stats_raw, with usage for any range."""
+    months = _months(start_date, end_date)
+    items = [_c5_item("Journal A", "1111-1111", months)]
+    # only used in the second half of the year
+    late_months = [month for month in months if month.month > 6]
+    if late_months:
+        items.append(_c5_item("Journal B", "2222-2222", late_months))
+    return {
+        "Report_Header": {
+            "Report_ID": kwargs.get("report", "TR_J2"),
+            "Release": "5",
+            "Customer_ID": "exampleLibrary",
+            "Report_Filters": [
+                {"Name": "Begin_Date", "Value": start_date.isoformat()},
+                {"Name": "End_Date", "Value": end_date.isoformat()},
+            ],
+        },
+        "Report_Items": items,
+    }
@@ -0,0 +1,308 @@
+"""HTTP plumbing shared by the SUSHI clients."""
+
+import collections
+import contextlib
+import datetime
+import email.utils
+import threading
+import time
+import urllib.parse
+
+from pycounter import __version__
+import pycounter.exceptions
+
+#: Default number of connection pools (one per host) kept by a session.
+POOL_CONNECTIONS = 10
+#: Default number of connections kept alive per host.
+POOL_MAXSIZE = 10
+#: HTTP statuses retried by sessions from :func:`make_session`. 503 is left
+#: to :class:`pycounter.retry.RetryPolicy`, as a service busy response.
+RETRY_STATUSES = (500, 502, 504)
+
+#: HTTP statuses meaning "try again later" when sent with a Retry-After header.
+BUSY_STATUSES = (429, 503)
+
+#: An HTTP request for a SUSHI report, independent of how it is sent.
+#: ``params`` is a dict of URL query parameters and ``data`` the request body;
+#: either may be None.
+Request = collections.namedtuple("Request", "method url params data headers")
+
+#: Limits on requests to one host, for :class:`HostLimiter`. ``rate`` is in
+#: requests per second, ``burst`` is the number of requests that may be made
+#: at once after a quiet spell, and ``max_concurrent`` is the number of
+#: requests in progress at the same time. ``rate`` or ``max_concurrent`` may
+#: be None for no limit.
+EndpointLimits = collections.namedtuple(
+    "EndpointLimits", "rate burst max_concurrent", defaults=(None, 1, None)
+)
+
+
+def make_session(
+    pool_connections=POOL_CONNECTIONS,
+    pool_maxsize=POOL_MAXSIZE,
+    retries=3,
+    backoff_factor=0.5,
+    user_agent=None,
+):
+    """Make a :class:`requests.Session` tuned for SUSHI harvesting.
+
+    Passing the session as ``session=`` to :func:`pycounter.sushi.get_report`
+    (or the ``get_sushi_stats_raw`` and ``get_status`` functions) reuses
+    kept-alive connections to each host across requests, instead of opening
+    a new TCP and TLS connection for every report.
+
+    Connection errors and responses with a status in :data:`RETRY_STATUSES`
+    are retried with exponential backoff. SUSHI report requests only read
+    data, so the COUNTER 4 SOAP ``POST`` is retried too. When retries run
+    out, the last response is returned as it would be without retrying.
+    ``Retry-After`` headers are not waited for here: a busy response is
+    returned at once, to be retried (or not, with ``wait=False``) by the
+    caller's :class:`pycounter.retry.RetryPolicy`.
+
+    :param pool_connections: number of hosts to keep connection pools for
+    :param pool_maxsize: number of connections to keep alive per host
+    :param retries: how many times to retry a request; 0 to disable retries
+    :param backoff_factor: base delay in seconds for exponential backoff
+        between retries
+    :param user_agent: User-Agent header to send (default
+        ``pycounter/<version>``)
+    :return: a :class:`requests.Session`, which should be closed (or used as
+        a context manager) when no longer needed
+    """
+    # pylint: disable=import-outside-toplevel
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = user_agent or "pycounter/%s" % __version__
+    return session
+
+
+def http_client(session=None):
+    """Get the object to make HTTP requests with.
+
+    :param session: a :class:`requests.Session`, or None
+    :return: ``session``, or the :mod:`requests` module (which has the same
+        ``get`` and ``post`` functions) if no session is given
+    """
+    if session is not None:
+        return session
+    import requests  # pylint: disable=import-outside-toplevel
+
+    return requests
+
+
+def retry_after(response):
+    """Get the wait asked for by a response's Retry-After header.
+
+    :param response: a :class:`requests.Response`
+    :return: seconds to wait, or None if there is no valid header
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((when - now).total_seconds(), 0)
+
+
+def check_busy(response):
+    """Raise ServiceBusyError for a "busy, retry later" HTTP response.
+
+    That is, a response with a status in :data:`BUSY_STATUSES` and a
+    Retry-After header.
+
+    :param response: a :class:`requests.Response`
+    :raises pycounter.exceptions.ServiceBusyError: with ``retry_after`` set
+    """
+    if response.status_code in BUSY_STATUSES:
+        wait = retry_after(response)
+        if wait is not None:
+            raise pycounter.exceptions.ServiceBusyError(
+                "HTTP %d from server" % response.status_code,
+                raw=response.content,
+                retry_after=wait,
+            )
+
+
+def host_key(url):
+    """Get the host (``netloc``) part of a URL, in lower case."""
+    if "://" not in url:
+        url = "//" + url
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+class TokenBucket:
+    """Token bucket rate limiter, safe to share between threads.
+
+    Tokens are added at ``rate`` per second, up to ``burst``; each request
+    takes one. A request that finds no token reserves the next one to come,
+    so requests waiting together are spaced ``1 / rate`` seconds apart.
+
+    :param rate: tokens added per second
+    :param burst: greatest number of tokens held
+    :param clock: function returning the current time in seconds
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, without waiting for it.
+
+        :return: seconds to wait before the token may be used (0 if now)
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, sleep=time.sleep):
+        """Take a token, waiting until it may be used.
+
+        :param sleep: function to wait a number of seconds with
+        :return: seconds waited
+        """
+        delay = self.reserve()
+        if delay:
+            sleep(delay)
+        return delay
+
+
+class HostLimiter:
+    """Rate and concurrency limits for requests, kept separately per host.
+
+    Pass one limiter as ``limiter=`` to all the requests of a harvest
+    (:func:`pycounter.sushi.get_report`, the ``get_sushi_stats_raw``
+    functions or :func:`pycounter.asyncsushi.get_reports_async`), from any
+    number of threads, and requests to each host are paced by a
+    :class:`TokenBucket` and capped by a semaphore for that host::
+
+        limiter = HostLimiter(rate=1, max_concurrent=2, hosts={
+            "sushi.example.com": {"rate": 0.2, "max_concurrent": 1},
+        })
+
+    :param rate: default requests per second to each host, or None for no
+        limit
+    :param burst: default number of requests to a host that may be made at
+        once after a quiet spell
+    :param max_concurrent: default number of requests to each host in
+        progress at the same time, or None for no limit
+    :param hosts: dict of :class:`EndpointLimits` (or dicts of its fields)
+        for particular endpoints, keyed by host name (with the port, if not
+        the default) or URL; fields not given take the defaults
+    :param clock: function returning the current time in seconds
+    """
+
+    def __init__(
+        self, rate=None, burst=1, max_concurrent=None, hosts=None, clock=time.monotonic
+    ):
+        self.default = EndpointLimits(rate, burst, max_concurrent)
+        self.hosts = {}
+        for endpoint, limits in (hosts or {}).items():
+            if isinstance(limits, EndpointLimits):
+                limits = limits._asdict()
+            self.hosts[host_key(endpoint)] = self.default._replace(**limits)
+        self._clock = clock
+        self._buckets = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def limits(self, url):
+        """Get the :class:`EndpointLimits` for a URL's host."""
+        return self.hosts.get(host_key(url), self.default)
+
+    def reserve(self, url):
+        """Take a turn to make a request to a URL, without waiting.
+
+        This only applies the rate limit; see :meth:`limit`.
+
+        :return: seconds to wait before making the request
+        """
+        host = host_key(url)
+        limits = self.hosts.get(host, self.default)
+        if limits.rate is None:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(
+                    limits.rate, limits.burst, self._clock
+                )
+        return bucket.reserve()
+
+    @contextlib.contextmanager
+    def limit(self, url, sleep=time.sleep):
+        """Context manager to make a request to a URL within the limits.
+
+        Waits for a free slot for the host, then for the rate limit, and
+        holds the slot until the ``with`` block ends.
+
+        :param url: URL of the request
+        :param sleep: function to wait a number of seconds with
+        """
+        host = host_key(url)
+        limits = self.hosts.get(host, self.default)
+        semaphore = None
+        if limits.max_concurrent is not None:
+            with self._lock:
+                semaphore = self._semaphores.get(host)
+                if semaphore is None:
+                    semaphore = self._semaphores[host] = threading.BoundedSemaphore(
+                        limits.max_concurrent
+                    )
+            semaphore.acquire()
+        try:
+            delay = self.reserve(url)
+            if delay:
+                sleep(delay)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+
+def limited(limiter, url):
+    """Get a context manager for a request within a limiter's limits.
+
+    :param limiter: a :class:`HostLimiter`, or None for no limits
+    :param url: URL of the request
+    """
+    if limiter is None:
+        return contextlib.nullcontext()
+    return limiter.limit(url)
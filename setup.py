@@ -11,7 +11,14 @@ with open(os.path.join(os.path.dirname(__file__), "pycounter/version.py")) as fp
 with open("README.rst") as readmefile:
     readme = readmefile.read()
 
-requirements = ["openpyxl", "requests", "pendulum", "click", "lxml"]
+requirements = [
+    "openpyxl",
+    "requests",
+    "pendulum",
+    "click",
+    "lxml",
+    'tomli; python_version < "3.11"',
+]
 
 if platform.python_implementation() == "PyPy":
     requirements = ["cython"] + requirements
@@ -46,5 +53,10 @@ setup(
         "tests": ["httmock", "mock", "pytest", "coverage"],
     },
     install_requires=requirements,
-    entry_points={"console_scripts": ["sushiclient = pycounter.sushiclient:main"]},
+    entry_points={
+        "console_scripts": [
+            "sushiclient = pycounter.sushiclient:main",
+            "counterbulk = pycounter.bulk:main",
+        ]
+    },
 )